@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import runner
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs with a pool of worker threads (instead of, "
+        "or next to, the web server's own pool). --enqueue adds a job first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=2,
+            help="Number of worker threads.",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=runner.DEFAULT_POLL_INTERVAL,
+            help="Seconds to wait between polls when no job is queued.",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Exit once no job is queued instead of polling forever.",
+        )
+        parser.add_argument(
+            "--enqueue", metavar="TASK",
+            help="Queue a job for this task first (e.g. reconcile_capacity).",
+        )
+        parser.add_argument(
+            "--param", action="append", default=[], metavar="KEY=VALUE",
+            help="Task parameter for --enqueue (repeatable; VALUE is parsed as JSON if it can be).",
+        )
+
+    def handle(self, *args, **options):
+        if options["enqueue"]:
+            params = {}
+            for param in options["param"]:
+                key, sep, value = param.partition("=")
+                if not sep:
+                    raise CommandError(f"Expected KEY=VALUE, got {param!r}.")
+                try:
+                    params[key] = json.loads(value)
+                except ValueError:
+                    params[key] = value
+            try:
+                job = runner.create_job(options["enqueue"], params)
+            except runner.JobError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(f"Queued job {job.id} ({job.name}).")
+
+        runner.run_workers(
+            workers=max(1, options["workers"]),
+            poll_interval=options["poll_interval"],
+            once=options["once"],
+        )
+
+        queued = Job.objects.filter(status=Job.STATUS_QUEUED).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Job workers stopped ({queued} job(s) still queued)."
+        ))
@@ -0,0 +1,83 @@
+from django.db import models
+
+
+class Job(models.Model):
+    # Background Job Table (see jobs/runner.py)
+    # (job_id PK, name, params, group, status, progress, total, message, log,
+    #  result, error, worker, created_at, started_at, heartbeat_at, finished_at)
+    # Kept out of the university app: dropping the university tables is
+    # itself a job and must be able to record its own outcome.
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    # Registered task name and its keyword arguments
+    name = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, blank=True)
+    # Jobs of the same (non-empty) group run one at a time, in order
+    group = models.CharField(max_length=100, blank=True)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED
+    )
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    # Last lines of the task's output
+    log = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    # host:pid/thread of the worker running the job
+    worker = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim queued jobs in arrival order
+            models.Index(fields=['status', 'id'], name='job_status_id_idx'),
+            # Latest job of a kind (shown on the page that starts it)
+            models.Index(fields=['name', 'id'], name='job_name_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} {self.name} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    @property
+    def percent(self):
+        """Progress in percent, or None when the total isn't known."""
+        if not self.total:
+            return None
+        return min(100, round(100 * self.progress / self.total))
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "params": self.params,
+            "status": self.status,
+            "done": not self.is_active,
+            "progress": self.progress,
+            "total": self.total,
+            "percent": self.percent,
+            "message": self.message,
+            "log": self.log,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
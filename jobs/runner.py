@@ -0,0 +1,397 @@
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from university.sqlite_profile import retry_on_busy
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Progress is published at most this often (the final state always is)
+PROGRESS_INTERVAL = 0.5
+
+# Running jobs get a heartbeat (their progress entry and heartbeat_at) this
+# often; one without either for STALE_AFTER seconds is marked failed. A
+# long SQLite write transaction in the task can hold up heartbeat_at, so
+# the progress entry is what shows the job is alive. That only works with
+# a cache shared between processes; with a per-process cache, only jobs
+# of this process are checked (see fail_stale)
+HEARTBEAT_INTERVAL = 30
+STALE_AFTER = 5 * 60
+
+# Output lines kept in Job.log
+LOG_LINES = 200
+
+PROGRESS_KEY = "jobs:progress:{}"
+
+# -------------------------
+# Background jobs
+# -------------------------
+# A job is a Job row naming a registered task and its keyword arguments.
+# enqueue() stores the row and wakes the in-process worker pool
+# (UNIVERSITY_JOB_WORKERS threads, started on first use); `manage.py
+# run_jobs` runs the same workers in a separate process. Workers claim the
+# oldest queued job with a conditional UPDATE, so any number of them can
+# share the table; jobs of one group run one at a time, in order.
+#
+# Live progress goes to the cache rather than the job row: a task may hold
+# a long write transaction (a large seed), and on SQLite nothing else could
+# write the row until it commits. The row gets the final progress, log,
+# result or error when the job ends. Processes see each other's progress
+# through the shared CACHES backend (see settings).
+
+Task = namedtuple('Task', 'name func group')
+
+TASKS = {}
+
+
+class JobError(ValueError):
+    """Unknown task name."""
+
+
+def task(name, group=''):
+    """
+    Register func(progress, **params) as the task `name`. Its return value
+    (JSON-serializable) is stored as the job's result.
+    """
+    def register(func):
+        TASKS[name] = Task(name, func, group)
+        return func
+    return register
+
+
+def get_task(name):
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise JobError(f"Unknown task {name!r} (choose from {', '.join(sorted(TASKS))}).") from None
+
+
+def create_job(name, params):
+    """Store a queued job for the task `name` (without waking any worker)."""
+    task = get_task(name)
+    return Job.objects.create(name=name, params=params, group=task.group)
+
+
+def enqueue(task_name, /, **params):
+    """Queue a job for a task and return it; workers start once the transaction commits."""
+    job = create_job(task_name, params)
+    transaction.on_commit(wake)
+    return job
+
+
+def latest(name):
+    """The most recent job of a task (with live progress), or None."""
+    return live(Job.objects.filter(name=name).order_by('-id').first())
+
+
+def live(job):
+    """The job with the progress its worker last published, if it is running."""
+    if job is not None and job.status == Job.STATUS_RUNNING:
+        state = cache.get(PROGRESS_KEY.format(job.id))
+        if state:
+            job.progress = state["progress"]
+            job.total = state["total"]
+            job.message = state["message"]
+            job.log = state["log"]
+    return job
+
+
+# -------------------------
+# Progress reporting
+# -------------------------
+class _LineWriter:
+    """File-like object that hands every complete line to a callback."""
+
+    def __init__(self, on_line):
+        self.on_line = on_line
+        self.partial = ""
+
+    def write(self, text):
+        lines = (self.partial + text).split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            self.on_line(line)
+
+    def flush(self):
+        pass
+
+
+class Progress:
+    """
+    Handed to a running task. update()/step() record how far it got;
+    output() is a stream for call_command(stdout=...) whose lines become the
+    job's message and log.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.done = 0
+        self.total = None
+        self.message = ""
+        self.lines = deque(maxlen=LOG_LINES)
+        self._published_at = 0.0
+
+    def update(self, done=None, total=None, message=None):
+        if done is not None:
+            self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message.strip()[:255]
+        self.publish()
+
+    def step(self, message=None):
+        self.update(done=self.done + 1, message=message)
+
+    def log(self, line):
+        line = line.rstrip()
+        if line:
+            self.lines.append(line)
+            self.update(message=line)
+
+    def output(self, on_line=None):
+        """A stream for command output: each line is logged, then passed to on_line."""
+        def handle(line):
+            self.log(line)
+            if on_line:
+                on_line(line)
+        return _LineWriter(handle)
+
+    def state(self):
+        return {
+            "progress": self.done,
+            "total": self.total,
+            "message": self.message,
+            "log": "\n".join(self.lines),
+        }
+
+    def publish(self, force=False):
+        now = time.monotonic()
+        if force or now - self._published_at >= PROGRESS_INTERVAL:
+            cache.set(PROGRESS_KEY.format(self.job_id), self.state(), STALE_AFTER)
+            self._published_at = now
+
+
+# -------------------------
+# Workers
+# -------------------------
+# Jobs being run by this process: job id -> Progress (for the heartbeat)
+_running = {}
+_running_lock = threading.Lock()
+
+_pool = []
+_pool_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def claim(worker):
+    """Mark the oldest runnable queued job as running by `worker` and return it (or None)."""
+    busy_groups = Job.objects.filter(status=Job.STATUS_RUNNING).exclude(group='').values('group')
+    candidates = list(
+        Job.objects.filter(status=Job.STATUS_QUEUED)
+        .exclude(group__in=busy_groups)
+        .order_by('id')
+        .values_list('id', flat=True)[:5]
+    )
+    for job_id in candidates:
+        # Conditional claim: skipped if another worker took the job, or
+        # started one of its group, in the meantime
+        now = timezone.now()
+        claimed = (
+            Job.objects.filter(id=job_id, status=Job.STATUS_QUEUED)
+            .exclude(group__in=busy_groups)
+            .update(status=Job.STATUS_RUNNING, worker=worker[:200], started_at=now, heartbeat_at=now)
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job's task and record its outcome."""
+    progress = Progress(job.id)
+    progress.publish(force=True)
+    with _running_lock:
+        _running[job.id] = progress
+
+    result, error = None, ""
+    try:
+        result = get_task(job.name).func(progress, **job.params)
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", job.id, job.name)
+        error = f"{exc.__class__.__name__}: {exc}"
+    finally:
+        with _running_lock:
+            _running.pop(job.id, None)
+
+    state = progress.state()
+    if error and not progress.message:
+        state["message"] = error[:255]
+    try:
+        _record_outcome(
+            job.id,
+            status=Job.STATUS_FAILED if error else Job.STATUS_SUCCEEDED,
+            result=result,
+            error=error,
+            finished_at=timezone.now(),
+            **state,
+        )
+    except DatabaseError:
+        # The worker carries on; the job stays running until fail_stale()
+        # finds it (it was claimed by this process, which no longer runs it)
+        logger.exception("Could not record the outcome of job %s (%s)", job.id, job.name)
+    cache.delete(PROGRESS_KEY.format(job.id))
+
+
+@retry_on_busy
+def _record_outcome(job_id, **fields):
+    Job.objects.filter(id=job_id).update(**fields)
+
+
+def _cache_is_shared():
+    """Whether other processes see this process's cache entries."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def fail_stale():
+    """
+    Mark running jobs whose worker stopped sending heartbeats as failed.
+    Without a shared cache the progress entries of other processes can't be
+    seen, so only this process's own jobs are checked then.
+    """
+    cutoff = timezone.now() - timedelta(seconds=STALE_AFTER)
+    this_process = f"{socket.gethostname()}:{os.getpid()}:"
+    shared = _cache_is_shared()
+    with _running_lock:
+        running = set(_running)
+    stale = []
+    for job_id, worker in (
+        Job.objects.filter(status=Job.STATUS_RUNNING, heartbeat_at__lt=cutoff).values_list('id', 'worker')
+    ):
+        if job_id in running:
+            continue
+        if worker.startswith(this_process):
+            stale.append(job_id)  # claimed here, but no longer running
+        elif shared and cache.get(PROGRESS_KEY.format(job_id)) is None:
+            stale.append(job_id)
+    if stale:
+        Job.objects.filter(id__in=stale, status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_FAILED,
+            error="The worker running this job stopped before it finished.",
+            finished_at=timezone.now(),
+        )
+    return len(stale)
+
+
+def _heartbeat_loop(stop_event):
+    try:
+        while not stop_event.wait(HEARTBEAT_INTERVAL):
+            with _running_lock:
+                running = list(_running.values())
+            for progress in running:
+                progress.publish(force=True)
+            try:
+                if running:
+                    Job.objects.filter(id__in=[p.job_id for p in running]).update(
+                        heartbeat_at=timezone.now()
+                    )
+            except DatabaseError:
+                # e.g. SQLite locked by the job's own write transaction; the
+                # cache entry still shows the job is alive
+                pass
+            try:
+                fail_stale()
+            except Exception:
+                logger.exception("Could not check for stale jobs")
+    finally:
+        connection.close()
+
+
+def _worker_loop(poll_interval, stop_event, once):
+    worker = worker_name()
+    try:
+        while not stop_event.is_set():
+            try:
+                job = claim(worker)
+            except Exception:
+                logger.exception("Job worker %s could not claim a job", worker)
+                job = None
+            if job is not None:
+                run_job(job)
+                continue
+            if once and not Job.objects.filter(status=Job.STATUS_QUEUED).exists():
+                return
+            _wake.wait(poll_interval)
+            _wake.clear()
+    finally:
+        # Each worker thread has its own DB connection
+        connection.close()
+
+
+def start_workers(workers, poll_interval=DEFAULT_POLL_INTERVAL, once=False, stop_event=None):
+    """Start `workers` worker threads plus a heartbeat thread; returns the worker threads."""
+    stop_event = stop_event or threading.Event()
+    fail_stale()
+    threading.Thread(
+        target=_heartbeat_loop, args=(stop_event,), name="jobs-heartbeat", daemon=True,
+    ).start()
+    threads = [
+        threading.Thread(
+            target=_worker_loop,
+            args=(poll_interval, stop_event, once),
+            name=f"jobs-worker-{number}",
+            daemon=True,
+        )
+        for number in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def run_workers(workers=2, poll_interval=DEFAULT_POLL_INTERVAL, once=False, stop_event=None):
+    """
+    Run jobs with a pool of worker threads (`manage.py run_jobs`).
+    With once=True the call returns when no job is queued; otherwise the
+    workers keep polling until stop_event is set.
+    """
+    stop_event = stop_event or threading.Event()
+    threads = start_workers(workers, poll_interval, once, stop_event)
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        stop_event.set()
+        _wake.set()
+        for thread in threads:
+            thread.join()
+    stop_event.set()
+
+
+def wake():
+    """Start the in-process pool if it isn't running, and wake idle workers."""
+    workers = getattr(settings, "UNIVERSITY_JOB_WORKERS", 2)
+    if workers > 0:
+        with _pool_lock:
+            if not any(thread.is_alive() for thread in _pool):
+                _pool[:] = start_workers(workers)
+    _wake.set()
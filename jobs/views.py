@@ -0,0 +1,14 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from university.decorators import admin_required
+
+from . import runner
+from .models import Job
+
+
+@admin_required
+def job_status(request, job_id):
+    """Status, progress and (once finished) result of a job, as JSON for polling (admins only)."""
+    job = runner.live(get_object_or_404(Job, id=job_id))
+    return JsonResponse(job.as_dict())
@@ -10,53 +10,89 @@ from .models import (
     Section,
     Grade,
     Enrollment,
+    EnrollmentRequest,
     Waitlist,
     Wait
 )
+from .signals import delete_rows
+
+
+class UniversityModelAdmin(admin.ModelAdmin):
+    """Deletes go through delete_rows(), which keeps counts and summaries current."""
+
+    def delete_model(self, request, obj):
+        delete_rows(type(obj)._default_manager.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_rows(queryset)
+
+
+# FK columns in list_display are joined with list_select_related, including
+# the relations their __str__ reads (Section -> course), so a changelist
+# page runs the same queries whatever its size.
+
+
+class SectionListFilter(admin.RelatedFieldListFilter):
+    """Section filter whose choices load each section's course in the same query."""
+
+    def field_choices(self, field, request, model_admin):
+        ordering = (
+            self.field_admin_ordering(field, request, model_admin)
+            or ("course__course_code", "section_number", "term")
+        )
+        sections = Section.objects.select_related("course").order_by(*ordering)
+        return [(section.pk, str(section)) for section in sections]
+
 
 # Register your models here.
 @admin.register(AdminModel)
-class AdminAdmin(admin.ModelAdmin):
+class AdminAdmin(UniversityModelAdmin):
     list_display = ("username", "first_name", "last_name")
     search_fields = ("username", "first_name", "last_name")
 
 
 @admin.register(Department)
-class DepartmentAdmin(admin.ModelAdmin):
+class DepartmentAdmin(UniversityModelAdmin):
     list_display = ("name", "office", "email", "admin")
+    list_select_related = ("admin",)
     search_fields = ("name", "email")
 
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(UniversityModelAdmin):
     list_display = ("first_name", "last_name", "email", "admin")
+    list_select_related = ("admin",)
     search_fields = ("first_name", "last_name", "email")
 
 
 @admin.register(UndergraduateStudent)
-class UndergraduateStudentAdmin(admin.ModelAdmin):
+class UndergraduateStudentAdmin(UniversityModelAdmin):
     list_display = ("student", "major", "year")
+    list_select_related = ("student",)
 
 
 @admin.register(GraduateStudent)
-class GraduateStudentAdmin(admin.ModelAdmin):
+class GraduateStudentAdmin(UniversityModelAdmin):
     list_display = ("student", "degree", "g_year")
+    list_select_related = ("student",)
 
 
 @admin.register(Instructor)
-class InstructorAdmin(admin.ModelAdmin):
+class InstructorAdmin(UniversityModelAdmin):
     list_display = ("first_name", "last_name", "email", "department", "admin")
+    list_select_related = ("department", "admin")
     search_fields = ("first_name", "last_name", "email")
 
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(UniversityModelAdmin):
     list_display = ("course_code", "course_name", "department", "admin")
+    list_select_related = ("department", "admin")
     search_fields = ("course_code", "course_name")
 
 
 @admin.register(Section)
-class SectionAdmin(admin.ModelAdmin):
+class SectionAdmin(UniversityModelAdmin):
     list_display = (
         "course",
         "section_number",
@@ -67,27 +103,39 @@ class SectionAdmin(admin.ModelAdmin):
         "remaining_capacity",
         "admin",
     )
+    list_select_related = ("course", "instructor", "admin")
     list_filter = ("term", "course")
 
 
 @admin.register(Grade)
-class GradeAdmin(admin.ModelAdmin):
+class GradeAdmin(UniversityModelAdmin):
     list_display = ("student", "section", "lab_grade", "assignment_grade",
                     "midterm_grade", "final_grade", "admin")
-    list_filter = ("section",)
+    list_select_related = ("student", "section__course", "admin")
+    list_filter = (("section", SectionListFilter),)
 
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(UniversityModelAdmin):
     list_display = ("student", "section", "admin")
-    list_filter = ("section", "admin")
+    list_select_related = ("student", "section__course", "admin")
+    list_filter = (("section", SectionListFilter), "admin")
 
 
 @admin.register(Waitlist)
-class WaitlistAdmin(admin.ModelAdmin):
-    list_display = ("section", "waitlist_id", "spaces_left", "admin")
+class WaitlistAdmin(UniversityModelAdmin):
+    list_display = ("section", "waitlist_id", "capacity", "spaces_left", "next_position", "admin")
+    list_select_related = ("section__course", "admin")
 
 
 @admin.register(Wait)
-class WaitAdmin(admin.ModelAdmin):
-    list_display = ("student", "waitlist", "admin")
\ No newline at end of file
+class WaitAdmin(UniversityModelAdmin):
+    list_display = ("student", "waitlist", "position", "admin")
+    list_select_related = ("student", "waitlist__section__course", "admin")
+
+
+@admin.register(EnrollmentRequest)
+class EnrollmentRequestAdmin(UniversityModelAdmin):
+    list_display = ("ticket", "student", "section", "status", "created_at", "processed_at")
+    list_select_related = ("student", "section__course")
+    list_filter = ("status",)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class UniversityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'university'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals, sqlite_profile, tasks  # noqa: F401 (tasks registers the background tasks)
+        signals.connect()
+        connection_created.connect(sqlite_profile.configure, dispatch_uid='university_sqlite_profile')
@@ -0,0 +1,180 @@
+import csv
+import io
+import json
+
+from django.db import transaction
+
+from .enrollment import QUERY_CHUNK_SIZE, REJECTED, chunked, enroll_batch
+from .models import Section, Student
+from .sqlite_profile import retry_on_busy
+
+
+class BulkEnrollError(ValueError):
+    """The uploaded file could not be read as CSV/JSON enrollment rows."""
+
+
+# -------------------------
+# Input parsing
+# -------------------------
+# Each row names a student and a section. Accepted columns / keys:
+#   student: student_id  or  student_email
+#   section: section_id  or  course_code + section_number (+ optional term)
+# JSON input may also be a list of [student_id, section_id] pairs.
+
+def parse_rows(text, fmt):
+    """Parse CSV or JSON text into a list of row dicts."""
+    fmt = (fmt or '').lower()
+    if fmt == 'json':
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise BulkEnrollError(f"Invalid JSON: {exc}") from exc
+        if isinstance(data, dict):
+            data = data.get('enrollments', [])
+        if not isinstance(data, list):
+            raise BulkEnrollError("JSON input must be a list of enrollments.")
+        rows = []
+        for item in data:
+            if isinstance(item, (list, tuple)) and len(item) == 2:
+                rows.append({'student_id': item[0], 'section_id': item[1]})
+            elif isinstance(item, dict):
+                rows.append(item)
+            else:
+                raise BulkEnrollError(f"Unrecognised enrollment entry: {item!r}")
+        return rows
+
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames:
+            raise BulkEnrollError("CSV input has no header row.")
+        return [
+            {key.strip(): (value or '').strip() for key, value in row.items() if key}
+            for row in reader
+        ]
+
+    raise BulkEnrollError(f"Unsupported format: {fmt!r} (use csv or json).")
+
+
+def guess_format(filename, default='csv'):
+    if filename and filename.lower().endswith('.json'):
+        return 'json'
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def resolve_pairs(rows):
+    """
+    Map each row to (student_id, section_id). Emails and course codes are
+    resolved with a handful of chunked lookups, never one query per row.
+    Returns a list with a (student_id, section_id) tuple or an error string per row.
+    """
+    emails = {str(row['student_email']).strip().lower() for row in rows
+              if not row.get('student_id') and row.get('student_email')}
+    codes = {str(row['course_code']).strip() for row in rows
+             if not row.get('section_id') and row.get('course_code')}
+
+    student_by_email = {}
+    for chunk in chunked(sorted(emails), QUERY_CHUNK_SIZE):
+        for student_id, email in Student.objects.filter(email__in=chunk).values_list('id', 'email'):
+            student_by_email[email.lower()] = student_id
+
+    # (course_code, section_number) -> [(term, section_id), ...]
+    sections_by_code = {}
+    for chunk in chunked(sorted(codes), QUERY_CHUNK_SIZE):
+        for section_id, code, number, term in (
+            Section.objects
+            .filter(course__course_code__in=chunk)
+            .values_list('id', 'course__course_code', 'section_number', 'term')
+        ):
+            sections_by_code.setdefault((code, number), []).append((term, section_id))
+
+    resolved = []
+    for row in rows:
+        if row.get('student_id'):
+            student_id = _as_int(row['student_id'])
+        else:
+            student_id = student_by_email.get(str(row.get('student_email', '')).strip().lower())
+
+        if row.get('section_id'):
+            section_id = _as_int(row['section_id'])
+        else:
+            candidates = sections_by_code.get(
+                (str(row.get('course_code', '')).strip(), _as_int(row.get('section_number'))), []
+            )
+            term = str(row.get('term') or '').strip()
+            if term:
+                candidates = [c for c in candidates if c[0] == term]
+            section_id = candidates[0][1] if len(candidates) == 1 else None
+
+        if student_id is None:
+            resolved.append("Unknown student.")
+        elif section_id is None:
+            resolved.append("Unknown section.")
+        else:
+            resolved.append((student_id, section_id))
+    return resolved
+
+
+# -------------------------
+# Bulk enrollment
+# -------------------------
+@retry_on_busy
+def bulk_enroll(rows, admin_id=None, use_waitlist=True, dry_run=False):
+    """
+    Enroll every row in one transaction and return a per-row report:
+    dicts with row, student_id, section_id, outcome and message.
+    With dry_run=True the report is produced and the transaction rolled back.
+    """
+    resolved = resolve_pairs(rows)
+    pairs = [item for item in resolved if isinstance(item, tuple)]
+
+    with transaction.atomic():
+        results = iter(enroll_batch(pairs, admin_id=admin_id, use_waitlist=use_waitlist))
+        if dry_run:
+            transaction.set_rollback(True)
+
+    report = []
+    for row_number, item in enumerate(resolved, start=1):
+        if isinstance(item, tuple):
+            result = next(results)
+            report.append({
+                'row': row_number,
+                'student_id': result.student_id,
+                'section_id': result.section_id,
+                'outcome': result.outcome,
+                'message': result.message,
+            })
+        else:
+            report.append({
+                'row': row_number,
+                'student_id': None,
+                'section_id': None,
+                'outcome': REJECTED,
+                'message': item,
+            })
+    return report
+
+
+def summarize(report):
+    """Count report rows per outcome."""
+    counts = {}
+    for entry in report:
+        counts[entry['outcome']] = counts.get(entry['outcome'], 0) + 1
+    return counts
+
+
+REPORT_FIELDS = ['row', 'student_id', 'section_id', 'outcome', 'message']
+
+
+def write_report_csv(report, out):
+    writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(report)
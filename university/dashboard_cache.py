@@ -0,0 +1,90 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# -------------------------
+# Student dashboard cache
+# -------------------------
+# The enrollment rows (with grades) and waitlist entries shown on a student's
+# dashboard are cached per student under a versioned key:
+#
+#   student_dashboard:rows:<generation>:<student_id>:<version>
+#
+# Any change to one of the student's enrollments, waitlist entries or grades
+# bumps that student's version (signals.py for saves and deletes, explicit
+# invalidate() calls after bulk writes), so the next view rebuilds the rows.
+# clear() bumps the generation and so drops every student at once (used when
+# tables are dropped or repopulated). Stale versions simply expire.
+#
+# Course, section and instructor details inside the rows are not watched;
+# edits to those show up once the entry expires
+# (UNIVERSITY_STUDENT_DASHBOARD_CACHE_SECONDS).
+
+ROWS_KEY = "student_dashboard:rows:{}:{}:{}"
+VERSION_KEY = "student_dashboard:version:{}"
+GENERATION_KEY = "student_dashboard:generation"
+
+
+def _timeout():
+    return getattr(settings, "UNIVERSITY_STUDENT_DASHBOARD_CACHE_SECONDS", 10 * 60)
+
+
+def _current(key):
+    """
+    Read a version counter. A missing counter starts at a fresh, time-based
+    value so that rows cached under an evicted counter are never reused.
+    """
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def _rows_key(student_id):
+    return ROWS_KEY.format(
+        _current(GENERATION_KEY), student_id, _current(VERSION_KEY.format(student_id))
+    )
+
+
+def get_rows(student_id, build):
+    """
+    Cached dashboard rows of a student: a dict with 'enrollments' and
+    'waits'. On a miss, build(student_id) computes them.
+    """
+    key = _rows_key(student_id)
+    rows = cache.get(key)
+    if rows is None:
+        rows = build(student_id)
+        cache.set(key, rows, _timeout())
+    return rows
+
+
+def invalidate(*student_ids):
+    """
+    Drop the cached rows of the given students once the current transaction
+    commits (rolled-back writes leave the cache alone).
+    """
+    keys = [VERSION_KEY.format(student_id) for student_id in set(student_ids)]
+    if not keys:
+        return
+
+    def apply():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                # No version yet: nothing can be cached for this student
+                pass
+
+    transaction.on_commit(apply)
+
+
+def clear():
+    """Forget the cached rows of every student."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        pass
@@ -2,10 +2,13 @@ from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
 
+# The records come from request.principal (see principals.py), so a session
+# whose student/instructor/admin no longer exists is sent to the login page.
+
 def admin_required(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        if not request.session.get('admin_id'):
+        if request.principal.admin is None:
             messages.error(request, "You must be logged in as an admin.")
             return redirect('admin_login')
         return view_func(request, *args, **kwargs)
@@ -14,7 +17,7 @@ def admin_required(view_func):
 def student_required(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        if not request.session.get('student_id'):
+        if request.principal.student is None:
             messages.error(request, "You must be logged in as a student to access this page.")
             return redirect('student_login')
         return view_func(request, *args, **kwargs)
@@ -24,7 +27,7 @@ def student_required(view_func):
 def instructor_required(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        if not request.session.get('instructor_id'):
+        if request.principal.instructor is None:
             messages.error(request, "You must be logged in as an instructor to access this page.")
             return redirect('instructor_login')
         return view_func(request, *args, **kwargs)
@@ -0,0 +1,485 @@
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+
+from . import dashboard_cache, reports, signals, table_stats
+from .models import Enrollment, Section, Student, Wait, Waitlist
+from .sqlite_profile import retry_on_busy
+
+
+# -------------------------
+# Seat / waitlist counters
+# -------------------------
+# Each helper below is a single conditional UPDATE evaluated by the database,
+# so concurrent requests can never push a counter past its limit and no row
+# has to be read, checked and saved back from Python. remaining_capacity is a
+# generated column and follows current_capacity automatically.
+
+def claim_seat(section_id):
+    """
+    Take one seat in the section if one is free.
+    Returns True when the seat was claimed.
+    """
+    claimed = (
+        Section.objects
+        .filter(id=section_id, current_capacity__lt=F('total_capacity'))
+        .update(current_capacity=F('current_capacity') + 1)
+    )
+    return claimed == 1
+
+
+def release_seat(section_id):
+    """
+    Give back one seat in the section (never goes below zero).
+    Returns True when a seat was released.
+    """
+    released = (
+        Section.objects
+        .filter(id=section_id, current_capacity__gt=0)
+        .update(current_capacity=F('current_capacity') - 1)
+    )
+    return released == 1
+
+
+def claim_waitlist_space(waitlist_pk):
+    """
+    Take one space on the waitlist if any are left.
+    Returns True when the space was claimed.
+    """
+    claimed = (
+        Waitlist.objects
+        .filter(pk=waitlist_pk, spaces_left__gt=0)
+        .update(spaces_left=F('spaces_left') - 1)
+    )
+    return claimed == 1
+
+
+# -------------------------
+# Batched enrollment
+# -------------------------
+# Outcomes reported by enroll_batch()
+ENROLLED = 'enrolled'
+WAITLISTED = 'waitlisted'
+REJECTED = 'rejected'
+
+# Size given to a waitlist that is created on demand
+DEFAULT_WAITLIST_SPACES = 10
+
+# Keep IN (...) lists under SQLite's bound-parameter limit
+QUERY_CHUNK_SIZE = 900
+
+EnrollmentResult = namedtuple(
+    'EnrollmentResult', ['student_id', 'section_id', 'outcome', 'message']
+)
+
+
+def chunked(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def enroll_batch(pairs, admin_id=None, use_waitlist=True):
+    """
+    Enroll many (student_id, section_id) pairs at once.
+
+    Pairs are handled in the order given: each section fills its free seats
+    first, then its waitlist, and anything left over is rejected. The work is
+    grouped by section, so a batch costs a few queries per QUERY_CHUNK_SIZE
+    students or sections plus one counter UPDATE per touched section and
+    waitlist.
+    Must be called inside transaction.atomic().
+
+    Returns one EnrollmentResult per pair, in input order.
+    """
+    pairs = [(int(student_id), int(section_id)) for student_id, section_id in pairs]
+    if not pairs:
+        return []
+
+    section_ids = sorted({section_id for _, section_id in pairs})
+    student_ids = sorted({student_id for student_id, _ in pairs})
+
+    # Lock the touched sections (in id order, to avoid deadlocks between batches)
+    sections = {}
+    for chunk in chunked(section_ids, QUERY_CHUNK_SIZE):
+        sections.update(
+            (section.id, section)
+            for section in (
+                Section.objects
+                .select_for_update()
+                .filter(id__in=chunk)
+                .only('id', 'total_capacity', 'current_capacity', 'admin_id')
+                .order_by('id')
+            )
+        )
+
+    # Students, and which of the requested pairs are already enrolled or
+    # waiting (looked up per student, so memory follows the batch size)
+    requested = set(pairs)
+    known_students = set()
+    enrolled = set()
+    waiting = set()
+    for chunk in chunked(student_ids, QUERY_CHUNK_SIZE):
+        known_students.update(
+            Student.objects.filter(id__in=chunk).values_list('id', flat=True)
+        )
+        enrolled.update(
+            pair for pair in
+            Enrollment.objects.filter(student_id__in=chunk).values_list('student_id', 'section_id')
+            if pair in requested
+        )
+        waiting.update(
+            pair for pair in
+            Wait.objects.filter(student_id__in=chunk).values_list('student_id', 'waitlist__section_id')
+            if pair in requested
+        )
+
+    # One waitlist per section: reuse the lowest waitlist_id if there is one
+    waitlists = {}
+    for chunk in chunked(section_ids, QUERY_CHUNK_SIZE):
+        for waitlist in (
+            Waitlist.objects
+            .select_for_update()
+            .filter(section_id__in=chunk)
+            .order_by('-waitlist_id')
+        ):
+            waitlists[waitlist.section_id] = waitlist
+
+    free_seats = {
+        section_id: section.total_capacity - section.current_capacity
+        for section_id, section in sections.items()
+    }
+    free_spaces = {
+        section_id: waitlist.spaces_left
+        for section_id, waitlist in waitlists.items()
+    }
+
+    results = []
+    seats_taken = defaultdict(int)
+    to_enroll = []
+    to_waitlist = []
+
+    for student_id, section_id in pairs:
+        if section_id not in sections:
+            outcome, message = REJECTED, "Unknown section."
+        elif student_id not in known_students:
+            outcome, message = REJECTED, "Unknown student."
+        elif (student_id, section_id) in enrolled:
+            outcome, message = REJECTED, "Already enrolled in this section."
+        elif (student_id, section_id) in waiting:
+            outcome, message = REJECTED, "Already on the waitlist for this section."
+        elif free_seats[section_id] > 0:
+            free_seats[section_id] -= 1
+            seats_taken[section_id] += 1
+            enrolled.add((student_id, section_id))
+            to_enroll.append((student_id, section_id))
+            outcome, message = ENROLLED, "Enrolled."
+        elif use_waitlist and free_spaces.setdefault(section_id, DEFAULT_WAITLIST_SPACES) > 0:
+            free_spaces[section_id] -= 1
+            waiting.add((student_id, section_id))
+            to_waitlist.append((student_id, section_id))
+            outcome, message = WAITLISTED, "Section is full; added to the waitlist."
+        elif use_waitlist:
+            outcome, message = REJECTED, "Section and its waitlist are full."
+        else:
+            outcome, message = REJECTED, "Section is full."
+        results.append(EnrollmentResult(student_id, section_id, outcome, message))
+
+    def record_admin(section_id):
+        return admin_id if admin_id is not None else sections[section_id].admin_id
+
+    # --- Enrollments + one counter UPDATE per section ---
+    Enrollment.objects.bulk_create(
+        [
+            Enrollment(student_id=student_id, section_id=section_id,
+                       admin_id=record_admin(section_id))
+            for student_id, section_id in to_enroll
+        ],
+        batch_size=QUERY_CHUNK_SIZE,
+    )
+    table_stats.adjust(Enrollment, len(to_enroll))
+    dashboard_cache.invalidate(*(student_id for student_id, _ in to_enroll))
+    reports.mark_changed(Enrollment)
+    for section_id, taken in seats_taken.items():
+        Section.objects.filter(id=section_id).update(current_capacity=F('current_capacity') + taken)
+
+    # --- Wait entries + one spaces_left UPDATE per waitlist ---
+    if to_waitlist:
+        missing = sorted({section_id for _, section_id in to_waitlist} - set(waitlists))
+        if missing:
+            Waitlist.objects.bulk_create([
+                Waitlist(
+                    section_id=section_id,
+                    waitlist_id=1,  # one waitlist per section (see student_add_course)
+                    capacity=DEFAULT_WAITLIST_SPACES,
+                    spaces_left=DEFAULT_WAITLIST_SPACES,
+                    admin_id=sections[section_id].admin_id,
+                )
+                for section_id in missing
+            ])
+            table_stats.adjust(Waitlist, len(missing))
+            for chunk in chunked(missing, QUERY_CHUNK_SIZE):
+                for waitlist in Waitlist.objects.filter(section_id__in=chunk, waitlist_id=1):
+                    waitlists[waitlist.section_id] = waitlist
+
+        # New entries join the tail of each waitlist in request order
+        added = defaultdict(int)
+        new_waits = []
+        for student_id, section_id in to_waitlist:
+            waitlist = waitlists[section_id]
+            new_waits.append(Wait(
+                student_id=student_id,
+                waitlist_id=waitlist.pk,
+                position=waitlist.next_position + added[waitlist.pk],
+                admin_id=record_admin(section_id),
+            ))
+            added[waitlist.pk] += 1
+        Wait.objects.bulk_create(new_waits, batch_size=QUERY_CHUNK_SIZE)
+        table_stats.adjust(Wait, len(new_waits))
+        dashboard_cache.invalidate(*(student_id for student_id, _ in to_waitlist))
+        reports.mark_changed(Wait, Waitlist)
+        for waitlist_pk, count in added.items():
+            Waitlist.objects.filter(pk=waitlist_pk).update(
+                spaces_left=F('spaces_left') - count,
+                next_position=F('next_position') + count,
+            )
+
+    return results
+
+
+def get_or_create_section_waitlist(section):
+    """
+    Return the section's waitlist (lowest waitlist_id), creating waitlist 1
+    with the default number of spaces if the section has none yet.
+    """
+    waitlist = (
+        Waitlist.objects
+        .filter(section_id=section.id)
+        .order_by('waitlist_id')
+        .first()
+    )
+    if waitlist is not None:
+        return waitlist
+    waitlist, _ = Waitlist.objects.get_or_create(
+        section_id=section.id,
+        waitlist_id=1,  # assuming one waitlist per section
+        defaults={
+            "capacity": DEFAULT_WAITLIST_SPACES,
+            "spaces_left": DEFAULT_WAITLIST_SPACES,
+            "admin_id": section.admin_id,
+        },
+    )
+    return waitlist
+
+
+# -------------------------
+# Single enrollments (request path)
+# -------------------------
+# One short transaction each, run again from the start if the database
+# was too busy to take it (see sqlite_profile.retry_on_busy).
+
+@retry_on_busy
+def enroll_student(student_id, section_id, admin_id):
+    """
+    Claim a seat and enroll the student, in one transaction.
+    Returns True when enrolled, False when the section is full.
+    """
+    with transaction.atomic():
+        if not claim_seat(section_id):
+            return False
+        Enrollment.objects.create(student_id=student_id, section_id=section_id, admin_id=admin_id)
+    return True
+
+
+@retry_on_busy
+def join_waitlist(student_id, section):
+    """
+    Add the student to the tail of the section's waitlist (created on
+    demand). Returns False when the waitlist is full.
+    """
+    with transaction.atomic():
+        waitlist = get_or_create_section_waitlist(section)
+        if not claim_waitlist_space(waitlist.pk):
+            return False
+        Wait.objects.create(student_id=student_id, waitlist=waitlist, admin_id=section.admin_id)
+    return True
+
+
+@retry_on_busy
+def drop_student(student_id, section_id):
+    """
+    Remove the student's enrollment and give its seat back.
+    Raises Enrollment.DoesNotExist if the student isn't enrolled.
+    """
+    with transaction.atomic():
+        enrollment = Enrollment.objects.select_for_update().get(student_id=student_id, section_id=section_id)
+        _, deleted = enrollment.delete()
+        # (deletes send no signals: see signals.py)
+        signals.rows_deleted(deleted, [student_id])
+        release_seat(section_id)
+
+
+@retry_on_busy
+def enroll_from_waitlist(wait_entry, admin_id):
+    """
+    Enroll a waiting student in a free seat of the section and remove the
+    entry (freeing a waitlist space). Returns False when the section is full
+    or the entry is gone (already promoted).
+    """
+    section_id = wait_entry.waitlist.section_id
+    with transaction.atomic():
+        # Removing the entry first turns a second promotion of it (another
+        # click, promote_waitlists) into a no-op
+        removed, deleted = Wait.objects.filter(pk=wait_entry.pk).delete()
+        if not removed:
+            return False
+        if not claim_seat(section_id):
+            transaction.set_rollback(True)
+            return False
+        Enrollment.objects.create(student_id=wait_entry.student_id, section_id=section_id, admin_id=admin_id)
+        signals.rows_deleted(deleted, [wait_entry.student_id])
+        Waitlist.objects.filter(pk=wait_entry.waitlist_id).update(spaces_left=F('spaces_left') + 1)
+    return True
+
+
+# -------------------------
+# Waitlist promotion
+# -------------------------
+# Sections promoted per transaction by promote_waitlists()
+PROMOTION_BATCH_SIZE = 200
+
+
+def sections_to_promote(section_ids=None):
+    """
+    Ids of sections that have a free seat and at least one waiting student,
+    found with a single query.
+    """
+    sections = (
+        Section.objects
+        .filter(current_capacity__lt=F('total_capacity'))
+        .filter(Exists(Wait.objects.filter(waitlist__section_id=OuterRef('pk'))))
+    )
+    if section_ids is not None:
+        sections = sections.filter(id__in=section_ids)
+    return list(sections.order_by('id').values_list('id', flat=True))
+
+
+@retry_on_busy
+def _promote_batch(section_ids):
+    """Fill the free seats of the given sections from their waitlists (FIFO)."""
+    with transaction.atomic():
+        sections = list(
+            Section.objects
+            .select_for_update()
+            .filter(id__in=section_ids, current_capacity__lt=F('total_capacity'))
+            .only('id', 'total_capacity', 'current_capacity', 'admin_id')
+            .order_by('id')
+        )
+        free_seats = {
+            section.id: section.total_capacity - section.current_capacity
+            for section in sections
+        }
+        admin_by_section = {section.id: section.admin_id for section in sections}
+        if not free_seats:
+            return []
+
+        waiting = Wait.objects.filter(waitlist__section_id__in=free_seats)
+        enrolled = Exists(Enrollment.objects.filter(
+            student_id=OuterRef('student_id'), section_id=OuterRef('waitlist__section_id')
+        ))
+        # Entries of students enrolled some other way while waiting: dropped
+        # without taking a seat, and kept out of the ranking below so that
+        # they don't use up the rows of the students behind them
+        stale = list(waiting.filter(enrolled).values_list('id', 'student_id', 'waitlist_id'))
+
+        # Head of each section's waitlist, capped at the largest number of free seats
+        heads = list(
+            waiting
+            .filter(~enrolled)
+            .annotate(
+                queue_rank=Window(
+                    RowNumber(),
+                    partition_by=[F('waitlist__section_id')],
+                    order_by=[F('position').asc(), F('id').asc()],
+                )
+            )
+            .filter(queue_rank__lte=max(free_seats.values()))
+            .values_list('id', 'student_id', 'waitlist_id', 'waitlist__section_id', 'queue_rank')
+        )
+
+        promoted = []
+        removed_wait_ids = [wait_id for wait_id, _, _ in stale]
+        removed_students = [student_id for _, student_id, _ in stale]
+        seats_taken = defaultdict(int)
+        freed_spaces = defaultdict(int)
+        for _, _, waitlist_pk in stale:
+            freed_spaces[waitlist_pk] += 1
+        for wait_id, student_id, waitlist_pk, section_id, queue_rank in sorted(
+            heads, key=lambda h: (h[3], h[4])
+        ):
+            if seats_taken[section_id] >= free_seats[section_id]:
+                continue
+            removed_wait_ids.append(wait_id)
+            removed_students.append(student_id)
+            freed_spaces[waitlist_pk] += 1
+            seats_taken[section_id] += 1
+            promoted.append((student_id, section_id))
+
+        Enrollment.objects.bulk_create(
+            [
+                Enrollment(student_id=student_id, section_id=section_id,
+                           admin_id=admin_by_section[section_id])
+                for student_id, section_id in promoted
+            ],
+            batch_size=QUERY_CHUNK_SIZE,
+        )
+        table_stats.adjust(Enrollment, len(promoted))
+        dashboard_cache.invalidate(*(student_id for student_id, _ in promoted))
+        reports.mark_changed(Enrollment)
+        _, deleted = Wait.objects.filter(id__in=removed_wait_ids).delete()
+        signals.rows_deleted(deleted, removed_students)
+        for section_id, taken in seats_taken.items():
+            Section.objects.filter(id=section_id).update(current_capacity=F('current_capacity') + taken)
+        for waitlist_pk, freed in freed_spaces.items():
+            Waitlist.objects.filter(pk=waitlist_pk).update(
+                spaces_left=F('spaces_left') + freed
+            )
+
+    return promoted
+
+
+def promote_waitlists(section_ids=None, batch_size=PROMOTION_BATCH_SIZE):
+    """
+    Move waiting students into free seats, oldest entry first, across all
+    sections (or only `section_ids`). Sections are handled batch_size at a
+    time, each batch in its own transaction.
+    Returns the list of (student_id, section_id) pairs that were enrolled.
+    """
+    promoted = []
+    candidates = sections_to_promote(section_ids)
+    for batch in chunked(candidates, batch_size):
+        promoted.extend(_promote_batch(batch))
+    return promoted
+
+
+# -------------------------
+# Waitlist positions
+# -------------------------
+def waitlist_rank():
+    """
+    Subquery annotation giving a Wait entry's 1-based place in its waitlist:
+    the number of entries at or ahead of its position (an index range scan
+    on (waitlist, position), so gaps left by removed entries don't matter).
+    """
+    ahead = (
+        Wait.objects
+        .filter(waitlist_id=OuterRef('waitlist_id'), position__lte=OuterRef('position'))
+        .order_by()
+        .values('waitlist_id')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Subquery(ahead)
+
@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from .enrollment import enroll_batch
+from .models import EnrollmentRequest
+from .sqlite_profile import retry_on_busy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_POLL_INTERVAL = 1.0
+
+OPEN_STATUSES = (
+    EnrollmentRequest.STATUS_PENDING,
+    EnrollmentRequest.STATUS_PROCESSING,
+)
+
+
+def submit_enrollment_request(student_id, section_id):
+    """
+    Queue an enrollment intent and return its EnrollmentRequest (ticket).
+    A student who re-submits while a request is still open gets the same ticket.
+    """
+    existing = (
+        EnrollmentRequest.objects
+        .filter(student_id=student_id, section_id=section_id, status__in=OPEN_STATUSES)
+        .order_by('id')
+        .first()
+    )
+    if existing is not None:
+        return existing
+    return EnrollmentRequest.objects.create(student_id=student_id, section_id=section_id)
+
+
+@retry_on_busy
+def process_batch(batch_size=DEFAULT_BATCH_SIZE, shard=0, shards=1):
+    """
+    Claim up to batch_size pending requests and apply them in one transaction.
+
+    Sections are split across `shards` workers (section_id % shards), so
+    workers running side by side never contend for the same Section rows.
+    Returns the number of requests processed.
+    """
+    token = uuid.uuid4()
+
+    with transaction.atomic():
+        pending = EnrollmentRequest.objects.filter(status=EnrollmentRequest.STATUS_PENDING)
+        if shards > 1:
+            pending = pending.annotate(shard=Mod('section_id', shards)).filter(shard=shard)
+        pending_ids = list(pending.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not pending_ids:
+            return 0
+
+        # Conditional claim: a request another worker already took is skipped
+        EnrollmentRequest.objects.filter(
+            id__in=pending_ids,
+            status=EnrollmentRequest.STATUS_PENDING,
+        ).update(status=EnrollmentRequest.STATUS_PROCESSING, claim_token=token)
+
+        claimed = list(
+            EnrollmentRequest.objects
+            .filter(claim_token=token)
+            .order_by('id')
+            .values_list('id', 'student_id', 'section_id')
+        )
+        results = enroll_batch(
+            [(student_id, section_id) for _, student_id, section_id in claimed]
+        )
+
+        # One UPDATE per distinct outcome instead of one per request
+        request_ids_by_outcome = defaultdict(list)
+        for (request_id, _, _), result in zip(claimed, results):
+            request_ids_by_outcome[(result.outcome, result.message)].append(request_id)
+
+        processed_at = timezone.now()
+        for (outcome, message), request_ids in request_ids_by_outcome.items():
+            EnrollmentRequest.objects.filter(id__in=request_ids).update(
+                status=outcome,
+                message=message,
+                processed_at=processed_at,
+            )
+
+    return len(claimed)
+
+
+def _has_pending(shard, shards):
+    pending = EnrollmentRequest.objects.filter(status=EnrollmentRequest.STATUS_PENDING)
+    if shards > 1:
+        pending = pending.annotate(shard=Mod('section_id', shards)).filter(shard=shard)
+    return pending.exists()
+
+
+def _worker_loop(shard, shards, batch_size, poll_interval, stop_event, once):
+    try:
+        while not stop_event.is_set():
+            try:
+                processed = process_batch(batch_size, shard, shards)
+            except Exception:
+                logger.exception("Enrollment queue worker %s failed to process a batch", shard)
+                processed = 0
+            if processed:
+                continue
+            if once and not _has_pending(shard, shards):
+                return
+            stop_event.wait(poll_interval)
+    finally:
+        # Each worker thread has its own DB connection
+        connection.close()
+
+
+def run_workers(workers=4, batch_size=DEFAULT_BATCH_SIZE,
+                poll_interval=DEFAULT_POLL_INTERVAL, once=False, stop_event=None):
+    """
+    Drain the queue with a pool of worker threads.
+    With once=True the call returns when the queue is empty; otherwise the
+    workers keep polling until stop_event is set.
+    """
+    stop_event = stop_event or threading.Event()
+    threads = [
+        threading.Thread(
+            target=_worker_loop,
+            args=(shard, workers, batch_size, poll_interval, stop_event, once),
+            name=f"enrollment-queue-{shard}",
+            daemon=True,
+        )
+        for shard in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
@@ -54,4 +54,41 @@ class AdminCreateCourseForm(forms.Form):
     #         self.fields['instructor'].queryset = Instructor.objects.filter(department_id=department_id)
     #     else:
     #         # Initially empty queryset until department is selected
-    #         self.fields['instructor'].queryset = Instructor.objects.none()
\ No newline at end of file
+    #         self.fields['instructor'].queryset = Instructor.objects.none()
+
+
+class AdminBulkEnrollForm(forms.Form):
+    file = forms.FileField(label="Enrollments file (CSV or JSON)")
+    no_waitlist = forms.BooleanField(
+        required=False,
+        label="Reject requests for full sections instead of waitlisting them"
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label="Dry run (report only, save nothing)"
+    )
+
+
+class InstructorGradeImportForm(forms.Form):
+    file = forms.FileField(label="Grade sheet (CSV)")
+
+
+# -------------------------
+# Tables Menu Forms
+# -------------------------
+class PopulateTablesForm(forms.Form):
+    scale = forms.FloatField(
+        required=False,
+        min_value=0.001,
+        label="Synthetic data scale (optional; 1.0 = 10,000 students)"
+    )
+
+
+class SaveSnapshotForm(forms.Form):
+    name = forms.RegexField(
+        regex=r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$",
+        max_length=64,
+        label="Snapshot name",
+        error_messages={"invalid": "Use letters, digits, '.', '_' and '-'."}
+    )
+    overwrite = forms.BooleanField(required=False, label="Replace an existing snapshot of this name")
@@ -0,0 +1,140 @@
+import math
+from decimal import Decimal
+
+from django.db.models import Max, Min
+
+from . import grade_summary
+from .models import Grade
+
+try:
+    import numpy
+except ImportError:  # optional: percentiles fall back to pure Python
+    numpy = None
+
+TWO_PLACES = Decimal('0.01')
+
+
+def _decimal(value):
+    # SQLite may hand back floats for aggregates over decimal columns
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+# -------------------------
+# Moments (from the grade summary table)
+# -------------------------
+def course_grade_stats(field='final_grade', course_ids=None):
+    """
+    Count, min, max, mean, population variance and standard deviation of one
+    grade column for every course. Count/mean/variance/std dev come from the
+    maintained count, sum and sum of squares in GradeSummary; min and max from
+    one grouped MIN/MAX query. NULL grades are ignored; courses without any
+    non-NULL grade are left out.
+
+    Returns a list of dicts ordered by course code, with values rounded to
+    two decimals (variance and stddev are 0 for a single grade).
+    """
+    moments = grade_summary.course_stats((field,), course_ids=course_ids)
+
+    grades = Grade.objects.filter(**{f'{field}__isnull': False})
+    if course_ids is not None:
+        grades = grades.filter(course_id__in=course_ids)
+    extremes = (
+        grades
+        .values('course_id', 'course__course_code')
+        .annotate(low=Min(field), high=Max(field))
+        .order_by('course__course_code')
+    )
+
+    rows = []
+    for row in extremes:
+        stats = moments.get(row['course_id'], {}).get(field)
+        if not stats or not stats['count']:
+            continue
+        rows.append({
+            "course_id": row['course_id'],
+            "course_code": row['course__course_code'],
+            "count": stats['count'],
+            "min_grade": _decimal(row['low']).quantize(TWO_PLACES),
+            "max_grade": _decimal(row['high']).quantize(TWO_PLACES),
+            "avg_grade": stats['mean'],
+            "var_grade": stats['variance'],
+            "stddev_grade": stats['stddev'],
+        })
+    return rows
+
+
+# -------------------------
+# Percentiles (full columns)
+# -------------------------
+DEFAULT_PERCENTILES = (25, 50, 75)
+
+
+def _percentiles(values, percentiles):
+    """Linear-interpolation percentiles of a list (same method as NumPy's default)."""
+    values = sorted(values)
+    if not values:
+        return [None] * len(percentiles)
+    result = []
+    for p in percentiles:
+        k = (len(values) - 1) * p / 100
+        lo, hi = math.floor(k), math.ceil(k)
+        result.append(values[lo] + (values[hi] - values[lo]) * (k - lo))
+    return result
+
+
+def course_grade_percentiles(fields=Grade.GRADE_FIELDS, percentiles=DEFAULT_PERCENTILES, course_ids=None):
+    """
+    Percentiles (the 50th is the median) of each grade column per course.
+
+    Unlike course_grade_stats() this needs every grade value, so the columns
+    are streamed course by course and, when NumPy is installed, reduced as
+    float arrays with nanpercentile (NULLs become NaN and are skipped).
+    Returns {course_code: {field: [value per percentile]}} with values
+    rounded to two decimals, or None where a column has no grades.
+    """
+    grades = Grade.objects.all()
+    if course_ids is not None:
+        grades = grades.filter(course_id__in=course_ids)
+    rows = (
+        grades
+        .order_by('course__course_code')
+        .values_list('course__course_code', *fields)
+        .iterator(chunk_size=2000)
+    )
+
+    result = {}
+
+    def reduce(code, block):
+        if numpy is not None:
+            array = numpy.array(block, dtype=float)  # None -> nan
+            stats = {}
+            for i, field in enumerate(fields):
+                column = array[:, i]
+                if numpy.isnan(column).all():
+                    stats[field] = [None] * len(percentiles)
+                else:
+                    stats[field] = [
+                        round(float(v), 2) for v in numpy.nanpercentile(column, percentiles)
+                    ]
+        else:
+            stats = {
+                field: [
+                    None if v is None else round(v, 2)
+                    for v in _percentiles(
+                        [float(r[i]) for r in block if r[i] is not None], percentiles
+                    )
+                ]
+                for i, field in enumerate(fields)
+            }
+        result[code] = stats
+
+    code, block = None, []
+    for row in rows:
+        if row[0] != code and block:
+            reduce(code, block)
+            block = []
+        code = row[0]
+        block.append([numpy.nan if v is None and numpy is not None else v for v in row[1:]])
+    if block:
+        reduce(code, block)
+    return result
@@ -0,0 +1,254 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Grade, GradeSummary, Section
+
+GRADE_FIELDS = Grade.GRADE_FIELDS
+
+TWO_PLACES = Decimal('0.01')
+
+# -------------------------
+# Grade summary maintenance
+# -------------------------
+# GradeSummary holds, per section and grade column, the number of non-NULL
+# grades, their sum and their sum of squares. Writers collect the change of
+# each Grade row as a delta and apply() adds the deltas with one UPDATE per
+# touched section, inside the writer's transaction:
+#   - single-row saves: signals.py (old values come from snapshot(), or are
+#     read back before the save)
+#   - grades.save_section_grades() / import_section_csv(): explicit calls
+# Deleted grades are not tracked row by row: signals.delete_rows() recounts
+# the sections that lost grades with recount().
+# Raw queryset .update() calls on Grade, and deletes that don't go through
+# delete_rows() (shell, raw SQL), bypass this; run
+# `python manage.py rebuild_grade_summary` after such maintenance.
+
+
+def values_of(grade):
+    """The grade columns of a Grade instance as a tuple."""
+    return tuple(getattr(grade, field) for field in GRADE_FIELDS)
+
+
+def snapshot(grade):
+    """
+    Remember the section and grade values as saved, so that a later save of
+    the same instance can be turned into a delta without re-reading the
+    row. Deferred columns are not loaded just for this (the snapshot is
+    then None and the old values are read when needed).
+    """
+    if all(field in grade.__dict__ for field in ('section_id', *GRADE_FIELDS)):
+        grade._summary_snapshot = (grade.section_id, values_of(grade))
+    else:
+        grade._summary_snapshot = None
+
+
+def stored_values(grade):
+    """(section_id, values) of the grade row as stored, or None for a new row."""
+    if grade._state.adding:
+        return None
+    if getattr(grade, '_summary_snapshot', None) is not None:
+        return grade._summary_snapshot
+    row = (
+        Grade.objects
+        .filter(pk=grade.pk)
+        .values_list('section_id', *GRADE_FIELDS)
+        .first()
+    )
+    return (row[0], row[1:]) if row else None
+
+
+class Deltas:
+    """Accumulates count/sum/sum-of-squares changes per section and column."""
+
+    def __init__(self):
+        # section_id -> {column name: delta}
+        self.by_section = defaultdict(lambda: defaultdict(Decimal))
+
+    def add(self, section_id, old, new):
+        """Record one grade row changing from `old` to `new` (tuples or None)."""
+        old = old or (None,) * len(GRADE_FIELDS)
+        new = new or (None,) * len(GRADE_FIELDS)
+        changes = self.by_section[section_id]
+        for field, before, after in zip(GRADE_FIELDS, old, new):
+            if before == after:
+                continue
+            if before is not None:
+                before = Decimal(str(before))
+                changes[f'{field}_count'] -= 1
+                changes[f'{field}_sum'] -= before
+                changes[f'{field}_sumsq'] -= before * before
+            if after is not None:
+                after = Decimal(str(after))
+                changes[f'{field}_count'] += 1
+                changes[f'{field}_sum'] += after
+                changes[f'{field}_sumsq'] += after * after
+
+
+def apply(deltas):
+    """
+    Add the collected deltas to GradeSummary (creating missing rows).
+    Call inside the transaction that wrote the grades.
+    """
+    touched = {
+        section_id: {column: value for column, value in changes.items() if value}
+        for section_id, changes in deltas.by_section.items()
+    }
+    touched = {section_id: changes for section_id, changes in touched.items() if changes}
+    if not touched:
+        return
+
+    with transaction.atomic():
+        existing = set(
+            GradeSummary.objects.filter(section_id__in=touched).values_list('section_id', flat=True)
+        )
+        # Only additions need a new row: a missing row with nothing but
+        # removals means the section (and its summary) is being deleted
+        missing = [
+            section_id for section_id, changes in touched.items()
+            if section_id not in existing
+            and any(changes.get(f'{field}_count', 0) > 0 for field in GRADE_FIELDS)
+        ]
+        if missing:
+            GradeSummary.objects.bulk_create(
+                [
+                    GradeSummary(section_id=section_id, course_id=course_id)
+                    for section_id, course_id in (
+                        Section.objects.filter(id__in=missing).values_list('id', 'course_id')
+                    )
+                ],
+                ignore_conflicts=True,
+            )
+        for section_id, changes in touched.items():
+            GradeSummary.objects.filter(section_id=section_id).update(
+                **{column: F(column) + value for column, value in changes.items()}
+            )
+
+
+def _summaries(grades):
+    """Unsaved GradeSummary rows for the grades (one grouped query)."""
+    aggregates = {}
+    for field in GRADE_FIELDS:
+        square = ExpressionWrapper(
+            F(field) * F(field), output_field=DecimalField(max_digits=20, decimal_places=4)
+        )
+        aggregates[f'{field}_count'] = Count(field)
+        aggregates[f'{field}_sum'] = Coalesce(
+            Sum(field), 0, output_field=DecimalField(max_digits=14, decimal_places=2)
+        )
+        aggregates[f'{field}_sumsq'] = Coalesce(
+            Sum(square), 0, output_field=DecimalField(max_digits=20, decimal_places=4)
+        )
+
+    rows = (
+        grades
+        .values('section_id', 'section__course_id')
+        .annotate(**aggregates)
+        .order_by()
+    )
+    return [
+        GradeSummary(
+            section_id=row.pop('section_id'),
+            course_id=row.pop('section__course_id'),
+            **row,
+        )
+        for row in rows
+    ]
+
+
+def rebuild():
+    """
+    Recompute the whole summary table from the Grade table and replace its
+    contents. Returns the number of section rows.
+    """
+    with transaction.atomic():
+        GradeSummary.objects.all().delete()
+        summaries = GradeSummary.objects.bulk_create(_summaries(Grade.objects.all()), batch_size=500)
+    return len(summaries)
+
+
+def recount(section_ids):
+    """
+    Recompute the summary rows of the given sections from their grades
+    (after grades were deleted). Call inside the writer's transaction.
+    """
+    section_ids = set(section_ids)
+    if not section_ids:
+        return
+    with transaction.atomic():
+        GradeSummary.objects.filter(section_id__in=section_ids).delete()
+        GradeSummary.objects.bulk_create(
+            _summaries(Grade.objects.filter(section_id__in=section_ids)), batch_size=500
+        )
+
+
+# -------------------------
+# Reading statistics
+# -------------------------
+def moments(count, total, total_sq):
+    """
+    (mean, population variance, std dev) from count/sum/sum of squares,
+    rounded to two decimals; (None, None, None) when count is 0. Variance
+    and std dev of a single grade are 0.
+    """
+    if not count:
+        return None, None, None
+    total = Decimal(str(total)) if not isinstance(total, Decimal) else total
+    total_sq = Decimal(str(total_sq)) if not isinstance(total_sq, Decimal) else total_sq
+    mean = total / count
+    if count == 1:
+        return mean.quantize(TWO_PLACES), 0, 0
+    variance = max(total_sq / count - mean * mean, Decimal(0))
+    return mean.quantize(TWO_PLACES), variance.quantize(TWO_PLACES), variance.sqrt().quantize(TWO_PLACES)
+
+
+def _stats(row, fields):
+    stats = {}
+    for field in fields:
+        count = row[f'{field}_count']
+        mean, variance, stddev = moments(count, row[f'{field}_sum'], row[f'{field}_sumsq'])
+        stats[field] = {"count": count, "mean": mean, "variance": variance, "stddev": stddev}
+    return stats
+
+
+def _columns(fields):
+    return [f'{field}_{part}' for field in fields for part in ('count', 'sum', 'sumsq')]
+
+
+def section_stats(section_ids, fields=GRADE_FIELDS):
+    """
+    {section_id: {field: {count, mean, variance, stddev}}} for the given
+    sections, read from their summary rows (sections without grades are
+    left out).
+    """
+    rows = (
+        GradeSummary.objects
+        .filter(section_id__in=section_ids)
+        .values('section_id', *_columns(fields))
+    )
+    return {row['section_id']: _stats(row, fields) for row in rows}
+
+
+def course_stats(fields=GRADE_FIELDS, course_ids=None):
+    """
+    {course_id: {field: {count, mean, variance, stddev}}}, adding up the
+    summary rows of each course's sections.
+    """
+    summaries = GradeSummary.objects.all()
+    if course_ids is not None:
+        summaries = summaries.filter(course_id__in=course_ids)
+    rows = (
+        summaries
+        .values('course_id')
+        .annotate(**{f'total_{column}': Sum(column) for column in _columns(fields)})
+        .order_by()
+    )
+    return {
+        row['course_id']: _stats(
+            {column: row[f'total_{column}'] for column in _columns(fields)}, fields
+        )
+        for row in rows
+    }
@@ -0,0 +1,266 @@
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+
+from . import dashboard_cache, grade_summary, reports, table_stats
+from .enrollment import QUERY_CHUNK_SIZE
+from .models import Enrollment, Grade, GradeSummary
+
+GRADE_FIELDS = Grade.GRADE_FIELDS
+
+GRADE_MIN = Decimal('0')
+GRADE_MAX = Decimal('100')
+
+
+# -------------------------
+# Parsing
+# -------------------------
+def parse_grade(raw):
+    """
+    Parse a submitted grade. Blank means "no grade" (None).
+    Returns (value, error); error is a message string or None.
+    """
+    raw = (raw or '').strip()
+    if raw == '':
+        return None, None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        return None, f"'{raw}' is not a number."
+    if not value.is_finite():
+        return None, f"'{raw}' is not a number."
+    if value < GRADE_MIN or value > GRADE_MAX:
+        return None, f"{raw} is outside {GRADE_MIN}-{GRADE_MAX}."
+    if value != value.quantize(Decimal('0.01')):
+        return None, f"{raw} has more than two decimal places."
+    return value.quantize(Decimal('0.01')), None
+
+
+# -------------------------
+# Batched writes
+# -------------------------
+def save_section_grades(section, submitted):
+    """
+    Store the grades of one section in a single transaction.
+
+    submitted maps student_id -> {field: Decimal or None} (fields from
+    GRADE_FIELDS; missing fields keep their stored value). Values are
+    compared with what is stored: new rows go into one bulk_create, changed
+    rows into one bulk_update, unchanged rows are not written at all.
+    Returns (created, updated) counts.
+    """
+    with transaction.atomic():
+        stored = {
+            grade.student_id: grade
+            for grade in Grade.objects.select_for_update().filter(section_id=section.id)
+        }
+
+        to_create = []
+        to_update = []
+        deltas = grade_summary.Deltas()
+        for student_id, values in submitted.items():
+            grade = stored.get(student_id)
+            if grade is None:
+                if any(values.get(field) is not None for field in GRADE_FIELDS):
+                    grade = Grade(
+                        student_id=student_id,
+                        section_id=section.id,
+                        course_id=section.course_id,
+                        admin_id=section.admin_id,
+                        **{field: values.get(field) for field in GRADE_FIELDS},
+                    )
+                    to_create.append(grade)
+                    deltas.add(section.id, None, grade_summary.values_of(grade))
+                continue
+            before = grade_summary.values_of(grade)
+            changed = False
+            for field in GRADE_FIELDS:
+                if field in values and getattr(grade, field) != values[field]:
+                    setattr(grade, field, values[field])
+                    changed = True
+            if changed:
+                to_update.append(grade)
+                deltas.add(section.id, before, grade_summary.values_of(grade))
+
+        if to_create:
+            Grade.objects.bulk_create(to_create)
+            table_stats.adjust(Grade, len(to_create))
+        if to_update:
+            Grade.objects.bulk_update(to_update, GRADE_FIELDS)
+        grade_summary.apply(deltas)
+        dashboard_cache.invalidate(*(grade.student_id for grade in to_create + to_update))
+        if to_create or to_update:
+            reports.mark_changed(Grade, GradeSummary)
+
+    return len(to_create), len(to_update)
+
+
+# -------------------------
+# CSV export / import
+# -------------------------
+# One row per enrolled student. Import matches students by student_id (or
+# student_email when student_id is blank); grade columns that are left out
+# of the file keep their stored values, blank cells clear the grade.
+
+CSV_FIELDS = ['student_id', 'student_email', 'first_name', 'last_name', *GRADE_FIELDS]
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Stop collecting import errors after this many (the import is rejected anyway)
+IMPORT_ERROR_LIMIT = 50
+
+
+class GradeImportError(ValueError):
+    """The uploaded grade file is not a CSV with the expected header."""
+
+
+class _Echo:
+    """File-like object whose write() returns the value (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def export_section_csv(section):
+    """
+    Yield the section's grade sheet as CSV lines, reading enrollments in
+    chunks so memory use doesn't depend on the section size.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_FIELDS)
+    rows = (
+        Enrollment.objects
+        .filter(section_id=section.id)
+        .annotate(
+            section_grade=FilteredRelation(
+                'student__grades',
+                condition=Q(student__grades__section_id=section.id),
+            )
+        )
+        .order_by('id')
+        .values_list(
+            'student_id', 'student__email', 'student__first_name', 'student__last_name',
+            *(f'section_grade__{field}' for field in GRADE_FIELDS),
+        )
+    )
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield writer.writerow(['' if value is None else value for value in row])
+
+
+def import_section_csv(section, lines):
+    """
+    Apply a grade sheet (an iterable of CSV text lines, e.g. a decoded upload
+    stream) to one section in a single transaction, using bulk upserts on
+    Grade's (section, student) unique constraint.
+
+    Returns (created, updated, errors); rows that change nothing count as
+    neither. errors lists "Row N: ..." messages; if there are any, nothing
+    is saved.
+    """
+    reader = csv.DictReader(lines)
+    header = [name.strip() for name in (reader.fieldnames or [])]
+    if 'student_id' not in header and 'student_email' not in header:
+        raise GradeImportError("The file needs a student_id or student_email column.")
+    reader.fieldnames = header
+    columns = [field for field in GRADE_FIELDS if field in header]
+    if not columns:
+        raise GradeImportError(f"The file has none of the grade columns: {', '.join(GRADE_FIELDS)}.")
+
+    enrolled = dict(
+        Enrollment.objects
+        .filter(section_id=section.id)
+        .values_list('student__email', 'student_id')
+    )
+    enrolled = {email.lower(): student_id for email, student_id in enrolled.items()}
+    enrolled_ids = set(enrolled.values())
+
+    errors = []
+    created = updated = 0
+    seen = set()
+    written = []
+
+    def flush(batch):
+        Grade.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['section', 'student'],
+            update_fields=columns,
+        )
+
+    with transaction.atomic():
+        # student_id -> stored grade values (for the summary deltas)
+        graded = {
+            row[0]: row[1:]
+            for row in Grade.objects.filter(section_id=section.id).values_list('student_id', *GRADE_FIELDS)
+        }
+        deltas = grade_summary.Deltas()
+        batch = []
+        for row_number, row in enumerate(reader, start=2):  # row 1 is the header
+            student_id = (row.get('student_id') or '').strip()
+            if student_id:
+                student_id = int(student_id) if student_id.isdigit() else None
+            else:
+                student_id = enrolled.get((row.get('student_email') or '').strip().lower())
+
+            row_errors = []
+            if student_id not in enrolled_ids:
+                row_errors.append("student is not enrolled in this section.")
+            elif student_id in seen:
+                row_errors.append("student appears more than once.")
+            values = {}
+            for field in columns:
+                value, error = parse_grade(row.get(field))
+                if error:
+                    row_errors.append(f"{field}: {error}")
+                values[field] = value
+
+            if row_errors:
+                if len(errors) < IMPORT_ERROR_LIMIT:
+                    errors.append(f"Row {row_number}: {' '.join(row_errors)}")
+                continue
+            seen.add(student_id)
+            if errors:
+                continue  # keep validating, but stop writing
+
+            before = graded.get(student_id)
+            # Columns missing from the file keep their stored values
+            after = tuple(
+                values[field] if field in values else (before[i] if before else None)
+                for i, field in enumerate(GRADE_FIELDS)
+            )
+            if before is None and all(value is None for value in after):
+                continue  # no grade yet and none given (as in the form)
+            if before is not None and tuple(before) == after:
+                continue  # unchanged rows are not written (as in the form)
+            if before is not None:
+                updated += 1
+            else:
+                created += 1
+            written.append(student_id)
+            deltas.add(section.id, before, after)
+            batch.append(Grade(
+                student_id=student_id,
+                section_id=section.id,
+                course_id=section.course_id,
+                admin_id=section.admin_id,
+                **values,
+            ))
+            if len(batch) >= QUERY_CHUNK_SIZE:
+                flush(batch)
+                batch = []
+
+        if errors:
+            transaction.set_rollback(True)
+            return 0, 0, errors
+
+        if batch:
+            flush(batch)
+        grade_summary.apply(deltas)
+        table_stats.adjust(Grade, created)
+        dashboard_cache.invalidate(*written)
+        if written:
+            reports.mark_changed(Grade, GradeSummary)
+
+    return created, updated, errors
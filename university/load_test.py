@@ -0,0 +1,417 @@
+import logging
+import math
+import random
+import subprocess
+import threading
+import time
+import uuid
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, connection, transaction
+from django.db.models import Exists, OuterRef
+from django.test import Client
+from django.urls import reverse
+
+from . import sqlite_profile, table_stats
+from .enrollment import DEFAULT_WAITLIST_SPACES
+from .grades import GRADE_FIELDS
+from .models import (
+    Admin,
+    Course,
+    Department,
+    Enrollment,
+    Instructor,
+    Section,
+    Student,
+    Wait,
+)
+from .reconcile import over_capacity_sections, section_drift, waitlist_drift
+from .signals import delete_rows
+from .view_checks import capture_queries
+
+# -------------------------
+# Registration-rush load test
+# -------------------------
+# Drives the real views with Django test clients from a pool of threads
+# (one client and one database connection per simulated user thread):
+#
+#   rush:  every simulated student POSTs an add for the same small "hot"
+#          section at once (the over-enrollment scenario of claim_seat);
+#   mixed: students browse, add, drop and check their dashboard while
+#          instructors load and save their grade sheets.
+#
+# The run works on its own fixture (tagged course/sections/students created
+# up front and deleted afterwards), so it can be pointed at any seeded
+# database. Used by `python manage.py load_test`.
+
+LoadTestParams = namedtuple(
+    "LoadTestParams",
+    "students threads sections section_capacity hot_capacity iterations "
+    "instructors seed keep",
+)
+
+Sample = namedtuple("Sample", "endpoint seconds queries error")
+
+# Share of each student action in the mixed phase
+MIXED_ACTIONS = (
+    ("student_available_courses", 30),
+    ("student_add_course", 25),
+    ("student_dashboard", 30),
+    ("student_drop_course", 15),
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+class LoadTestError(Exception):
+    """The database can't host the load-test fixture."""
+
+
+# ---- Fixture ----
+Fixture = namedtuple("Fixture", "tag instructor_ids section_ids hot_section student_ids")
+
+
+def create_fixture(params):
+    """
+    Create the run's instructors, one-section courses (the first is the hot
+    section) and students, tagged so they can be removed afterwards.
+    """
+    admin = Admin.objects.order_by("id").first()
+    department = Department.objects.order_by("id").first()
+    if admin is None or department is None:
+        raise LoadTestError("The database needs an admin and a department (run seed_mock_data).")
+
+    tag = uuid.uuid4().hex[:6]
+    with transaction.atomic():
+        instructors = [
+            Instructor.objects.create(
+                first_name="Load", last_name=f"Instructor {i + 1}",
+                email=f"load.{tag}.instructor{i + 1}@example.invalid", password="load",
+                department=department, admin=admin,
+            )
+            for i in range(params.instructors)
+        ]
+        sections = []
+        for i in range(params.sections):
+            course = Course.objects.create(
+                course_code=f"LT{tag}-{i + 1}", course_name=f"Load test course {i + 1}",
+                department=department, admin=admin,
+            )
+            sections.append(Section.objects.create(
+                course=course, section_number=1, term="Load Test",
+                total_capacity=params.hot_capacity if i == 0 else params.section_capacity,
+                current_capacity=0, instructor=instructors[i % len(instructors)], admin=admin,
+            ))
+        students = Student.objects.bulk_create([
+            Student(
+                email=f"load.{tag}.{n}@example.invalid", password="load",
+                first_name="Load", last_name=f"Student {n}", admin=admin,
+            )
+            for n in range(1, params.students + 1)
+        ])
+        table_stats.adjust(Student, len(students))
+    if not students or students[0].pk is None:
+        students = Student.objects.filter(email__startswith=f"load.{tag}.").order_by("id")
+    return Fixture(
+        tag=tag,
+        instructor_ids=[instructor.id for instructor in instructors],
+        section_ids=[section.id for section in sections],
+        hot_section=sections[0].id,
+        student_ids=[student.id for student in students],
+    )
+
+
+def delete_fixture(fixture):
+    """Remove everything the run created (sections first: grades protect courses)."""
+    with transaction.atomic():
+        delete_rows(Section.objects.filter(id__in=fixture.section_ids))
+        delete_rows(Course.objects.filter(course_code__startswith=f"LT{fixture.tag}-"))
+        delete_rows(Student.objects.filter(id__in=fixture.student_ids))
+        delete_rows(Instructor.objects.filter(id__in=fixture.instructor_ids))
+
+
+# ---- Measuring requests ----
+def _is_lock_error(exc):
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message or "lock timeout" in message or "deadlock" in message
+
+
+def _request(client, samples, endpoint, method, url, data=None):
+    """Send one request and record its latency, query count and error (if any)."""
+    error = None
+    started = time.perf_counter()
+    with capture_queries() as queries:
+        try:
+            response = getattr(client, method)(url, data or {})
+            if response.status_code >= 500:
+                error = f"HTTP {response.status_code}"
+        except OperationalError as exc:
+            error = "lock" if _is_lock_error(exc) else f"{type(exc).__name__}: {exc}"
+        except DatabaseError as exc:
+            error = f"{type(exc).__name__}: {exc}"
+    samples.append(Sample(endpoint, time.perf_counter() - started, len(queries), error))
+
+
+def _client(role, user_id):
+    client = Client()
+    session = client.session
+    session[f"{role}_id"] = user_id
+    session.save()
+    return client
+
+
+def _run_workers(worker, chunks):
+    """Run worker(chunk, samples) in one thread per chunk; return all samples and the wall time."""
+    results = [[] for _ in chunks]
+
+    def run(index):
+        try:
+            worker(chunks[index], results[index])
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        for future in [pool.submit(run, index) for index in range(len(chunks))]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    return [sample for result in results for sample in result], elapsed
+
+
+def _chunks(items, count):
+    count = max(1, min(count, len(items)))
+    return [items[i::count] for i in range(count)]
+
+
+# ---- Phases ----
+def rush_phase(fixture, params):
+    """Every student adds the hot section, all threads released at once."""
+    url = reverse("student_add_course", args=[fixture.hot_section])
+    chunks = _chunks(fixture.student_ids, params.threads)
+    start = threading.Barrier(len(chunks))
+
+    def worker(student_ids, samples):
+        clients = [_client("student", student_id) for student_id in student_ids]
+        start.wait()
+        for client in clients:
+            _request(client, samples, "student_add_course", "post", url)
+
+    return _run_workers(worker, chunks)
+
+
+def mixed_phase(fixture, params):
+    """Students browse/add/drop/check dashboards while instructors grade."""
+    actions = [name for name, _ in MIXED_ACTIONS]
+    weights = [weight for _, weight in MIXED_ACTIONS]
+    open_sections = fixture.section_ids[1:] or fixture.section_ids
+    sections_by_instructor = defaultdict(list)
+    for section_id, instructor_id in Section.objects.filter(
+        id__in=fixture.section_ids
+    ).values_list("id", "instructor_id"):
+        sections_by_instructor[instructor_id].append(section_id)
+
+    def student_worker(student_ids, samples):
+        rng = random.Random(f"{params.seed}:{student_ids[0]}")
+        clients = {student_id: _client("student", student_id) for student_id in student_ids}
+        enrolled = defaultdict(set)  # what this worker believes (the views decide)
+        for _ in range(params.iterations):
+            for student_id, client in clients.items():
+                action = rng.choices(actions, weights)[0]
+                if action == "student_add_course":
+                    section_id = rng.choice(open_sections)
+                    _request(client, samples, action, "post", reverse(action, args=[section_id]))
+                    enrolled[student_id].add(section_id)
+                elif action == "student_drop_course" and enrolled[student_id]:
+                    section_id = rng.choice(sorted(enrolled[student_id]))
+                    _request(client, samples, action, "post", reverse(action, args=[section_id]))
+                    enrolled[student_id].discard(section_id)
+                elif action == "student_drop_course":
+                    _request(client, samples, "student_dashboard", "get", reverse("student_dashboard"))
+                else:
+                    _request(client, samples, action, "get", reverse(action))
+
+    def instructor_worker(instructor_ids, samples):
+        rng = random.Random(f"{params.seed}:instructor:{instructor_ids[0]}")
+        for instructor_id in instructor_ids:
+            client = _client("instructor", instructor_id)
+            for _ in range(params.iterations):
+                for section_id in sections_by_instructor[instructor_id]:
+                    url = reverse("instructor_edit_grades", args=[section_id])
+                    _request(client, samples, "instructor_edit_grades", "get", url)
+                    data = {
+                        f"{field}_{enrollment_id}": f"{rng.uniform(50, 100):.2f}"
+                        for enrollment_id in Enrollment.objects.filter(
+                            section_id=section_id
+                        ).values_list("id", flat=True)
+                        for field in GRADE_FIELDS
+                    }
+                    _request(client, samples, "instructor_edit_grades (save)", "post", url, data)
+
+    student_chunks = _chunks(fixture.student_ids, max(1, params.threads - params.instructors))
+    instructor_chunks = _chunks(fixture.instructor_ids, params.instructors)
+    workers = [(student_worker, chunk) for chunk in student_chunks] + [
+        (instructor_worker, chunk) for chunk in instructor_chunks
+    ]
+    return _run_workers(lambda job, samples: job[0](job[1], samples), workers)
+
+
+# ---- Results ----
+def _percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """Throughput, latency percentiles (ms), queries and errors, overall and per endpoint."""
+
+    def stats(group):
+        latencies = sorted(sample.seconds * 1000 for sample in group)
+        queries = [sample.queries for sample in group]
+        errors = [sample.error for sample in group if sample.error]
+        return {
+            "requests": len(group),
+            "throughput_rps": round(len(group) / elapsed, 2) if elapsed else None,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies), 2) if latencies else None,
+                **{f"p{p}": round(_percentile(latencies, p), 2) if latencies else None for p in PERCENTILES},
+                "max": round(latencies[-1], 2) if latencies else None,
+            },
+            "queries_per_request": {
+                "mean": round(sum(queries) / len(queries), 2) if queries else None,
+                "max": max(queries) if queries else None,
+            },
+            "errors": len(errors),
+            "lock_errors": errors.count("lock"),
+            "error_samples": sorted(set(error for error in errors if error != "lock"))[:5],
+        }
+
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample)
+    return {
+        "seconds": round(elapsed, 3),
+        **stats(samples),
+        "endpoints": {name: stats(group) for name, group in sorted(by_endpoint.items())},
+    }
+
+
+def check_invariants(fixture, params, rush_adds=None):
+    """
+    Capacity invariants over the fixture's sections. Returns a list of
+    problems (empty when everything holds). With rush_adds (the number of
+    rush requests that completed without error), also check that the hot
+    section took exactly its seats plus a full waitlist.
+    """
+    problems = []
+    sections = Section.objects.filter(id__in=fixture.section_ids)
+    for row in section_drift().filter(id__in=fixture.section_ids).values("id", "current_capacity", "actual_current"):
+        problems.append(
+            f"Section {row['id']}: current_capacity {row['current_capacity']} but {row['actual_current']} enrollments."
+        )
+    for section_id in over_capacity_sections().filter(id__in=fixture.section_ids).values_list("id", flat=True):
+        problems.append(f"Section {section_id} has more enrollments than seats.")
+    for row in waitlist_drift().filter(section_id__in=fixture.section_ids).values("id", "spaces_left", "actual_spaces_left"):
+        problems.append(
+            f"Waitlist {row['id']}: spaces_left {row['spaces_left']} but should be {row['actual_spaces_left']}."
+        )
+    both = Wait.objects.filter(waitlist__section__in=sections).filter(
+        Exists(Enrollment.objects.filter(
+            student_id=OuterRef("student_id"), section_id=OuterRef("waitlist__section_id")
+        ))
+    ).count()
+    if both:
+        problems.append(f"{both} student(s) are both enrolled in and waitlisted for the same section.")
+
+    if rush_adds is not None:
+        enrolled = Enrollment.objects.filter(section_id=fixture.hot_section).count()
+        waiting = Wait.objects.filter(waitlist__section_id=fixture.hot_section).count()
+        expected = min(params.hot_capacity, rush_adds)
+        expected_waiting = min(DEFAULT_WAITLIST_SPACES, max(0, rush_adds - params.hot_capacity))
+        if enrolled != expected:
+            problems.append(f"Hot section: {enrolled} enrolled after the rush, expected {expected}.")
+        if waiting != expected_waiting:
+            problems.append(f"Hot section: {waiting} waitlisted after the rush, expected {expected_waiting}.")
+    return problems
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(params, log=None):
+    """Create the fixture, run both phases, check the invariants and return the results dict."""
+    log = log or (lambda message: None)
+    queued = getattr(settings, "UNIVERSITY_QUEUED_ENROLLMENT", False)
+    fixture = create_fixture(params)
+    log(f"Fixture {fixture.tag}: {len(fixture.student_ids)} students, {len(fixture.section_ids)} sections.")
+    results = {
+        "commit": _git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "database": {
+            "vendor": connection.vendor,
+            "options": dict(connection.settings_dict.get("OPTIONS", {})),
+            "pragmas": sqlite_profile.pragma_values() if connection.vendor == "sqlite" else None,
+            "transaction_mode": (connection.transaction_mode or "DEFERRED") if connection.vendor == "sqlite" else None,
+        },
+        "settings": {
+            "UNIVERSITY_QUEUED_ENROLLMENT": queued,
+            "UNIVERSITY_AUTO_PROMOTE_WAITLIST": getattr(settings, "UNIVERSITY_AUTO_PROMOTE_WAITLIST", True),
+        },
+        "params": params._asdict(),
+        "phases": {},
+        "invariants": {},
+    }
+    # Failed requests are counted per endpoint instead of logged one by one
+    request_logger = logging.getLogger("django.request")
+    request_logger_disabled = request_logger.disabled
+    request_logger.disabled = True
+    try:
+        samples, elapsed = rush_phase(fixture, params)
+        results["phases"]["rush"] = summarize(samples, elapsed)
+        # In queued mode the adds are only requests until a worker runs
+        problems = check_invariants(
+            fixture, params,
+            rush_adds=None if queued else sum(1 for sample in samples if not sample.error),
+        )
+        results["invariants"]["after_rush"] = problems
+        log(f"Rush: {len(samples)} requests in {elapsed:.2f}s, {len(problems)} invariant problem(s).")
+
+        if params.iterations:
+            samples, elapsed = mixed_phase(fixture, params)
+            results["phases"]["mixed"] = summarize(samples, elapsed)
+            problems = check_invariants(fixture, params)
+            results["invariants"]["after_mixed"] = problems
+            log(f"Mixed: {len(samples)} requests in {elapsed:.2f}s, {len(problems)} invariant problem(s).")
+    finally:
+        request_logger.disabled = request_logger_disabled
+        if not params.keep:
+            delete_fixture(fixture)
+    results["ok"] = not any(results["invariants"].values())
+    return results
+
+
+# ---- SQLite profile benchmark ----
+def benchmark(params, log=None):
+    """
+    Run the load test once with SQLite's defaults and once with the
+    configured profile (sqlite_profile), on the same database and fixture
+    sizes. Returns {"baseline": results, "profile": results}.
+    """
+    log = log or (lambda message: None)
+    runs = {}
+    for name, profile in (("baseline", sqlite_profile.BASELINE), ("profile", sqlite_profile.configured())):
+        log(f"-- {name} --")
+        with sqlite_profile.use_profile(profile):
+            runs[name] = run(params, log=log)
+    return runs
@@ -0,0 +1,86 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from university import load_test
+from university.view_checks import test_environment
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the registration-rush load test twice, with SQLite's default "
+        "settings and with the connection profile of university/sqlite_profile.py "
+        "(WAL, busy timeout, pragmas, busy retries), and compare throughput, "
+        "latency and lock errors. Prints both runs as JSON (or writes them to --output)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=200, help="Simulated students (default 200).")
+        parser.add_argument("--threads", type=int, default=16, help="Concurrent client threads (default 16).")
+        parser.add_argument("--sections", type=int, default=10,
+                            help="Sections in the test catalogue, the hot one included (default 10).")
+        parser.add_argument("--iterations", type=int, default=3,
+                            help="Actions per student in the mixed phase (default 3).")
+        parser.add_argument("--instructors", type=int, default=2,
+                            help="Instructor threads saving grade sheets (default 2).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the action mix.")
+        parser.add_argument("--output", default="-",
+                            help="JSON results file (default '-': stdout, with the comparison on stderr).")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The database isn't SQLite.")
+        if options["students"] < 1 or options["threads"] < 1 or options["sections"] < 1:
+            raise CommandError("--students, --threads and --sections must be at least 1.")
+        params = load_test.LoadTestParams(
+            students=options["students"],
+            threads=options["threads"],
+            sections=options["sections"],
+            section_capacity=40,
+            hot_capacity=50,
+            iterations=max(0, options["iterations"]),
+            instructors=max(1, options["instructors"]),
+            seed=options["seed"],
+            keep=False,
+        )
+        log = self.stderr.write if options["output"] == "-" else self.stdout.write
+        try:
+            with test_environment():
+                runs = load_test.benchmark(params, log=log)
+        except load_test.LoadTestError as exc:
+            raise CommandError(str(exc))
+
+        baseline, profile = runs["baseline"], runs["profile"]
+        for name, results in runs.items():
+            pragmas = results["database"]["pragmas"]
+            log(f"{name}: journal_mode={pragmas['journal_mode']} synchronous={pragmas['synchronous']} "
+                f"transaction_mode={results['database']['transaction_mode']}")
+        for phase, after in profile["phases"].items():
+            before = baseline["phases"][phase]
+            rows = [("requests/s", before["throughput_rps"], after["throughput_rps"])]
+            rows += [
+                (f"{key} latency (ms)", before["latency_ms"][key], after["latency_ms"][key])
+                for key in ("p50", "p95", "p99")
+            ]
+            rows += [
+                ("errors", before["errors"], after["errors"]),
+                ("lock errors", before["lock_errors"], after["lock_errors"]),
+            ]
+            log(f"{phase}: {'':18}{'baseline':>12}{'profile':>12}")
+            for label, old, new in rows:
+                log(f"  {label:24}{old!s:>12}{new!s:>12}")
+            if before["throughput_rps"] and after["throughput_rps"]:
+                log(f"  throughput x{after['throughput_rps'] / before['throughput_rps']:.2f}")
+
+        text = json.dumps(runs, indent=2, default=str)
+        if options["output"] == "-":
+            self.stdout.write(text)
+        else:
+            with open(options["output"], "w") as output:
+                output.write(text + "\n")
+            log(f"Results written to {options['output']}.")
+
+        if not profile["ok"]:
+            problems = [problem for phase in profile["invariants"].values() for problem in phase]
+            raise CommandError("Capacity invariants violated:\n  " + "\n  ".join(problems))
@@ -0,0 +1,84 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from university.bulk_enroll import (
+    BulkEnrollError,
+    bulk_enroll,
+    guess_format,
+    parse_rows,
+    summarize,
+    write_report_csv,
+)
+from university.models import Admin
+
+
+class Command(BaseCommand):
+    help = "Enroll (student, section) pairs from a CSV or JSON file in one transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON file with the enrollments ('-' for stdin).")
+        parser.add_argument(
+            "--format", choices=["csv", "json"],
+            help="Input format (default: guessed from the file extension, else csv).",
+        )
+        parser.add_argument(
+            "--admin", dest="admin_username",
+            help="Admin username recorded on the new rows (default: each section's admin).",
+        )
+        parser.add_argument(
+            "--no-waitlist", action="store_true",
+            help="Reject requests for full sections instead of waitlisting them.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would happen without saving anything.",
+        )
+        parser.add_argument(
+            "--report",
+            help="Write the per-row result report as CSV to this path ('-' for stdout).",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or guess_format(path)
+
+        try:
+            if path == "-":
+                text = sys.stdin.read()
+            else:
+                with open(path, encoding="utf-8-sig") as f:
+                    text = f.read()
+            rows = parse_rows(text, fmt)
+        except (OSError, BulkEnrollError) as exc:
+            raise CommandError(str(exc))
+
+        admin_id = None
+        if options["admin_username"]:
+            try:
+                admin_id = Admin.objects.get(username=options["admin_username"]).id
+            except Admin.DoesNotExist:
+                raise CommandError(f"Unknown admin: {options['admin_username']}")
+
+        report = bulk_enroll(
+            rows,
+            admin_id=admin_id,
+            use_waitlist=not options["no_waitlist"],
+            dry_run=options["dry_run"],
+        )
+
+        if options["report"] == "-":
+            write_report_csv(report, self.stdout)
+        elif options["report"]:
+            with open(options["report"], "w", newline="", encoding="utf-8") as f:
+                write_report_csv(report, f)
+
+        counts = summarize(report)
+        summary = ", ".join(
+            f"{counts.get(outcome, 0)} {outcome}"
+            for outcome in ("enrolled", "waitlisted", "rejected")
+        )
+        prefix = "[dry run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Processed {len(report)} row(s): {summary}."
+        ))
@@ -0,0 +1,159 @@
+import re
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import resolve
+
+from university import mock_data, urls
+from university.models import EnrollmentRequest
+from university.view_checks import LOCAL_CACHES, SCENARIOS, run_scenario, sample_ids, test_environment
+
+# Data added to the test database before each measurement (the second
+# round adds to the first). Every list the views show grows several-fold
+# between the two, so a query per row changes the count.
+SIZES = [
+    ("small", mock_data.params_for(
+        departments=2, instructors=4, courses=10, students=60,
+        sections_per_course=2, enrollments_per_student=2, seed=1,
+    )),
+    ("large", mock_data.params_for(
+        departments=3, instructors=12, courses=40, students=600,
+        sections_per_course=3, enrollments_per_student=6, seed=2,
+    )),
+]
+
+_IN_LIST = re.compile(r"\((?:%s, )*%s\)")
+_VALUES = re.compile(r"\(\.\.\.\)(?:, \(\.\.\.\))+")
+_LIMIT = re.compile(r" LIMIT \d+(?: OFFSET \d+)?$")
+_SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+
+
+def normalize(sql):
+    """
+    Query text for grouping: parameter lists and multi-row VALUES collapsed,
+    LIMIT (a page is only sliced once it is full) and savepoint ids dropped.
+    """
+    sql = _VALUES.sub("(...)", _IN_LIST.sub("(...)", sql))
+    return _SAVEPOINT.sub('"..."', _LIMIT.sub("", sql))
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay every view in university/urls.py (and the Django admin "
+        "changelists) against a throwaway test database seeded at two sizes. "
+        "Fails if a view's query count depends on the data size or exceeds "
+        "its budget, and prints the query breakdown."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--view", action="append", dest="views", metavar="NAME",
+            help="Only check these scenarios (repeatable).",
+        )
+        parser.add_argument(
+            "--show-queries", action="store_true",
+            help="Print the query breakdown of every scenario, not just the failing ones.",
+        )
+        parser.add_argument(
+            "--current-database", action="store_true",
+            help="Seed the current database instead of a throwaway one "
+                 "(for the test suite, which already runs on a test database).",
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [s for s in SCENARIOS if not options["views"] or s.name in options["views"]]
+        if options["views"] and len(scenarios) != len(set(options["views"])):
+            known = {s.name for s in SCENARIOS}
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(set(options['views']) - known))}.")
+
+        if options["current_database"]:
+            with test_environment():
+                measured, covered = self._measure(scenarios)
+        else:
+            old_name = connection.settings_dict["NAME"]
+            with override_settings(CACHES=LOCAL_CACHES):
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    with test_environment():
+                        measured, covered = self._measure(scenarios)
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        failures = []
+        for scenario in scenarios:
+            runs = measured[scenario.name]
+            if any(queries is None for queries in runs.values()):
+                failures.append(scenario.name)
+                self.stdout.write(self.style.ERROR(f"{scenario.name}: no sample data to run it with"))
+                continue
+
+            counts = {size: len(queries) for size, queries in runs.items()}
+            problems = []
+            if len(set(counts.values())) > 1:
+                problems.append("query count grows with the data")
+            if scenario.budget is None:
+                problems.append("no budget set")
+            elif max(counts.values()) > scenario.budget:
+                problems.append(f"over its budget of {scenario.budget}")
+
+            summary = " / ".join(f"{counts[size]} ({size})" for size, _ in SIZES)
+            budget = "-" if scenario.budget is None else scenario.budget
+            if problems:
+                failures.append(scenario.name)
+                self.stdout.write(self.style.ERROR(
+                    f"{scenario.name}: {summary}, budget {budget}: {'; '.join(problems)}"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{scenario.name}: {summary}, budget {budget}"))
+            if problems or options["show_queries"]:
+                self._breakdown(runs)
+
+        if not options["views"]:
+            missing = sorted(
+                pattern.name for pattern in urls.urlpatterns
+                if pattern.name and pattern.name not in covered
+            )
+            if missing:
+                failures.extend(missing)
+                self.stdout.write(self.style.ERROR(
+                    f"No scenario for these URLs (add them to view_checks.SCENARIOS): {', '.join(missing)}"
+                ))
+
+        if failures:
+            raise CommandError(f"{len(failures)} view(s) failed the query count check.")
+
+    def _measure(self, scenarios):
+        """{scenario name: {size: queries or None}} and the URL names the scenarios reached."""
+        User.objects.create_superuser("query_checks", "query_checks@example.invalid", None)
+        measured = {scenario.name: {} for scenario in scenarios}
+        covered = set()
+        for size, params in SIZES:
+            mock_data.generate(params)
+            ids = sample_ids(busiest=True)
+            if ids["student"] and ids["open_section"]:
+                EnrollmentRequest.objects.create(student_id=ids["student"], section_id=ids["open_section"])
+                ids = sample_ids(busiest=True)
+            for scenario in scenarios:
+                measured[scenario.name][size] = run_scenario(scenario, ids)
+                try:
+                    covered.add(resolve(scenario.url(ids).split("?")[0]).url_name)
+                except Exception:
+                    pass
+        return measured, covered
+
+    def _breakdown(self, runs):
+        """Queries grouped by statement, with how often each ran at every size."""
+        per_size = {
+            size: Counter(normalize(sql) for sql, params in queries)
+            for size, queries in runs.items()
+        }
+        statements = []
+        for counter in per_size.values():
+            statements.extend(sql for sql in counter if sql not in statements)
+        for sql in statements:
+            counts = [per_size[size][sql] for size, _ in SIZES]
+            marker = "!" if len(set(counts)) > 1 else " "
+            self.stdout.write(f"  {marker} {' -> '.join(map(str, counts)):>10}  {sql}")
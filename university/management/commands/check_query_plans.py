@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from university.view_checks import (
+    SCENARIOS,
+    explain,
+    full_scans,
+    is_explainable,
+    run_scenario,
+    sample_ids,
+    test_environment,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the main views against the current (seeded) database, run "
+        "EXPLAIN QUERY PLAN on every query and fail if a hot view reads a "
+        "large table with a full scan. SQLite only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--view", action="append", dest="views", metavar="NAME",
+            help="Only check these scenarios (repeatable).",
+        )
+        parser.add_argument(
+            "--show-plans", action="store_true",
+            help="Print the plan of every query, not just the failing ones.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("check_query_plans reads SQLite's EXPLAIN QUERY PLAN output.")
+
+        scenarios = [s for s in SCENARIOS if not options["views"] or s.name in options["views"]]
+        ids = sample_ids()
+        failures = 0
+
+        with test_environment():
+            for scenario in scenarios:
+                queries = run_scenario(scenario, ids)
+                if queries is None:
+                    reason = (
+                        "no superuser; run createsuperuser" if scenario.role == "staff"
+                        else "no sample data; run seed_mock_data first"
+                    )
+                    self.stdout.write(self.style.WARNING(f"{scenario.name}: skipped ({reason})"))
+                    continue
+
+                problems = []
+                plans = []
+                for sql, params in queries:
+                    if not is_explainable(sql):
+                        continue
+                    plan = explain(sql, params)
+                    plans.append((sql, plan))
+                    scans = full_scans(plan, scenario.allow_scan, sql)
+                    if scans and scenario.hot:
+                        problems.append((sql, plan, scans))
+
+                label = "hot" if scenario.hot else "report"
+                if problems:
+                    failures += len(problems)
+                    self.stdout.write(self.style.ERROR(
+                        f"{scenario.name} ({label}): {len(problems)} of {len(plans)} queries scan a full table"
+                    ))
+                    for sql, plan, scans in problems:
+                        self.stdout.write(f"  scans {', '.join(scans)}: {sql}")
+                        for detail in plan:
+                            self.stdout.write(f"      {detail}")
+                else:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{scenario.name} ({label}): {len(plans)} queries OK"
+                    ))
+
+                if options["show_plans"]:
+                    for sql, plan in plans:
+                        self.stdout.write(f"  {sql}")
+                        for detail in plan:
+                            self.stdout.write(f"      {detail}")
+
+        if failures:
+            raise CommandError(f"{failures} hot query/queries fall back to a full table scan.")
@@ -0,0 +1,75 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from university import table_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream tables to CSV or NDJSON files (one file per table, or one "
+        "stream with --output), optionally gzip-compressed and filtered by "
+        "term or department. Rows are read in chunks, never as model objects."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "tables", nargs="*", metavar="TABLE",
+            help=f"Tables to export (default: all): {', '.join(table_export.TABLES)}.",
+        )
+        parser.add_argument("--format", choices=table_export.FORMATS, default="csv")
+        parser.add_argument("--gzip", action="store_true", help="Gzip-compress the output.")
+        parser.add_argument("--term", help='Only rows of this term (e.g. "Fall 2025").')
+        parser.add_argument("--department", help="Only rows of this department (name or id).")
+        parser.add_argument(
+            "--output-dir", default=".",
+            help="Directory for the per-table files (default: current directory).",
+        )
+        parser.add_argument(
+            "--output", metavar="FILE",
+            help="Write everything to one file instead ('-' for stdout). "
+                 "Several tables need --format ndjson (rows are tagged with their table).",
+        )
+
+    def handle(self, *args, **options):
+        fmt = options["format"]
+        compress = options["gzip"]
+        try:
+            filters = table_export.resolve_filters(
+                term=options["term"], department=options["department"]
+            )
+            if options["tables"]:
+                tables = [table_export.get_table(table_id) for table_id in options["tables"]]
+            else:
+                tables = []
+                for table in table_export.TABLES_CONFIG:
+                    if table_export.supports(table, filters):
+                        tables.append(table)
+                    else:
+                        self.stderr.write(f"Skipping {table['id']} (can't be filtered by {', '.join(filters)}).")
+
+            if options["output"]:
+                self._write(options["output"], table_export.lines(tables, fmt, filters), compress)
+                return
+            os.makedirs(options["output_dir"], exist_ok=True)
+            for table in tables:
+                path = os.path.join(
+                    options["output_dir"],
+                    table_export.filename([table["id"]], fmt, compress=compress, filters=filters),
+                )
+                self._write(path, table_export.lines([table], fmt, filters), compress)
+                self.stdout.write(f"{table['id']}: {path}")
+        except table_export.ExportError as exc:
+            raise CommandError(str(exc))
+
+    def _write(self, path, text, compress):
+        blocks = table_export.encode(text, compress=compress)
+        if path == "-":
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
+            return
+        with open(path, "wb") as output:
+            for block in blocks:
+                output.write(block)
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from university import grade_stats
+from university.grades import GRADE_FIELDS
+
+
+class Command(BaseCommand):
+    help = (
+        "Print per-course grade statistics (count, min, max, mean, variance, "
+        "std dev) and optionally percentiles/median of every grade column."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--field", choices=GRADE_FIELDS, default="final_grade",
+            help="Grade column to summarize (default: final_grade).",
+        )
+        parser.add_argument(
+            "--percentiles", nargs="*", type=float, metavar="P",
+            help="Also print these percentiles of every grade column "
+                 f"(default {' '.join(str(p) for p in grade_stats.DEFAULT_PERCENTILES)}). "
+                 "Uses NumPy when it is installed.",
+        )
+
+    def handle(self, *args, **options):
+        field = options["field"]
+        rows = grade_stats.course_grade_stats(field)
+        if not rows:
+            self.stdout.write(f"No {field} values recorded.")
+        for row in rows:
+            self.stdout.write(
+                f"{row['course_code']}: n={row['count']} min={row['min_grade']} "
+                f"max={row['max_grade']} mean={row['avg_grade']} "
+                f"var={row['var_grade']} std={row['stddev_grade']}"
+            )
+
+        if options["percentiles"] is None:
+            return
+        percentiles = options["percentiles"] or grade_stats.DEFAULT_PERCENTILES
+        self.stdout.write("")
+        self.stdout.write(
+            f"Percentiles {', '.join(f'{p:g}' for p in percentiles)} "
+            f"({'NumPy' if grade_stats.numpy is not None else 'pure Python'}):"
+        )
+        for code, columns in grade_stats.course_grade_percentiles(percentiles=percentiles).items():
+            self.stdout.write(f"{code}:")
+            for column, values in columns.items():
+                shown = ", ".join("-" if v is None else f"{v:.2f}" for v in values)
+                self.stdout.write(f"  {column}: {shown}")
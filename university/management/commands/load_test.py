@@ -0,0 +1,81 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from university import load_test
+from university.view_checks import test_environment
+
+
+class Command(BaseCommand):
+    help = (
+        "Registration-rush load test: concurrent simulated students and "
+        "instructors drive the enrollment and grading views through the "
+        "Django test client. Records throughput, latency percentiles, queries "
+        "per request and lock errors, checks capacity invariants and writes "
+        "the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=300, help="Simulated students (default 300).")
+        parser.add_argument("--threads", type=int, default=20, help="Concurrent client threads (default 20).")
+        parser.add_argument("--sections", type=int, default=10,
+                            help="Sections in the test catalogue, the hot one included (default 10).")
+        parser.add_argument("--section-capacity", type=int, default=40, help="Seats per section (default 40).")
+        parser.add_argument("--hot-capacity", type=int, default=50,
+                            help="Seats in the section every student rushes for (default 50).")
+        parser.add_argument("--iterations", type=int, default=5,
+                            help="Actions per student in the mixed phase (0 = rush only; default 5).")
+        parser.add_argument("--instructors", type=int, default=2,
+                            help="Instructor threads saving grade sheets (default 2).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the action mix.")
+        parser.add_argument("--keep", action="store_true", help="Keep the test rows instead of deleting them.")
+        parser.add_argument("--output", default="-",
+                            help="JSON results file (default '-': stdout, with the report on stderr).")
+
+    def handle(self, *args, **options):
+        if options["students"] < 1 or options["threads"] < 1 or options["sections"] < 1:
+            raise CommandError("--students, --threads and --sections must be at least 1.")
+        params = load_test.LoadTestParams(
+            students=options["students"],
+            threads=options["threads"],
+            sections=options["sections"],
+            section_capacity=options["section_capacity"],
+            hot_capacity=options["hot_capacity"],
+            iterations=max(0, options["iterations"]),
+            instructors=max(1, options["instructors"]),
+            seed=options["seed"],
+            keep=options["keep"],
+        )
+        log = self.stderr.write if options["output"] == "-" else self.stdout.write
+        try:
+            with test_environment():
+                results = load_test.run(params, log=log)
+        except load_test.LoadTestError as exc:
+            raise CommandError(str(exc))
+
+        for phase, summary in results["phases"].items():
+            log(
+                f"{phase}: {summary['requests']} requests, {summary['throughput_rps']} req/s, "
+                f"{summary['errors']} error(s) ({summary['lock_errors']} lock)"
+            )
+            for endpoint, stats in summary["endpoints"].items():
+                latency = stats["latency_ms"]
+                log(
+                    f"  {endpoint}: n={stats['requests']} p50={latency['p50']}ms "
+                    f"p95={latency['p95']}ms p99={latency['p99']}ms "
+                    f"queries={stats['queries_per_request']['mean']} "
+                    f"errors={stats['errors']} (lock {stats['lock_errors']})"
+                )
+
+        text = json.dumps(results, indent=2, default=str)
+        if options["output"] == "-":
+            self.stdout.write(text)
+        else:
+            with open(options["output"], "w") as output:
+                output.write(text + "\n")
+            log(f"Results written to {options['output']}.")
+
+        problems = [problem for phase in results["invariants"].values() for problem in phase]
+        if problems:
+            raise CommandError("Capacity invariants violated:\n  " + "\n  ".join(problems))
+        log(self.style.SUCCESS("Capacity invariants hold."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from university import reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the query page reports for their common parameters and store "
+        "them in the report cache (e.g. after a deploy or a data load)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--report", action="append", dest="names", metavar="NAME",
+            help=f"Report to warm (repeatable; default: all of {', '.join(sorted(reports.REGISTRY))}).",
+        )
+        parser.add_argument(
+            "--refresh", action="store_true",
+            help="Recompute even if a current result is already cached.",
+        )
+
+    def handle(self, *args, **options):
+        names = options["names"]
+        unknown = sorted(set(names or []) - set(reports.REGISTRY))
+        if unknown:
+            raise CommandError(f"Unknown report(s): {', '.join(unknown)}")
+
+        warmed = reports.precompute(names, refresh=options["refresh"])
+        for name, params, count in warmed:
+            shown = ", ".join(f"{key}={value}" for key, value in params.items()) or "defaults"
+            self.stdout.write(f"  {name} ({shown}): {count} row(s)")
+        self.stdout.write(self.style.SUCCESS(f"Cached {len(warmed)} report result(s)."))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from university.enrollment_queue import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_POLL_INTERVAL,
+    run_workers,
+)
+from university.models import EnrollmentRequest
+
+
+class Command(BaseCommand):
+    help = "Process queued enrollment requests in batches (queued enrollment mode)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=4,
+            help="Number of worker threads (sections are split between them).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+            help="Maximum number of requests applied per transaction.",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Exit once the queue has been drained instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        run_workers(
+            workers=max(1, options["workers"]),
+            batch_size=max(1, options["batch_size"]),
+            poll_interval=options["poll_interval"],
+            once=options["once"],
+        )
+
+        pending = EnrollmentRequest.objects.filter(
+            status=EnrollmentRequest.STATUS_PENDING
+        ).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Enrollment queue workers stopped ({pending} request(s) still pending)."
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from university.enrollment import PROMOTION_BATCH_SIZE, promote_waitlists
+
+
+class Command(BaseCommand):
+    help = "Fill free section seats from the waitlists (oldest entry first)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--section", type=int, action="append", dest="section_ids",
+            help="Only promote into this section id (may be repeated).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=PROMOTION_BATCH_SIZE,
+            help="Sections promoted per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        promoted = promote_waitlists(
+            section_ids=options["section_ids"],
+            batch_size=max(1, options["batch_size"]),
+        )
+        sections = len({section_id for _, section_id in promoted})
+        self.stdout.write(self.style.SUCCESS(
+            f"Promoted {len(promoted)} student(s) into {sections} section(s)."
+        ))
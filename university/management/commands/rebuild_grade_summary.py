@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from university import reports
+from university.grade_summary import rebuild
+from university.models import GradeSummary
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the GradeSummary table (per-section count, sum and sum of "
+        "squares of every grade column) from the Grade table."
+    )
+
+    def handle(self, *args, **options):
+        sections = rebuild()
+        reports.mark_changed(GradeSummary)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt grade summaries for {sections} section(s)."))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+
+from university.reconcile import (
+    fix_drift,
+    over_capacity_sections,
+    section_drift,
+    waitlist_drift,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Section and Waitlist counters from Enrollment/Wait rows, "
+        "report discrepancies and optionally fix them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix", action="store_true",
+            help="Rewrite the drifted counters (otherwise only report them).",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=50,
+            help="Maximum number of discrepancies listed per table (0 = only counts).",
+        )
+
+    def handle(self, *args, **options):
+        limit = max(0, options["limit"])
+
+        sections = section_drift()
+        section_total = sections.count()
+        self.stdout.write(f"Sections with drifted seat counters: {section_total}")
+        for row in sections.values(
+            "id", "course__course_code", "section_number", "term",
+            "current_capacity", "actual_current",
+        ).order_by("id")[:limit]:
+            self.stdout.write(
+                f"  Section {row['id']} ({row['course__course_code']} Sec "
+                f"{row['section_number']}, {row['term']}): "
+                f"current {row['current_capacity']} -> {row['actual_current']}"
+            )
+
+        waitlists = waitlist_drift()
+        waitlist_total = waitlists.count()
+        self.stdout.write(f"Waitlists with drifted counters: {waitlist_total}")
+        for row in waitlists.values(
+            "id", "section_id", "waitlist_id",
+            "spaces_left", "actual_spaces_left",
+            "next_position", "min_next_position",
+        ).order_by("id")[:limit]:
+            self.stdout.write(
+                f"  Waitlist {row['waitlist_id']} of section {row['section_id']}: "
+                f"spaces_left {row['spaces_left']} -> {row['actual_spaces_left']}, "
+                f"next_position {row['next_position']} (must be >= {row['min_next_position']})"
+            )
+
+        over = over_capacity_sections().count()
+        if over:
+            self.stdout.write(self.style.WARNING(
+                f"{over} section(s) have more enrollments than seats "
+                "(negative remaining capacity); the extra enrollments are kept."
+            ))
+
+        if not section_total and not waitlist_total:
+            self.stdout.write(self.style.SUCCESS("All capacity counters are consistent."))
+            return
+
+        if options["fix"]:
+            sections_fixed, waitlists_fixed = fix_drift()
+            self.stdout.write(self.style.SUCCESS(
+                f"Fixed {sections_fixed} section(s) and {waitlists_fixed} waitlist(s)."
+            ))
+        else:
+            self.stdout.write("Run with --fix to correct them.")
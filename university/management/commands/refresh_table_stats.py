@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from university import table_stats
+
+
+class Command(BaseCommand):
+    help = "Recount every university table exactly and refresh the cached table statistics."
+
+    def handle(self, *args, **options):
+        counts = table_stats.refresh_exact_counts(table_stats.tracked_models())
+        for model, count in counts.items():
+            self.stdout.write(f"  {model._meta.object_name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Table statistics refreshed."))
@@ -1,4 +1,6 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from university import mock_data
 from university.models import (
     Admin,
     Department,
@@ -16,9 +18,36 @@ from university.models import (
 
 
 class Command(BaseCommand):
-    help = "Seed the Database with Mock Data."
+    help = (
+        "Seed the Database with Mock Data. With --scale, generate a synthetic "
+        "university of that size instead (see university/mock_data.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale", type=float,
+            help="Generate synthetic data: 1.0 = %s; sizes grow linearly." % ", ".join(
+                f"{count} {name}" for name, count in mock_data.BASE_SIZES.items()
+            ),
+        )
+        for name in mock_data.BASE_SIZES:
+            parser.add_argument(f"--{name}", type=int, help=f"Number of {name} (overrides --scale).")
+        parser.add_argument("--sections-per-course", type=int, default=3,
+                            help="Average sections per course (popular courses get more).")
+        parser.add_argument("--enrollments-per-student", type=int, default=5,
+                            help="Average course requests per student.")
+        parser.add_argument("--grade-fill", type=float, default=0.7,
+                            help="Share of enrollments that have grades (0-1).")
+        parser.add_argument("--waitlist-pressure", type=float, default=0.15,
+                            help="Share of courses with fewer seats than requests (0-1).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same data).")
+        parser.add_argument("--batch-size", type=int, default=mock_data.BATCH_SIZE,
+                            help="Rows per bulk insert.")
 
     def handle(self, *args, **options):
+        if options["scale"] is not None:
+            return self.generate(options)
+
         # --- Admin ---
         admin1, _ = Admin.objects.get_or_create(
             id=1,
@@ -206,12 +235,10 @@ class Command(BaseCommand):
             defaults={
                 "total_capacity": 50,
                 "current_capacity": 2,
-                "remaining_capacity": 48,  # will be recomputed in save()
                 "instructor": inst_abhari,
                 "admin": admin1,
             },
         )
-        sec_cps109_1.save()
 
         sec_cps205_1, _ = Section.objects.get_or_create(
             course=cps205,
@@ -220,12 +247,10 @@ class Command(BaseCommand):
             defaults={
                 "total_capacity": 40,
                 "current_capacity": 1,
-                "remaining_capacity": 39,
                 "instructor": inst_abhari,
                 "admin": admin1,
             },
         )
-        sec_cps205_1.save()
 
         sec_mth101_1, _ = Section.objects.get_or_create(
             course=mth101,
@@ -234,12 +259,10 @@ class Command(BaseCommand):
             defaults={
                 "total_capacity": 60,
                 "current_capacity": 3,
-                "remaining_capacity": 57,
                 "instructor": inst_ufkes,
                 "admin": admin1,
             },
         )
-        sec_mth101_1.save()
 
         sec_mth210_1, _ = Section.objects.get_or_create(
             course=mth210,
@@ -248,12 +271,10 @@ class Command(BaseCommand):
             defaults={
                 "total_capacity": 35,
                 "current_capacity": 0,
-                "remaining_capacity": 35,
                 "instructor": inst_ufkes,
                 "admin": admin1,
             },
         )
-        sec_mth210_1.save()
 
         # --- Enrollments ---
         Enrollment.objects.get_or_create(
@@ -385,12 +406,14 @@ class Command(BaseCommand):
 
         # --- Waitlists ---
         # Oracle: waitlist(id, waitlist_capacity, spaces_left, course_id, section_number, admin_id)
-        # Django: Waitlist(section, waitlist_id, spaces_left, admin)
+        # Django: Waitlist(section, waitlist_id, capacity, spaces_left, admin)
         wl_cps205, _ = Waitlist.objects.get_or_create(
             section=sec_cps205_1,
             waitlist_id=1,  # corresponds to Oracle "id" = 1
             defaults={
-                "spaces_left": 4,  # capacity=5 not stored in current model
+                "capacity": 5,
+                "spaces_left": 4,
+                "next_position": 2,
                 "admin": admin1,
             },
         )
@@ -399,7 +422,9 @@ class Command(BaseCommand):
             section=sec_mth210_1,
             waitlist_id=2,  # corresponds to Oracle "id" = 2
             defaults={
+                "capacity": 5,
                 "spaces_left": 4,
+                "next_position": 2,
                 "admin": admin1,
             },
         )
@@ -409,14 +434,35 @@ class Command(BaseCommand):
             id=500,
             student=s100,
             waitlist=wl_cps205,
-            defaults={"admin": admin1},
+            defaults={"position": 1, "admin": admin1},
         )
 
         Wait.objects.get_or_create(
             id=501,
             student=s101,
             waitlist=wl_mth210,
-            defaults={"admin": admin1},
+            defaults={"position": 1, "admin": admin1},
         )
 
         self.stdout.write(self.style.SUCCESS("Mock data seeded successfully."))
+
+    def generate(self, options):
+        if options["scale"] <= 0:
+            raise CommandError("--scale must be positive.")
+        if not 0 <= options["grade_fill"] <= 1:
+            raise CommandError("--grade-fill must be between 0 and 1.")
+        if not 0 <= options["waitlist_pressure"] <= 1:
+            raise CommandError("--waitlist-pressure must be between 0 and 1.")
+        params = mock_data.params_for(
+            scale=options["scale"],
+            sections_per_course=max(1, options["sections_per_course"]),
+            enrollments_per_student=max(1, options["enrollments_per_student"]),
+            grade_fill=options["grade_fill"],
+            waitlist_pressure=options["waitlist_pressure"],
+            seed=options["seed"],
+            **{name: options[name] for name in mock_data.BASE_SIZES},
+        )
+        created = mock_data.generate(params, batch_size=options["batch_size"], log=self.stdout.write)
+        for name, count in created.items():
+            self.stdout.write(f"  {name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Synthetic data generated."))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from university import snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Save the database as a named snapshot (SQLite online backup), restore "
+        "the university tables from one, or list/delete snapshots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=("save", "restore", "list", "delete"))
+        parser.add_argument("name", nargs="?", help="Snapshot name (save/restore/delete).")
+        parser.add_argument(
+            "--overwrite", action="store_true",
+            help="Replace an existing snapshot of the same name (save).",
+        )
+
+    def handle(self, *args, **options):
+        action, name = options["action"], options["name"]
+        if action == "list":
+            for snapshot in snapshots.list_snapshots():
+                self.stdout.write(
+                    f"{snapshot['name']}  {snapshot['size'] / 1024 / 1024:.1f} MB  "
+                    f"{snapshot['modified']:%Y-%m-%d %H:%M}"
+                )
+            return
+        if not name:
+            raise CommandError(f"{action} needs a snapshot name.")
+
+        try:
+            if action == "save":
+                path = snapshots.save(name, overwrite=options["overwrite"])
+                self.stdout.write(self.style.SUCCESS(f"Saved snapshot {name} ({path})."))
+            elif action == "restore":
+                restored = snapshots.restore(name)
+                self.stdout.write(self.style.SUCCESS(
+                    f"Restored snapshot {name}: {sum(restored.values())} rows in {len(restored)} tables."
+                ))
+            else:
+                snapshots.delete(name)
+                self.stdout.write(self.style.SUCCESS(f"Deleted snapshot {name}."))
+        except snapshots.SnapshotError as exc:
+            raise CommandError(str(exc))
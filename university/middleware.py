@@ -0,0 +1,16 @@
+from .principals import Principal
+
+
+class PrincipalMiddleware:
+    """
+    Attach request.principal, the session's student/instructor/admin
+    records (looked up lazily, see principals.py). Must come after
+    SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = Principal(request.session)
+        return self.get_response(request)
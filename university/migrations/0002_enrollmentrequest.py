@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:11
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('university', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('enrolled', 'Enrolled'), ('waitlisted', 'Waitlisted'), ('rejected', 'Rejected')], default='pending', max_length=20)),
+                ('message', models.CharField(blank=True, max_length=255)),
+                ('claim_token', models.UUIDField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_requests', to='university.section')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_requests', to='university.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='enrollreq_status_id_idx'), models.Index(fields=['claim_token'], name='enrollreq_claim_token_idx')],
+            },
+        ),
+    ]
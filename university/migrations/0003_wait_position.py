@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+def assign_positions(apps, schema_editor):
+    # Existing entries keep their insertion (id) order
+    Waitlist = apps.get_model('university', 'Waitlist')
+    Wait = apps.get_model('university', 'Wait')
+
+    entries = list(Wait.objects.order_by('waitlist_id', 'id').only('id', 'waitlist_id'))
+    next_position = {}
+    for entry in entries:
+        entry.position = next_position.get(entry.waitlist_id, 1)
+        next_position[entry.waitlist_id] = entry.position + 1
+    Wait.objects.bulk_update(entries, ['position'], batch_size=500)
+
+    waitlists = list(Waitlist.objects.filter(pk__in=next_position).only('id'))
+    for waitlist in waitlists:
+        waitlist.next_position = next_position[waitlist.pk]
+    Waitlist.objects.bulk_update(waitlists, ['next_position'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('university', '0002_enrollmentrequest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wait',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='waitlist',
+            name='next_position',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(assign_positions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='wait',
+            index=models.Index(fields=['waitlist', 'position'], name='wait_waitlist_position_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_capacity(apps, schema_editor):
+    # Existing waitlists were sized as "spaces left + students already waiting"
+    Waitlist = apps.get_model('university', 'Waitlist')
+    Wait = apps.get_model('university', 'Wait')
+    entries = (
+        Wait.objects
+        .filter(waitlist_id=OuterRef('pk'))
+        .order_by()
+        .values('waitlist_id')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Waitlist.objects.update(
+        capacity=models.F('spaces_left') + Coalesce(Subquery(entries), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('university', '0003_wait_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waitlist',
+            name='capacity',
+            field=models.PositiveIntegerField(default=10),
+        ),
+        migrations.RunPython(backfill_capacity, migrations.RunPython.noop),
+    ]
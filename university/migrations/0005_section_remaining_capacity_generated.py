@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:18
+
+import django.db.models.expressions
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_remaining_capacity(apps, schema_editor):
+    # Reverse only: the plain column comes back empty (default 0)
+    Section = apps.get_model('university', 'Section')
+    Section.objects.update(remaining_capacity=F('total_capacity') - F('current_capacity'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('university', '0004_waitlist_capacity'),
+    ]
+
+    # A plain column can't be altered into a generated one, so the column is
+    # dropped and re-added; the database fills it for every existing row.
+    # The default and the RunPython let the migration be reversed on a
+    # table with rows (the plain column is re-added, then refilled).
+    operations = [
+        migrations.AlterField(
+            model_name='section',
+            name='remaining_capacity',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, fill_remaining_capacity),
+        migrations.RemoveField(
+            model_name='section',
+            name='remaining_capacity',
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='remaining_capacity',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('total_capacity'), '-', models.F('current_capacity')), output_field=models.IntegerField()),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce
+
+GRADE_FIELDS = ('lab_grade', 'assignment_grade', 'midterm_grade', 'final_grade')
+
+
+def build_summaries(apps, schema_editor):
+    # Same computation as grade_summary.rebuild(), on the historical models
+    Grade = apps.get_model('university', 'Grade')
+    GradeSummary = apps.get_model('university', 'GradeSummary')
+    aggregates = {}
+    for field in GRADE_FIELDS:
+        square = ExpressionWrapper(
+            F(field) * F(field), output_field=DecimalField(max_digits=20, decimal_places=4)
+        )
+        aggregates[f'{field}_count'] = Count(field)
+        aggregates[f'{field}_sum'] = Coalesce(
+            Sum(field), 0, output_field=DecimalField(max_digits=14, decimal_places=2)
+        )
+        aggregates[f'{field}_sumsq'] = Coalesce(
+            Sum(square), 0, output_field=DecimalField(max_digits=20, decimal_places=4)
+        )
+    GradeSummary.objects.bulk_create(
+        [
+            GradeSummary(
+                section_id=row.pop('section_id'),
+                course_id=row.pop('section__course_id'),
+                **row,
+            )
+            for row in (
+                Grade.objects
+                .values('section_id', 'section__course_id')
+                .annotate(**aggregates)
+                .order_by()
+            )
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('university', '0005_section_remaining_capacity_generated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeSummary',
+            fields=[
+                ('section', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='grade_summary', serialize=False, to='university.section')),
+                ('lab_grade_count', models.PositiveIntegerField(default=0)),
+                ('lab_grade_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lab_grade_sumsq', models.DecimalField(decimal_places=4, default=0, max_digits=20)),
+                ('assignment_grade_count', models.PositiveIntegerField(default=0)),
+                ('assignment_grade_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('assignment_grade_sumsq', models.DecimalField(decimal_places=4, default=0, max_digits=20)),
+                ('midterm_grade_count', models.PositiveIntegerField(default=0)),
+                ('midterm_grade_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('midterm_grade_sumsq', models.DecimalField(decimal_places=4, default=0, max_digits=20)),
+                ('final_grade_count', models.PositiveIntegerField(default=0)),
+                ('final_grade_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('final_grade_sumsq', models.DecimalField(decimal_places=4, default=0, max_digits=20)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_summaries', to='university.course')),
+            ],
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
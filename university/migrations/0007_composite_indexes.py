@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('university', '0006_gradesummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['section', 'student'], name='enrollment_section_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['course', 'final_grade'], name='grade_course_final_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='section',
+            index=models.Index(fields=['instructor', 'term'], name='section_instructor_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wait',
+            index=models.Index(fields=['waitlist', 'position', 'id'], name='wait_waitlist_order_idx'),
+        ),
+        # Superseded by wait_waitlist_order_idx (dropped after it exists)
+        migrations.RemoveIndex(
+            model_name='wait',
+            name='wait_waitlist_position_idx',
+        ),
+    ]
@@ -0,0 +1,412 @@
+import bisect
+import random
+import time
+from array import array
+from collections import namedtuple
+from decimal import Decimal
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import dashboard_cache, grade_summary, principals, reports, table_stats
+from .enrollment import DEFAULT_WAITLIST_SPACES
+from .models import (
+    Admin,
+    Course,
+    Department,
+    Enrollment,
+    Grade,
+    GraduateStudent,
+    Instructor,
+    Section,
+    Student,
+    UndergraduateStudent,
+    Wait,
+    Waitlist,
+)
+
+# -------------------------
+# Synthetic data generator
+# -------------------------
+# Used by `seed_mock_data --scale`. Everything is drawn from one seeded
+# random.Random in a fixed order, so the same parameters and seed always
+# produce the same rows. Distributions are skewed on purpose:
+#   - course popularity follows a Zipf law (a few courses draw most
+#     requests) and departments differ in size the same way;
+#   - seats per course follow its demand, but a share of the courses (the
+#     waitlist pressure) is oversubscribed, fills up and queues;
+#   - grades are per-student ability plus per-course difficulty plus noise.
+# Registration is simulated in memory first (counters included), then rows
+# are inserted in dependency order with batched executemany INSERTs, in one
+# transaction. Section.current_capacity and Waitlist.spaces_left /
+# next_position come out matching the Enrollment and Wait rows.
+
+# Sizes at --scale 1 (each can be overridden)
+BASE_SIZES = {
+    "departments": 8,
+    "instructors": 120,
+    "courses": 400,
+    "students": 10000,
+}
+
+TERMS = ("Fall 2025", "Winter 2026")
+
+# Seats per section
+MIN_SECTION_SIZE = 10
+MAX_SECTION_SIZE = 400
+
+BATCH_SIZE = 5000
+
+DEPARTMENTS = [
+    ("Computer Science", "CPS"), ("Mathematics", "MTH"), ("Physics", "PCS"),
+    ("Chemistry", "CHY"), ("Biology", "BLG"), ("Economics", "ECN"),
+    ("Psychology", "PSY"), ("English", "ENG"), ("History", "HST"),
+    ("Philosophy", "PHL"), ("Business", "BUS"), ("Sociology", "SOC"),
+]
+
+COURSE_TOPICS = [
+    "Foundations", "Methods", "Theory", "Systems", "Analysis", "Design",
+    "Applications", "Seminar", "Topics", "Laboratory", "Modelling", "Practice",
+]
+
+FIRST_NAMES = [
+    "Aisha", "Ben", "Carlos", "Dana", "Elena", "Farah", "Gabriel", "Hana",
+    "Ivan", "Jia", "Kofi", "Lena", "Mateo", "Nadia", "Omar", "Priya",
+    "Quinn", "Ravi", "Sofia", "Tariq", "Uma", "Victor", "Wei", "Yara", "Zane",
+]
+
+LAST_NAMES = [
+    "Ahmed", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Huang",
+    "Ito", "Jones", "Khan", "Lee", "Martin", "Nguyen", "Okafor", "Patel",
+    "Rossi", "Singh", "Smith", "Tremblay", "Wang", "Wilson", "Young", "Zhang",
+]
+
+GRADUATE_DEGREES = ["MSc", "MA", "MEng", "PhD"]
+
+Params = namedtuple(
+    "Params",
+    "departments instructors courses sections_per_course students "
+    "enrollments_per_student grade_fill waitlist_pressure seed",
+)
+
+
+def params_for(scale=1.0, sections_per_course=3, enrollments_per_student=5,
+               grade_fill=0.7, waitlist_pressure=0.15, seed=0, **sizes):
+    """Generator parameters: BASE_SIZES times scale, unless given explicitly."""
+    counts = {
+        name: sizes.get(name) or max(1, round(base * scale))
+        for name, base in BASE_SIZES.items()
+    }
+    return Params(
+        sections_per_course=sections_per_course,
+        enrollments_per_student=enrollments_per_student,
+        grade_fill=grade_fill,
+        waitlist_pressure=waitlist_pressure,
+        seed=seed,
+        **counts,
+    )
+
+
+def _zipf_weights(rng, n, exponent):
+    """Zipf weights 1/rank**exponent in random order."""
+    weights = [1 / (rank ** exponent) for rank in range(1, n + 1)]
+    rng.shuffle(weights)
+    return weights
+
+
+def _cumulative(weights):
+    total, result = 0.0, []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+def _pick(rng, cumulative):
+    """Index drawn with probability proportional to its weight."""
+    return bisect.bisect_right(cumulative, rng.random() * cumulative[-1])
+
+
+def _next_ids(*models):
+    """First free primary key of each model (ids are assigned up front)."""
+    return [(model.objects.aggregate(top=Max("pk"))["top"] or 0) + 1 for model in models]
+
+
+def _grade(rng, mean):
+    value = min(100.0, max(0.0, rng.gauss(mean, 9)))
+    return Decimal(f"{value:.1f}")
+
+
+def _insert(model, fields, rows, batch_size):
+    """
+    Insert a stream of value tuples (in `fields` order) with one executemany
+    per batch_size rows. Same INSERT as bulk_create, without building and
+    preparing a model instance per row, which dominates at millions of rows.
+    """
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in fields]
+    sql = (
+        f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(map(quote, columns))}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    rows = iter(rows)
+    total = 0
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            cursor.executemany(sql, batch)
+            total += len(batch)
+    return total
+
+
+def generate(params, batch_size=BATCH_SIZE, log=None):
+    """
+    Add a synthetic university to the database (existing rows are kept; new
+    ids start after the current maximum). Returns {model name: rows created}
+    plus "requests"/"rejected" counts from the registration simulation.
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(params.seed)
+    started = time.monotonic()
+
+    admin = Admin.objects.order_by("id").first()
+    if admin is None:
+        admin = Admin.objects.create(
+            username="admin1", password="adminpass", first_name="System", last_name="Admin"
+        )
+    admin_id = admin.id
+
+    (first_department, first_instructor, first_course, first_section,
+     first_student, first_enrollment, first_grade, first_waitlist, first_wait) = _next_ids(
+        Department, Instructor, Course, Section, Student, Enrollment, Grade, Waitlist, Wait
+    )
+    taken_codes = set(Course.objects.values_list("course_code", flat=True))
+
+    # ---- Plan the catalogue ----
+    department_ids = list(range(first_department, first_department + params.departments))
+    department_name, department_prefix = {}, {}
+    for i, department_id in enumerate(department_ids):
+        name, prefix = DEPARTMENTS[i % len(DEPARTMENTS)]
+        repeat = i // len(DEPARTMENTS)  # more departments than names: number them
+        department_name[department_id] = f"{name} {repeat + 1}" if repeat else name
+        department_prefix[department_id] = f"{prefix}{chr(ord('A') + repeat - 1)}" if repeat else prefix
+    department_sizes = _cumulative(_zipf_weights(rng, params.departments, 0.7))
+
+    # Instructors: departments with more courses get more instructors
+    instructors_by_department = {department_id: [] for department_id in department_ids}
+    instructor_department = []
+    for i in range(params.instructors):
+        department_id = department_ids[_pick(rng, department_sizes)] if i >= params.departments else department_ids[i]
+        instructors_by_department[department_id].append(first_instructor + i)
+        instructor_department.append(department_id)
+    all_instructors = [first_instructor + i for i in range(params.instructors)]
+
+    popularity = _zipf_weights(rng, params.courses, 0.6)
+    total_popularity = sum(popularity)
+    requests_planned = params.students * params.enrollments_per_student
+    courses = []  # (course_id, department_id, code, name)
+    for i in range(params.courses):
+        department_id = department_ids[_pick(rng, department_sizes)]
+        prefix = department_prefix[department_id]
+        number = rng.randint(100, 499) if rng.random() < 0.6 else rng.randint(500, 999)
+        tries = 0
+        while f"{prefix}{number}" in taken_codes:
+            tries += 1
+            number = rng.randint(100, 999) if tries < 20 else number + 1
+        code = f"{prefix}{number}"
+        taken_codes.add(code)
+        name = f"{department_name[department_id]} {rng.choice(COURSE_TOPICS)} {'I' * min(number // 100, 3)}".strip()
+        courses.append((first_course + i, department_id, code, name))
+
+    # Sections: sizes vary around the average that gives sections_per_course
+    # sections per course; popular courses get more sections. A share of the
+    # courses (the waitlist pressure) has fewer seats than requests, the rest
+    # has room to spare.
+    sections = []  # [section_id, course_index, number, term, capacity, instructor_id]
+    sections_of_course = []
+    mean_size = requests_planned / (params.courses * params.sections_per_course)
+    for i, (course_id, department_id, code, name) in enumerate(courses):
+        demand = requests_planned * popularity[i] / total_popularity
+        if rng.random() < params.waitlist_pressure:
+            seats = demand * rng.uniform(0.5, 0.9)
+        else:
+            seats = demand * rng.uniform(1.1, 1.6)
+        size = min(MAX_SECTION_SIZE, max(MIN_SECTION_SIZE, mean_size * rng.lognormvariate(0, 0.4)))
+        count = max(1, round(seats / size))
+        capacity = max(MIN_SECTION_SIZE, min(MAX_SECTION_SIZE, 5 * round(seats / count / 5)))
+        teachers = instructors_by_department[department_id] or all_instructors
+        ids = []
+        for number in range(1, count + 1):
+            section_id = first_section + len(sections)
+            sections.append([section_id, i, number, TERMS[(number - 1) % len(TERMS)], capacity, rng.choice(teachers)])
+            ids.append(section_id)
+        sections_of_course.append(ids)
+    log(f"Planned {len(courses)} courses, {len(sections)} sections ({time.monotonic() - started:.1f}s).")
+
+    # ---- Simulate registration ----
+    section_index = {section[0]: section for section in sections}
+    enrolled = {section[0]: 0 for section in sections}
+    waiting = {}  # section_id -> [student_id, ...] in queue order
+    enroll_students, enroll_sections = array("l"), array("l")
+    course_weights = _cumulative(popularity)
+    requests = rejected = 0
+    max_load = min(params.courses, 2 * params.enrollments_per_student + 2)
+    for student_id in range(first_student, first_student + params.students):
+        load = max(1, min(max_load, round(rng.gauss(params.enrollments_per_student, params.enrollments_per_student * 0.35))))
+        # A student turned away from a full course requests another one
+        chosen = set()
+        taken = attempts = 0
+        while taken < load and attempts < load * 4:
+            attempts += 1
+            course = _pick(rng, course_weights)
+            if course in chosen:
+                continue
+            chosen.add(course)
+            requests += 1
+            options = sections_of_course[course]
+            first_choice = options[rng.randrange(len(options))]
+            open_sections = [
+                section_id for section_id in [first_choice, *options]
+                if enrolled[section_id] < section_index[section_id][4]
+            ]
+            if open_sections:
+                section_id = open_sections[0]
+                enrolled[section_id] += 1
+                enroll_students.append(student_id)
+                enroll_sections.append(section_id)
+                taken += 1
+            elif len(waiting.setdefault(first_choice, [])) < DEFAULT_WAITLIST_SPACES:
+                waiting[first_choice].append(student_id)
+            else:
+                rejected += 1
+    log(
+        f"Simulated {requests} requests: {len(enroll_students)} enrollments, "
+        f"{sum(len(queue) for queue in waiting.values())} waitlisted, {rejected} rejected "
+        f"({time.monotonic() - started:.1f}s)."
+    )
+
+    # ---- Insert, in dependency order ----
+    created = {}
+    with transaction.atomic():
+        created["Department"] = _insert(Department, ("id", "name", "office", "email", "admin"), (
+            (department_id, department_name[department_id],
+             f"{department_prefix[department_id]}{100 + i}",
+             f"{department_prefix[department_id].lower()}@torontomu.ca", admin_id)
+            for i, department_id in enumerate(department_ids)
+        ), batch_size)
+
+        def person(person_id):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            return first, last, f"{first}.{last}.{person_id}@torontomu.ca".lower()
+
+        def instructors():
+            for i, instructor_id in enumerate(all_instructors):
+                first, last, email = person(instructor_id)
+                yield (instructor_id, first, last, email, f"{first.lower()}1234",
+                       f"ENG{rng.randint(100, 499)}", instructor_department[i], admin_id)
+        created["Instructor"] = _insert(Instructor, (
+            "id", "first_name", "last_name", "email", "password", "office", "department", "admin",
+        ), instructors(), batch_size)
+
+        created["Course"] = _insert(Course, ("id", "course_code", "course_name", "department", "admin"), (
+            (course_id, code, name, department_id, admin_id)
+            for course_id, department_id, code, name in courses
+        ), batch_size)
+
+        created["Section"] = _insert(Section, (
+            "id", "course", "section_number", "term", "total_capacity", "current_capacity",
+            "instructor", "admin",
+        ), (
+            (section_id, courses[course][0], number, term, capacity, enrolled[section_id],
+             instructor_id, admin_id)
+            for section_id, course, number, term, capacity, instructor_id in sections
+        ), batch_size)
+
+        # Students: 85% undergraduates (more in early years), 15% graduates
+        kinds = []
+
+        def students():
+            for student_id in range(first_student, first_student + params.students):
+                first, last, email = person(student_id)
+                kinds.append(rng.random() < 0.85)
+                yield student_id, email, f"{first.lower()}1234", first, last, admin_id
+        created["Student"] = _insert(Student, (
+            "id", "email", "password", "first_name", "last_name", "admin",
+        ), students(), batch_size)
+
+        majors = list(department_name.values())
+        created["UndergraduateStudent"] = _insert(UndergraduateStudent, ("student", "major", "year"), (
+            (first_student + i, rng.choice(majors),
+             rng.choices((1, 2, 3, 4), weights=(32, 27, 22, 19))[0])
+            for i, undergraduate in enumerate(kinds) if undergraduate
+        ), batch_size)
+        created["GraduateStudent"] = _insert(GraduateStudent, ("student", "degree", "g_year"), (
+            (first_student + i, f"{rng.choice(GRADUATE_DEGREES)} {rng.choice(majors)}",
+             rng.choices((1, 2, 3, 4), weights=(45, 35, 12, 8))[0])
+            for i, undergraduate in enumerate(kinds) if not undergraduate
+        ), batch_size)
+
+        created["Enrollment"] = _insert(Enrollment, ("id", "student", "section", "admin"), (
+            (first_enrollment + i, student_id, section_id, admin_id)
+            for i, (student_id, section_id) in enumerate(zip(enroll_students, enroll_sections))
+        ), batch_size)
+        log(f"Inserted {created['Enrollment']} enrollments ({time.monotonic() - started:.1f}s).")
+
+        # Grades: a share of the enrollments (grade_fill); finals are missing
+        # for part of them (term still running)
+        ability = {}
+        difficulty = [rng.gauss(0, 6) for _ in courses]
+
+        def grades():
+            grade_id = first_grade
+            for student_id, section_id in zip(enroll_students, enroll_sections):
+                if rng.random() >= params.grade_fill:
+                    continue
+                course = section_index[section_id][1]
+                if student_id not in ability:
+                    ability[student_id] = rng.gauss(74, 8)
+                mean = ability[student_id] - difficulty[course]
+                yield (
+                    grade_id, student_id, section_id, courses[course][0], admin_id,
+                    _grade(rng, mean + 5), _grade(rng, mean + 2), _grade(rng, mean - 3),
+                    _grade(rng, mean) if rng.random() < 0.8 else None,
+                )
+                grade_id += 1
+        created["Grade"] = _insert(Grade, (
+            "id", "student", "section", "course", "admin", *Grade.GRADE_FIELDS,
+        ), grades(), batch_size)
+        log(f"Inserted {created['Grade']} grades ({time.monotonic() - started:.1f}s).")
+
+        queues = sorted(waiting.items())
+        created["Waitlist"] = _insert(Waitlist, (
+            "id", "section", "waitlist_id", "capacity", "spaces_left", "next_position", "admin",
+        ), (
+            (first_waitlist + i, section_id, 1, DEFAULT_WAITLIST_SPACES,
+             DEFAULT_WAITLIST_SPACES - len(queue), len(queue) + 1, admin_id)
+            for i, (section_id, queue) in enumerate(queues)
+        ), batch_size)
+
+        def waits():
+            wait_id = first_wait
+            for i, (section_id, queue) in enumerate(queues):
+                for position, student_id in enumerate(queue, start=1):
+                    yield wait_id, student_id, first_waitlist + i, position, admin_id
+                    wait_id += 1
+        created["Wait"] = _insert(Wait, ("id", "student", "waitlist", "position", "admin"), waits(), batch_size)
+
+        # Rows were inserted without model signals: recompute the summary table
+        grade_summary.rebuild()
+
+    # Cached counts, dashboards, logins and reports predate the new rows
+    table_stats.clear()
+    dashboard_cache.clear()
+    principals.clear()
+    reports.clear()
+    log(f"Done ({time.monotonic() - started:.1f}s).")
+
+    created["requests"] = requests
+    created["rejected"] = rejected
+    return created
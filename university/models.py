@@ -1,4 +1,6 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 
 # Create your models here.
 class Admin(models.Model):
@@ -120,7 +122,13 @@ class Section(models.Model):
     term = models.CharField(max_length=50)  # e.g. "Fall 2025"
     total_capacity = models.PositiveIntegerField()
     current_capacity = models.PositiveIntegerField(default=0)
-    remaining_capacity = models.PositiveIntegerField()
+    # Maintained by the database (generated column), so queryset .update()
+    # and bulk_update() can never leave it stale
+    remaining_capacity = models.GeneratedField(
+        expression=models.F('total_capacity') - models.F('current_capacity'),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
     instructor = models.ForeignKey(
         Instructor, on_delete=models.PROTECT, related_name='sections'
     )
@@ -136,12 +144,10 @@ class Section(models.Model):
                 name='unique_course_section_number'
             )
         ]
-
-    def save(self, *args, **kwargs):
-        # Auto-update remaining capacity if not manually set
-        if self.total_capacity is not None:
-            self.remaining_capacity = self.total_capacity - self.current_capacity
-        super().save(*args, **kwargs)
+        indexes = [
+            # Instructor dashboard: an instructor's sections in a term
+            models.Index(fields=['instructor', 'term'], name='section_instructor_term_idx'),
+        ]
 
     def __str__(self):
         return f"{self.course.course_code} - Sec {self.section_number} ({self.term})"
@@ -177,13 +183,59 @@ class Grade(models.Model):
         Student, on_delete=models.CASCADE, related_name='grades'
     )
 
+    GRADE_FIELDS = ('lab_grade', 'assignment_grade', 'midterm_grade', 'final_grade')
+
     class Meta:
         unique_together = ('section', 'student')
+        indexes = [
+            # Per-course grade statistics (MIN/MAX of final grades per course)
+            models.Index(fields=['course', 'final_grade'], name='grade_course_final_idx'),
+        ]
+
+    # The GradeSummary update (post_save) commits or rolls back together
+    # with the grade row
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Grade for {self.student} in {self.section}"
 
 
+class GradeSummary(models.Model):
+    # Grade Summary Table (materialized, one row per section)
+    # (section_id PK & FK, course_id FK, then per grade column:
+    #  count of non-NULL grades, sum, sum of squares)
+    # Kept current in the same transaction as every Grade write
+    # (see grade_summary.py); `python manage.py rebuild_grade_summary`
+    # recomputes it from the Grade table.
+    section = models.OneToOneField(
+        Section, on_delete=models.CASCADE, primary_key=True, related_name='grade_summary'
+    )
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name='grade_summaries'
+    )
+
+    lab_grade_count = models.PositiveIntegerField(default=0)
+    lab_grade_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lab_grade_sumsq = models.DecimalField(max_digits=20, decimal_places=4, default=0)
+
+    assignment_grade_count = models.PositiveIntegerField(default=0)
+    assignment_grade_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    assignment_grade_sumsq = models.DecimalField(max_digits=20, decimal_places=4, default=0)
+
+    midterm_grade_count = models.PositiveIntegerField(default=0)
+    midterm_grade_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    midterm_grade_sumsq = models.DecimalField(max_digits=20, decimal_places=4, default=0)
+
+    final_grade_count = models.PositiveIntegerField(default=0)
+    final_grade_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    final_grade_sumsq = models.DecimalField(max_digits=20, decimal_places=4, default=0)
+
+    def __str__(self):
+        return f"Grade summary for {self.section}"
+
+
 class Enrollment(models.Model):
     # Enrollment Table
     # (enrollment_id PK, student_id FK, course_id FK, section_number FK, admin_id FK)
@@ -199,6 +251,11 @@ class Enrollment(models.Model):
 
     class Meta:
         unique_together = ('student', 'section')
+        indexes = [
+            # Rosters, seat counts and duplicate checks by section
+            # (the unique constraint only serves lookups by student)
+            models.Index(fields=['section', 'student'], name='enrollment_section_student_idx'),
+        ]
 
     def __str__(self):
         return f"Enrollment: {self.student} -> {self.section}"
@@ -213,7 +270,12 @@ class Waitlist(models.Model):
         Section, on_delete=models.CASCADE, related_name='waitlists'
     )
     waitlist_id = models.PositiveIntegerField()
+    # Maximum number of waiting students; spaces_left = capacity - entries
+    capacity = models.PositiveIntegerField(default=10)
     spaces_left = models.PositiveIntegerField()
+    # Position handed to the next Wait entry (positions only ever grow,
+    # so removing an entry leaves a gap instead of renumbering the rest)
+    next_position = models.PositiveIntegerField(default=1)
     admin = models.ForeignKey(
         Admin, on_delete=models.PROTECT, related_name='waitlists'
     )
@@ -226,6 +288,18 @@ class Waitlist(models.Model):
             )
         ]
 
+    @classmethod
+    def reserve_positions(cls, waitlist_pk, count=1):
+        """
+        Reserve `count` consecutive positions at the tail of the waitlist
+        and return the first one.
+        """
+        cls.objects.filter(pk=waitlist_pk).update(
+            next_position=models.F('next_position') + count
+        )
+        tail = cls.objects.filter(pk=waitlist_pk).values_list('next_position', flat=True).get()
+        return tail - count
+
     def __str__(self):
         return f"Waitlist {self.waitlist_id} for {self.section}"
 
@@ -240,12 +314,68 @@ class Wait(models.Model):
     waitlist = models.ForeignKey(
         Waitlist, on_delete=models.CASCADE, related_name='entries'
     )
+    # FIFO order within the waitlist (gap-tolerant; 0 = not assigned yet)
+    position = models.PositiveIntegerField(default=0)
     admin = models.ForeignKey(
         Admin, on_delete=models.PROTECT, related_name='wait_entries'
     )
 
     class Meta:
         unique_together = ('student', 'waitlist')
+        indexes = [
+            # FIFO order: position, then id for entries sharing a position
+            models.Index(fields=['waitlist', 'position', 'id'], name='wait_waitlist_order_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Join the tail of the waitlist if no position was assigned
+        if not self.position:
+            self.position = Waitlist.reserve_positions(self.waitlist_id)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.student} on {self.waitlist}"
+
+
+class EnrollmentRequest(models.Model):
+    # Enrollment Request Table (queued enrollment mode)
+    # (request_id PK, ticket, student_id FK, section_id FK, status, message,
+    #  claim_token, created_at, processed_at)
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_ENROLLED = 'enrolled'
+    STATUS_WAITLISTED = 'waitlisted'
+    STATUS_REJECTED = 'rejected'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_ENROLLED, 'Enrolled'),
+        (STATUS_WAITLISTED, 'Waitlisted'),
+        (STATUS_REJECTED, 'Rejected'),
+    ]
+
+    ticket = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name='enrollment_requests'
+    )
+    section = models.ForeignKey(
+        Section, on_delete=models.CASCADE, related_name='enrollment_requests'
+    )
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    message = models.CharField(max_length=255, blank=True)
+    # Set by the worker that picked the request up (see enrollment_queue.py)
+    claim_token = models.UUIDField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers drain pending requests in arrival order
+            models.Index(fields=['status', 'id'], name='enrollreq_status_id_idx'),
+            models.Index(fields=['claim_token'], name='enrollreq_claim_token_idx'),
+        ]
+
+    def __str__(self):
+        return f"Enrollment request {self.ticket}: {self.student} -> {self.section} ({self.status})"
@@ -0,0 +1,101 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from .models import Admin, Instructor, Student
+
+# -------------------------
+# Logged-in principals
+# -------------------------
+# PrincipalMiddleware (middleware.py) gives every request a Principal:
+# request.principal.student / .instructor / .admin is the record behind the
+# session's student_id / instructor_id / admin_id, or None. Each one is
+# looked up the first time it is used in the request, and the records are
+# cached across requests under
+#
+#   principal:<generation>:<role>:<id>
+#
+# so a logged-in request normally runs no lookup query at all. Saving or
+# deleting a student, instructor or admin drops its entry (signals.py);
+# clear() bumps the generation and so drops them all (tables dropped,
+# repopulated or restored). Entries expire after
+# UNIVERSITY_PRINCIPAL_CACHE_SECONDS regardless.
+
+ROLES = {
+    'student': Student,
+    'instructor': Instructor,
+    'admin': Admin,
+}
+
+RECORD_KEY = "principal:{}:{}:{}"
+GENERATION_KEY = "principal:generation"
+
+
+def _timeout():
+    return getattr(settings, "UNIVERSITY_PRINCIPAL_CACHE_SECONDS", 60)
+
+
+def _generation():
+    # A missing counter starts at a fresh, time-based value (see dashboard_cache)
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+def get(role, record_id):
+    """The record of a principal (cached), or None if it no longer exists."""
+    key = RECORD_KEY.format(_generation(), role, record_id)
+    record = cache.get(key)
+    if record is None:
+        record = ROLES[role].objects.filter(id=record_id).first()
+        if record is not None:
+            cache.set(key, record, _timeout())
+    return record
+
+
+def invalidate(role, record_id):
+    """Drop a principal's cached record once the current transaction commits."""
+    key = RECORD_KEY.format(_generation(), role, record_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def clear():
+    """Forget every cached principal record."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        pass
+
+
+class Principal:
+    """The logins of one request's session, each resolved on first use."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def _resolve(self, role):
+        record_id = self.session.get(f'{role}_id')
+        if not record_id:
+            return None
+        record = get(role, record_id)
+        if record is None:
+            # Deleted since login (e.g. tables dropped): log that role out
+            self.session.pop(f'{role}_id', None)
+        return record
+
+    @cached_property
+    def student(self):
+        return self._resolve('student')
+
+    @cached_property
+    def instructor(self):
+        return self._resolve('instructor')
+
+    @cached_property
+    def admin(self):
+        return self._resolve('admin')
@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Enrollment, Section, Wait, Waitlist
+
+
+# -------------------------
+# Recomputed counters
+# -------------------------
+# Every "actual" value below is a correlated aggregate subquery, so finding
+# and fixing drift is a handful of set-based statements whatever the number
+# of sections: nothing is loaded into Python to be recomputed row by row.
+
+def _enrollment_count():
+    return Coalesce(
+        Subquery(
+            Enrollment.objects
+            .filter(section_id=OuterRef('pk'))
+            .order_by()
+            .values('section_id')
+            .annotate(total=Count('id'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def _wait_count():
+    return Coalesce(
+        Subquery(
+            Wait.objects
+            .filter(waitlist_id=OuterRef('pk'))
+            .order_by()
+            .values('waitlist_id')
+            .annotate(total=Count('id'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def _max_position():
+    return Coalesce(
+        Subquery(
+            Wait.objects
+            .filter(waitlist_id=OuterRef('pk'))
+            .order_by()
+            .values('waitlist_id')
+            .annotate(top=Max('position'))
+            .values('top')
+        ),
+        Value(0),
+    )
+
+
+def section_drift():
+    """
+    Sections whose current_capacity disagrees with their Enrollment rows
+    (remaining_capacity is generated from it by the database).
+    """
+    return (
+        Section.objects
+        .annotate(actual_current=_enrollment_count())
+        .exclude(current_capacity=F('actual_current'))
+    )
+
+
+def over_capacity_sections():
+    """Sections with more Enrollment rows than seats (cannot be fixed by a counter update)."""
+    return (
+        Section.objects
+        .annotate(actual_current=_enrollment_count())
+        .filter(actual_current__gt=F('total_capacity'))
+    )
+
+
+def waitlist_drift():
+    """Waitlists whose spaces_left / next_position disagree with their Wait rows."""
+    return (
+        Waitlist.objects
+        .annotate(
+            actual_spaces_left=Greatest(F('capacity') - _wait_count(), Value(0)),
+            min_next_position=_max_position() + 1,
+        )
+        .filter(
+            ~Q(spaces_left=F('actual_spaces_left'))
+            | Q(next_position__lt=F('min_next_position'))
+        )
+    )
+
+
+def fix_drift():
+    """
+    Rewrite every drifted counter with set-based UPDATEs (one per table).
+    Returns (sections_fixed, waitlists_fixed).
+    """
+    with transaction.atomic():
+        sections_fixed = (
+            Section.objects
+            .filter(pk__in=section_drift().values('pk'))
+            .update(current_capacity=_enrollment_count())
+        )
+        waitlists_fixed = (
+            Waitlist.objects
+            .filter(pk__in=waitlist_drift().values('pk'))
+            .update(
+                spaces_left=Greatest(F('capacity') - _wait_count(), Value(0)),
+                next_position=Greatest(F('next_position'), _max_position() + 1),
+            )
+        )
+    return sections_fixed, waitlists_fixed
@@ -0,0 +1,312 @@
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, FloatField, Sum
+from django.db.models.functions import Cast
+
+from .grade_stats import course_grade_stats
+from .models import (
+    Course,
+    Enrollment,
+    Grade,
+    GradeSummary,
+    Instructor,
+    Section,
+    Student,
+)
+
+# -------------------------
+# Report registry
+# -------------------------
+# Each report is a class with a unique `name`, a `title` template, declared
+# parameters (with defaults) and the models its result depends on. Results
+# are cached per parameter set:
+#
+#   reports:result:<name>:<params>:<generation>:<version of each model>
+#
+# A model's version is bumped after every committed write to it (signals.py
+# for single-row saves and deletes, mark_changed() after bulk writes), so a cached result
+# is never served once one of its tables changed. Entries also expire after
+# UNIVERSITY_REPORT_CACHE_SECONDS. Seat counters updated in place
+# (claim_seat/release_seat) are not watched; no report reads them.
+
+RESULT_KEY = "reports:result:{}:{}:{}:{}"
+VERSION_KEY = "reports:version:{}"
+GENERATION_KEY = "reports:generation"
+
+REGISTRY = {}
+
+
+class ReportParameterError(ValueError):
+    """A report parameter could not be parsed."""
+
+
+def register(report_class):
+    """Class decorator adding a report to the registry."""
+    if report_class.name in REGISTRY:
+        raise ValueError(f"Report {report_class.name!r} is already registered.")
+    REGISTRY[report_class.name] = report_class
+    return report_class
+
+
+def get_report(name):
+    return REGISTRY[name]()
+
+
+# ---- Parameter types (parse a query-string value) ----
+def text(value):
+    return str(value).strip()
+
+
+def decimal(value):
+    try:
+        return Decimal(str(value).strip())
+    except InvalidOperation as exc:
+        raise ReportParameterError(f"{value!r} is not a number.") from exc
+
+
+def code_list(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return tuple(code.strip() for code in str(value).split(',') if code.strip())
+
+
+class Report:
+    name = None
+    title = ""
+    # parameter name -> (type, default)
+    params = {}
+    # models whose changes invalidate the cached result
+    depends_on = ()
+
+    def clean(self, **raw):
+        """Parse raw values (e.g. request.GET) and fill in defaults."""
+        cleaned = {}
+        for param, (kind, default) in self.params.items():
+            value = raw.get(param)
+            cleaned[param] = default if value in (None, '') else kind(value)
+        return cleaned
+
+    def get_title(self, params):
+        return self.title.format(
+            **{key: ", ".join(value) if isinstance(value, tuple) else value
+               for key, value in params.items()}
+        )
+
+    def run(self, **params):
+        raise NotImplementedError
+
+    def common_params(self):
+        """Parameter sets warmed by `precompute_reports` (default: the defaults)."""
+        return [{}]
+
+
+# -------------------------
+# Cache
+# -------------------------
+def _timeout():
+    return getattr(settings, "UNIVERSITY_REPORT_CACHE_SECONDS", 5 * 60)
+
+
+def _versions(keys):
+    """Read version counters, starting missing ones at a fresh time-based value."""
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, time.time_ns(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def _result_key(report, params):
+    labels = sorted(_label(model) for model in report.depends_on)
+    generation, *versions = _versions(
+        [GENERATION_KEY] + [VERSION_KEY.format(label) for label in labels]
+    )
+    params_key = ";".join(
+        f"{key}={','.join(value) if isinstance(value, tuple) else value}"
+        for key, value in sorted(params.items())
+    ).replace(" ", "_")
+    return RESULT_KEY.format(report.name, params_key, generation, ".".join(map(str, versions)))
+
+
+def run_report(name, refresh=False, **raw_params):
+    """
+    Result rows of a registered report for the given (raw) parameters,
+    served from the cache when none of its tables changed since.
+    Returns (title, rows).
+    """
+    report = get_report(name)
+    params = report.clean(**raw_params)
+    key = _result_key(report, params)
+    rows = None if refresh else cache.get(key)
+    if rows is None:
+        rows = list(report.run(**params))
+        cache.set(key, rows, _timeout())
+    return report.get_title(params), rows
+
+
+def precompute(names=None, refresh=False):
+    """
+    Compute and cache the common parameter sets of the given reports (all
+    registered reports by default). Returns a list of (name, params, rows).
+    """
+    warmed = []
+    for name in names or sorted(REGISTRY):
+        report = get_report(name)
+        for params in report.common_params():
+            _, rows = run_report(name, refresh=refresh, **params)
+            warmed.append((name, params, len(rows)))
+    return warmed
+
+
+def mark_changed(*models):
+    """
+    Invalidate every cached report that depends on one of the models, once
+    the current transaction commits.
+    """
+    keys = [VERSION_KEY.format(_label(model)) for model in set(models)]
+
+    def apply():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                pass  # no version yet: nothing cached against it
+
+    transaction.on_commit(apply)
+
+
+def clear():
+    """Forget every cached report (e.g. after tables were dropped or reloaded)."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        pass
+
+
+# -------------------------
+# Reports
+# -------------------------
+@register
+class InstructorCourseAverages(Report):
+    name = "instructor_averages"
+    title = "Instructor average final grade (> {min_average}) per course"
+    params = {"min_average": (decimal, Decimal("80"))}
+    depends_on = (Grade, GradeSummary, Section, Instructor, Course)
+
+    def run(self, min_average):
+        # Weighted from the per-section summaries: sum of finals / number of finals
+        return (
+            GradeSummary.objects
+            .filter(final_grade_count__gt=0)
+            .values(
+                'section__instructor__first_name',
+                'section__instructor__last_name',
+                'section__course__course_code',
+            )
+            .annotate(
+                avg_final=(
+                    Cast(Sum('final_grade_sum'), FloatField())
+                    / Cast(Sum('final_grade_count'), FloatField())
+                )
+            )
+            .filter(avg_final__gt=float(min_average))
+            .order_by(
+                'section__instructor__last_name',
+                'section__instructor__first_name',
+                'section__course__course_code',
+            )
+        )
+
+
+@register
+class SharedStudentCourses(Report):
+    name = "shared_students"
+    title = "Instructors & courses with students also in Prof. {instructor}'s {course}"
+    params = {"instructor": (text, "Abhari"), "course": (text, "CPS109")}
+    depends_on = (Enrollment, Student, Section, Instructor, Course)
+
+    def run(self, instructor, course):
+        students = Student.objects.filter(
+            enrollments__section__instructor__last_name=instructor,
+            enrollments__section__course__course_code=course,
+        ).distinct()
+        return (
+            Enrollment.objects
+            .filter(student__in=students)
+            .values(
+                'section__instructor__first_name',
+                'section__instructor__last_name',
+                'section__course__course_code',
+            )
+            .distinct()
+            .order_by(
+                'section__instructor__last_name',
+                'section__instructor__first_name',
+                'section__course__course_code',
+            )
+        )
+
+
+@register
+class CourseGradeStatistics(Report):
+    name = "course_grade_stats"
+    title = "Min / Max / Avg / Variance / Std Dev of {field} per course"
+    params = {"field": (text, "final_grade")}
+    depends_on = (Grade, GradeSummary, Course)
+
+    def clean(self, **raw):
+        params = super().clean(**raw)
+        if params["field"] not in Grade.GRADE_FIELDS:
+            raise ReportParameterError(f"Unknown grade column {params['field']!r}.")
+        return params
+
+    def get_title(self, params):
+        return self.title.format(field=params["field"].replace('_', ' ').replace('grade', 'grades'))
+
+    def run(self, field):
+        return course_grade_stats(field)
+
+    def common_params(self):
+        return [{"field": field} for field in Grade.GRADE_FIELDS]
+
+
+@register
+class CoursesWithoutEnrollments(Report):
+    name = "empty_courses"
+    title = "Courses with no students enrolled"
+    depends_on = (Enrollment, Section, Course)
+
+    def run(self):
+        return (
+            Course.objects
+            .annotate(total_enrollments=Count('sections__enrollments', distinct=True))
+            .filter(total_enrollments=0)
+            .values('course_code', 'course_name')
+            .order_by('course_code')
+        )
+
+
+@register
+class CourseStudentCounts(Report):
+    name = "course_student_counts"
+    title = "Student counts in {courses}"
+    params = {"courses": (code_list, ("CPS109", "CPS205"))}
+    depends_on = (Enrollment, Section, Course)
+
+    def run(self, courses):
+        return (
+            Course.objects
+            .filter(course_code__in=courses)
+            .annotate(student_count=Count('sections__enrollments__student', distinct=True))
+            .values('course_code', 'student_count')
+            .order_by('course_code')
+        )
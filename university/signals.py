@@ -0,0 +1,113 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from . import dashboard_cache, grade_summary, principals, reports, table_stats
+from .models import Enrollment, Grade, Student, Wait
+
+# Saves are tracked with post_save receivers. Deletes are not: a delete
+# receiver on a model turns off Django's fast delete for it, so every
+# cascade would fetch and delete its rows one by one. Code that deletes
+# rows reports them instead, either inline (enrollment.py) or through
+# delete_rows() below.
+
+
+def count_created(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        table_stats.adjust(sender, 1)
+
+
+def table_changed(sender, **kwargs):
+    if not kwargs.get('raw'):
+        reports.mark_changed(sender)
+
+
+def student_rows_changed(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        dashboard_cache.invalidate(instance.student_id)
+
+
+def principal_changed(sender, instance, **kwargs):
+    principals.invalidate(sender.__name__.lower(), instance.pk)
+
+
+def grade_saving(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._summary_before = grade_summary.stored_values(instance)
+
+
+def grade_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = grade_summary.Deltas()
+    before = getattr(instance, '_summary_before', None)
+    if before is not None:
+        deltas.add(before[0], before[1], None)
+    deltas.add(instance.section_id, None, grade_summary.values_of(instance))
+    grade_summary.apply(deltas)
+    grade_summary.snapshot(instance)
+
+
+# -------------------------
+# Deletes
+# -------------------------
+def rows_deleted(counts, student_ids=None):
+    """
+    Account for deleted rows: `counts` is the {label: rows} dict returned
+    by QuerySet.delete(). Dashboards of `student_ids` are dropped, or of
+    every student when the students aren't known.
+    """
+    models = [apps.get_model(label) for label, deleted in counts.items() if deleted]
+    models = [model for model in models if model._meta.app_label == 'university']
+    for model in models:
+        table_stats.adjust(model, -counts[model._meta.label])
+    if models:
+        reports.mark_changed(*models)
+    if {Enrollment, Wait, Grade} & set(models):
+        if student_ids is None:
+            transaction.on_commit(dashboard_cache.clear)
+        else:
+            dashboard_cache.invalidate(*student_ids)
+
+
+def delete_rows(queryset):
+    """
+    Delete the queryset's rows (and their cascades) and account for them,
+    recounting the grade summaries of sections that lose grades. Returns
+    what QuerySet.delete() returns.
+    """
+    with transaction.atomic():
+        # (deleted sections take their summary rows with them)
+        if queryset.model is Grade:
+            graded = queryset.values_list('section_id', flat=True)
+        elif queryset.model is Student:
+            graded = Grade.objects.filter(student__in=queryset).values_list('section_id', flat=True)
+        else:
+            graded = []
+        graded = set(graded)
+        deleted, counts = queryset.delete()
+        rows_deleted(counts)
+        grade_summary.recount(graded)
+    return deleted, counts
+
+
+def connect():
+    # Connected per model, so models of other apps send no extra signals
+    for model in table_stats.tracked_models():
+        post_save.connect(count_created, sender=model, dispatch_uid=f'table_stats_save_{model._meta.label_lower}')
+        post_save.connect(table_changed, sender=model, dispatch_uid=f'reports_save_{model._meta.label_lower}')
+
+    # Rows shown on the student dashboard
+    for model in (Enrollment, Wait, Grade):
+        post_save.connect(student_rows_changed, sender=model, dispatch_uid=f'dashboard_save_{model._meta.label_lower}')
+
+    # Cached records of logged-in students, instructors and admins (no
+    # cascade reaches these models: everything pointing at them is PROTECT
+    # or a single OneToOne)
+    for model in principals.ROLES.values():
+        post_save.connect(principal_changed, sender=model, dispatch_uid=f'principal_save_{model._meta.label_lower}')
+        post_delete.connect(principal_changed, sender=model, dispatch_uid=f'principal_delete_{model._meta.label_lower}')
+
+    # Grade summary (count/sum/sum of squares per section)
+    pre_save.connect(grade_saving, sender=Grade, dispatch_uid='grade_summary_pre_save')
+    post_save.connect(grade_saved, sender=Grade, dispatch_uid='grade_summary_save')
@@ -0,0 +1,181 @@
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import dashboard_cache, principals, reports, table_stats
+
+# Pages copied per backup step (progress is reported between steps)
+BACKUP_STEP_PAGES = 4096
+
+SNAPSHOT_SUFFIX = ".sqlite3"
+
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+# -------------------------
+# Database snapshots (SQLite)
+# -------------------------
+# save() copies the whole database into a snapshot file with SQLite's online
+# backup API: a consistent copy, taken while the site keeps running.
+# restore() attaches a snapshot and copies the university tables back in one
+# transaction, table by table inside SQLite (INSERT ... SELECT, foreign key
+# checks off). Their indexes are dropped first and rebuilt at the end, which
+# is several times faster than updating them row by row. Sessions, users
+# and jobs are left alone, so a restore running as a background job can
+# still record its own outcome. The snapshot must have the same university
+# migrations applied as the database.
+
+
+class SnapshotError(ValueError):
+    """Bad snapshot name, missing snapshot or incompatible schema."""
+
+
+def snapshot_dir():
+    return Path(getattr(settings, "UNIVERSITY_SNAPSHOT_DIR", Path.home() / ".university_enrollment" / "snapshots"))
+
+
+def snapshot_path(name):
+    if not _NAME.match(name or ""):
+        raise SnapshotError(
+            f"Invalid snapshot name {name!r} (letters, digits, '.', '_' and '-', up to 64 characters)."
+        )
+    return snapshot_dir() / f"{name}{SNAPSHOT_SUFFIX}"
+
+
+def _check_sqlite():
+    if connection.vendor != "sqlite":
+        raise SnapshotError("Snapshots use SQLite's backup API; the database isn't SQLite.")
+
+
+def list_snapshots():
+    """[{name, size, modified}] of the saved snapshots, newest first."""
+    directory = snapshot_dir()
+    if not directory.is_dir():
+        return []
+    snapshots = []
+    for path in directory.glob(f"*{SNAPSHOT_SUFFIX}"):
+        stat = path.stat()
+        snapshots.append({
+            "name": path.name[:-len(SNAPSHOT_SUFFIX)],
+            "size": stat.st_size,
+            "modified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        })
+    return sorted(snapshots, key=lambda snapshot: snapshot["modified"], reverse=True)
+
+
+def save(name, overwrite=False, progress=None):
+    """
+    Copy the database into the snapshot `name`. progress(done, total) is
+    called with page counts as the copy goes. Returns the snapshot path.
+    """
+    _check_sqlite()
+    path = snapshot_path(name)
+    if path.exists() and not overwrite:
+        raise SnapshotError(f"Snapshot {name!r} already exists.")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    def report(status, remaining, total):
+        if progress:
+            progress(total - remaining, total)
+
+    # Written next to the target and renamed, so a snapshot is never half-written
+    partial = path.with_name(path.name + ".partial")
+    connection.ensure_connection()
+    target = sqlite3.connect(partial)
+    try:
+        with target:
+            connection.connection.backup(target, pages=BACKUP_STEP_PAGES, progress=report)
+    finally:
+        target.close()
+    os.replace(partial, path)
+    return path
+
+
+def delete(name):
+    path = snapshot_path(name)
+    if not path.exists():
+        raise SnapshotError(f"No snapshot named {name!r}.")
+    path.unlink()
+
+
+def university_tables():
+    """db_table of every university model."""
+    return [model._meta.db_table for model in apps.get_app_config("university").get_models()]
+
+
+def _columns(cursor, schema, table):
+    # table_xinfo marks generated columns as hidden (2 or 3); they can't be inserted
+    cursor.execute(f'PRAGMA {schema}.table_xinfo("{table}")')
+    return [row[1] for row in cursor.fetchall() if row[6] == 0]
+
+
+def _indexes(cursor, tables):
+    """(name, CREATE INDEX sql) of the tables' indexes (constraint autoindexes have no sql and stay)."""
+    cursor.execute(
+        "SELECT name, sql FROM main.sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+        f"AND tbl_name IN ({', '.join(['%s'] * len(tables))})",
+        tables,
+    )
+    return cursor.fetchall()
+
+
+def _migrations(cursor, schema):
+    cursor.execute(f"SELECT name FROM {schema}.django_migrations WHERE app = 'university'")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def restore(name, progress=None):
+    """
+    Replace the contents of every university table with the snapshot's.
+    progress(done, total) is called as tables are copied (the last step is
+    the index rebuild). Returns {table: rows restored}.
+    """
+    _check_sqlite()
+    path = snapshot_path(name)
+    if not path.exists():
+        raise SnapshotError(f"No snapshot named {name!r}.")
+
+    tables = university_tables()
+    restored = {}
+    connection.ensure_connection()
+    # (foreign keys can only be switched off outside a transaction)
+    with connection.constraint_checks_disabled():
+        with connection.cursor() as cursor:
+            cursor.execute("ATTACH DATABASE %s AS snapshot", [str(path)])
+            try:
+                missing = _migrations(cursor, "snapshot") ^ _migrations(cursor, "main")
+                if missing:
+                    raise SnapshotError(
+                        f"Snapshot {name!r} has a different schema (migrations "
+                        f"{', '.join(sorted(missing))} differ); migrate to the same state first."
+                    )
+                with transaction.atomic():
+                    indexes = _indexes(cursor, tables)
+                    for index, sql in indexes:
+                        cursor.execute(f'DROP INDEX main."{index}"')
+                    for done, table in enumerate(tables):
+                        columns = ", ".join(f'"{column}"' for column in _columns(cursor, "main", table))
+                        cursor.execute(f'DELETE FROM main."{table}"')
+                        cursor.execute(
+                            f'INSERT INTO main."{table}" ({columns}) SELECT {columns} FROM snapshot."{table}"'
+                        )
+                        restored[table] = cursor.rowcount
+                        if progress:
+                            progress(done + 1, len(tables) + 1)
+                    for index, sql in indexes:
+                        cursor.execute(sql)
+                    if progress:
+                        progress(len(tables) + 1, len(tables) + 1)
+            finally:
+                cursor.execute("DETACH DATABASE snapshot")
+
+    table_stats.clear()
+    dashboard_cache.clear()
+    principals.clear()
+    reports.clear()
+    return restored
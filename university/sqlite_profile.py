@@ -0,0 +1,181 @@
+import logging
+import random
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# SQLite connection profile
+# -------------------------
+# configure() runs on every new SQLite connection (connection_created, see
+# apps.py) and applies the profile's pragmas:
+#
+#   journal_mode=WAL      readers never wait for a writer (nor a writer for
+#                         readers); only writers queue behind each other
+#   busy_timeout          how long a writer waits for the write lock before
+#                         failing with "database is locked"
+#   synchronous=NORMAL    fsync at checkpoints only; safe with WAL (a power
+#                         loss can undo the last commits, never corrupt)
+#   cache_size, mmap_size page cache (negative = KiB) and memory-mapped I/O
+#   temp_store=MEMORY     sorts and temp indexes stay in memory
+#   journal_size_limit    WAL file size kept after a checkpoint
+#
+# UNIVERSITY_SQLITE_PRAGMAS overrides single entries (None leaves SQLite's
+# default). With DATABASES OPTIONS transaction_mode=IMMEDIATE, a transaction
+# takes the write lock at BEGIN and waits for it there (busy_timeout);
+# one that is still refused raises SQLITE_BUSY, and the enrollment
+# transactions (decorated with retry_on_busy) are then run again from the
+# start, UNIVERSITY_SQLITE_BUSY_RETRIES times at most.
+
+DEFAULT_PRAGMAS = {
+    # (busy_timeout first: switching to WAL needs a moment of exclusive access)
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'journal_size_limit': 64 * 1024 * 1024,
+}
+
+DEFAULT_BUSY_RETRIES = 3
+
+# First retry delay in seconds; doubled per attempt, with jitter
+RETRY_BACKOFF = 0.05
+
+# SQLite's primary result codes for a lock held by another connection
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+Profile = namedtuple('Profile', 'pragmas busy_retries transaction_mode')
+
+# SQLite's own defaults (rollback journal, full fsync, deferred
+# transactions, no retries): the baseline of benchmark_sqlite
+BASELINE = Profile(
+    pragmas={
+        'busy_timeout': 5000,
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'journal_size_limit': -1,
+    },
+    busy_retries=0,
+    transaction_mode=None,
+)
+
+# Set by use_profile() (benchmarks); None means the configured profile
+_override = None
+
+
+def configured():
+    """The profile given by the settings."""
+    pragmas = dict(DEFAULT_PRAGMAS)
+    pragmas.update(getattr(settings, 'UNIVERSITY_SQLITE_PRAGMAS', {}))
+    return Profile(
+        pragmas={name: value for name, value in pragmas.items() if value is not None},
+        busy_retries=getattr(settings, 'UNIVERSITY_SQLITE_BUSY_RETRIES', DEFAULT_BUSY_RETRIES),
+        transaction_mode=connection.settings_dict.get('OPTIONS', {}).get('transaction_mode'),
+    )
+
+
+def active():
+    return _override or configured()
+
+
+def configure(sender, connection, **kwargs):
+    """connection_created receiver: apply the active profile's pragmas."""
+    if connection.vendor != 'sqlite':
+        return
+    if _override is not None:
+        # (read from OPTIONS when the connection opened; see use_profile)
+        mode = _override.transaction_mode
+        connection.transaction_mode = mode.upper() if mode else None
+    # (driver cursor: pragmas aren't part of any request's queries)
+    cursor = connection.connection.cursor()
+    try:
+        for name, value in active().pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+            if name == 'journal_mode':
+                mode = cursor.fetchone()[0]
+                # In-memory databases (tests) only have the "memory" journal
+                if mode.lower() != str(value).lower() and not connection.is_in_memory_db():
+                    logger.warning(
+                        "SQLite journal_mode is %s, not %s (other connections open?)", mode, value
+                    )
+    finally:
+        cursor.close()
+
+
+def pragma_values(names=None):
+    """{pragma: current value} on this thread's connection."""
+    connection.ensure_connection()
+    cursor = connection.connection.cursor()
+    try:
+        values = {}
+        for name in names or active().pragmas:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+        return values
+    finally:
+        cursor.close()
+
+
+@contextmanager
+def use_profile(profile):
+    """
+    Apply `profile` to connections opened inside the block (all threads).
+    This thread's connection is closed on entry and exit so it reconnects
+    with the right pragmas.
+    """
+    global _override
+    previous = _override
+    connection.close()
+    _override = profile
+    try:
+        yield
+    finally:
+        connection.close()
+        _override = previous
+
+
+# -------------------------
+# Retrying busy transactions
+# -------------------------
+def is_busy(exc):
+    """Whether a database error means another connection held a lock."""
+    code = getattr(exc.__cause__, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (SQLITE_BUSY, SQLITE_LOCKED)
+    return 'locked' in str(exc).lower()
+
+
+def retry_on_busy(func):
+    """
+    Run func (one whole transaction) again when it fails with SQLITE_BUSY,
+    after a short randomized backoff. Inside an outer transaction nothing is
+    retried: only the outermost block can start over.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        retries = active().busy_retries
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if attempt >= retries or connection.in_atomic_block or not is_busy(exc):
+                    raise
+                attempt += 1
+                delay = RETRY_BACKOFF * 2 ** (attempt - 1)
+                logger.info("%s: database busy, retry %s in %.2fs", func.__qualname__, attempt, delay)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+    return wrapper
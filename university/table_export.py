@@ -0,0 +1,209 @@
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .grades import _Echo
+from .models import (
+    Admin,
+    Course,
+    Department,
+    Enrollment,
+    Grade,
+    GraduateStudent,
+    Instructor,
+    Section,
+    Student,
+    UndergraduateStudent,
+    Wait,
+    Waitlist,
+)
+
+# Tables shown on the admin dashboard and available for export.
+# filters: export filter name -> lookup applied to the table's queryset
+# (term is matched exactly, department by id, see resolve_filters()).
+TABLES_CONFIG = [
+    {"id": "admin", "label": "Admin", "model": Admin, "filters": {}},
+    {"id": "department", "label": "Department", "model": Department,
+     "filters": {"department": "id"}},
+    {"id": "student", "label": "Student", "model": Student, "filters": {}},
+    {"id": "undergraduate", "label": "UndergraduateStudent", "model": UndergraduateStudent, "filters": {}},
+    {"id": "graduate", "label": "GraduateStudent", "model": GraduateStudent, "filters": {}},
+    {"id": "instructor", "label": "Instructor", "model": Instructor,
+     "filters": {"department": "department_id"}},
+    {"id": "course", "label": "Course", "model": Course,
+     "filters": {"department": "department_id"}},
+    {"id": "section", "label": "Section", "model": Section,
+     "filters": {"term": "term", "department": "course__department_id"}},
+    {"id": "enrollment", "label": "Enrollment", "model": Enrollment,
+     "filters": {"term": "section__term", "department": "section__course__department_id"}},
+    {"id": "grade", "label": "Grade", "model": Grade,
+     "filters": {"term": "section__term", "department": "course__department_id"}},
+    {"id": "waitlist", "label": "Waitlist", "model": Waitlist,
+     "filters": {"term": "section__term", "department": "section__course__department_id"}},
+    {"id": "wait", "label": "Wait", "model": Wait,
+     "filters": {"term": "waitlist__section__term", "department": "waitlist__section__course__department_id"}},
+]
+
+TABLES = {table["id"]: table for table in TABLES_CONFIG}
+
+FORMATS = ("csv", "ndjson")
+
+# Rows fetched per database round trip
+EXPORT_CHUNK_SIZE = 5000
+
+# Output is handed out in blocks of about this many bytes
+BLOCK_SIZE = 64 * 1024
+
+# Never exported (credentials are stored in plain text)
+EXCLUDED_FIELDS = {"password"}
+
+# -------------------------
+# Streaming table export
+# -------------------------
+# Rows are read with values_list().iterator(), so no model instances are
+# built and memory use doesn't depend on the table size. Output is a
+# generator of bytes blocks (optionally gzip-compressed as it goes), usable
+# both as a StreamingHttpResponse body and by `manage.py export_tables`.
+
+
+class ExportError(ValueError):
+    """Unknown table, format or filter value."""
+
+
+def get_table(table_id):
+    try:
+        return TABLES[table_id]
+    except KeyError:
+        raise ExportError(
+            f"Unknown table {table_id!r} (choose from {', '.join(TABLES)})."
+        ) from None
+
+
+def columns(model):
+    """Exported column names: every stored column except EXCLUDED_FIELDS."""
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if field.name not in EXCLUDED_FIELDS
+    ]
+
+
+def resolve_filters(term=None, department=None):
+    """
+    Normalize the filter values: term as given, department as an id (a
+    department may be given by id or by name). Returns a dict of the
+    filters that are set.
+    """
+    filters = {}
+    if term:
+        filters["term"] = term.strip()
+    if department:
+        department = str(department).strip()
+        if department.isdigit():
+            department_id = Department.objects.filter(id=int(department)).values_list("id", flat=True).first()
+        else:
+            department_id = (
+                Department.objects.filter(name__iexact=department).values_list("id", flat=True).first()
+            )
+        if department_id is None:
+            raise ExportError(f"Unknown department {department!r}.")
+        filters["department"] = department_id
+    return filters
+
+
+def supports(table, filters):
+    """Whether every given filter applies to the table."""
+    return all(name in table["filters"] for name in filters)
+
+
+def rows(table, filters=None):
+    """
+    (columns, iterator of value tuples) for one table, in primary key order.
+    Raises ExportError if a filter doesn't apply to the table.
+    """
+    filters = filters or {}
+    unsupported = [name for name in filters if name not in table["filters"]]
+    if unsupported:
+        raise ExportError(f"The {table['id']} table can't be filtered by {', '.join(unsupported)}.")
+    model = table["model"]
+    names = columns(model)
+    queryset = model.objects.filter(
+        **{table["filters"][name]: value for name, value in filters.items()}
+    )
+    return names, queryset.order_by("pk").values_list(*names).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def csv_lines(table, filters=None):
+    """CSV text lines (header first) of one table; NULL is written as an empty cell."""
+    names, values = rows(table, filters)
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in values:
+        yield writer.writerow(["" if value is None else value for value in row])
+
+
+def ndjson_lines(tables, filters=None, tag=False):
+    """
+    One JSON object per row for each table. With tag=True every object also
+    carries a "table" key, so several tables can share one stream.
+    """
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for table in tables:
+        names, values = rows(table, filters)
+        for row in values:
+            record = dict(zip(names, row))
+            if tag:
+                record = {"table": table["id"], **record}
+            yield encoder.encode(record) + "\n"
+
+
+def lines(tables, fmt, filters=None):
+    """Text lines of one table (CSV) or of one or more tables (NDJSON)."""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format {fmt!r} (choose from {', '.join(FORMATS)}).")
+    # Check the filters now: the generators only run once output is streamed
+    for table in tables:
+        if not supports(table, filters or {}):
+            raise ExportError(f"The {table['id']} table can't be filtered by {', '.join(filters)}.")
+    if fmt == "csv":
+        if len(tables) != 1:
+            raise ExportError("CSV exports one table at a time; use NDJSON for several tables.")
+        return csv_lines(tables[0], filters)
+    return ndjson_lines(tables, filters, tag=len(tables) > 1)
+
+
+def encode(text, compress=False):
+    """
+    Join text lines into UTF-8 blocks of about BLOCK_SIZE bytes, gzip
+    compressing them on the fly when compress is set.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31: gzip container
+    buffer, size = [], 0
+    for line in text:
+        data = line.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= BLOCK_SIZE:
+            block = b"".join(buffer)
+            buffer, size = [], 0
+            if compressor:
+                block = compressor.compress(block)
+            if block:
+                yield block
+    block = b"".join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+
+def filename(table_ids, fmt, compress=False, filters=None):
+    """Download/file name, e.g. enrollment-Fall_2025.csv.gz."""
+    parts = ["-".join(table_ids) if len(table_ids) <= 2 else "tables"]
+    filters = filters or {}
+    if "term" in filters:
+        parts.append(filters["term"])
+    if "department" in filters:
+        parts.append(f"dept{filters['department']}")
+    name = "-".join(parts).replace(" ", "_")
+    return f"{name}.{fmt}{'.gz' if compress else ''}"
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Cached table row counts
+# -------------------------
+# Counts live in the Django cache (one integer key per model) and are kept
+# current by post_save signals, by signals.rows_deleted() after deletes (see
+# signals.py) and by explicit adjust() calls after bulk operations. A full exact recount runs periodically in the
+# background or through `python manage.py refresh_table_stats`. Tables that
+# have no cached count yet are estimated from database metadata, never
+# counted row by row on the request path.
+#
+# All processes share the counters through the CACHES backend (see
+# settings); cache.incr() there isn't atomic across processes, so a
+# concurrent update can be lost until the next exact refresh.
+
+COUNT_KEY = "table_stats:count:{}"
+META_KEY = "table_stats:meta"
+
+_refresh_lock = threading.Lock()
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def _refresh_interval():
+    return getattr(settings, "UNIVERSITY_TABLE_STATS_REFRESH_SECONDS", 15 * 60)
+
+
+def adjust(model, delta):
+    """
+    Add delta to the cached row count of model once the current transaction
+    commits (rolled-back writes never touch the counters).
+    """
+    if not delta:
+        return
+    key = COUNT_KEY.format(_label(model))
+
+    def apply():
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Not cached yet: the next read estimates it from scratch
+            pass
+
+    transaction.on_commit(apply)
+
+
+def _estimate_counts(models):
+    """
+    Fast approximate counts in a single metadata query:
+    MAX(rowid) per table on SQLite, pg_class.reltuples on PostgreSQL.
+    Returns {model: count}; models that could not be estimated are left out.
+    """
+    tables = {model._meta.db_table: model for model in models}
+    quote = connection.ops.quote_name
+    estimates = {}
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(" UNION ALL ".join(
+                f"SELECT %s, MAX(rowid) FROM {quote(table)}" for table in tables
+            ), list(tables))
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(%s)",
+                [list(tables)],
+            )
+        else:
+            return {}
+        for table, count in cursor.fetchall():
+            if count is None:
+                count = 0  # empty SQLite table
+            if count >= 0:  # PostgreSQL reports -1 for never-analyzed tables
+                estimates[tables[table]] = int(count)
+    return estimates
+
+
+def get_table_counts(models):
+    """
+    Row counts for the given models as {model: (count, approximate)}.
+    Served from the cache; missing entries are estimated and cached as
+    approximate until the next exact refresh.
+    """
+    keys = {model: COUNT_KEY.format(_label(model)) for model in models}
+    cached = cache.get_many(keys.values())
+    meta = cache.get(META_KEY) or {"refreshed_at": 0, "approximate": []}
+
+    missing = [model for model in models if keys[model] not in cached]
+    if missing:
+        estimates = _estimate_counts(missing)
+        # Databases without cheap metadata get an exact count, once
+        exact = {model: model.objects.count() for model in missing if model not in estimates}
+        cache.set_many({keys[model]: count for model, count in exact.items()}, None)
+        cached.update({keys[model]: count for model, count in exact.items()})
+        cache.set_many({keys[model]: count for model, count in estimates.items()}, None)
+        cached.update({keys[model]: count for model, count in estimates.items()})
+        meta["approximate"] = sorted(
+            set(meta["approximate"]) | {_label(model) for model in estimates}
+        )
+        cache.set(META_KEY, meta, None)
+
+    if time.time() - meta["refreshed_at"] > _refresh_interval():
+        refresh_in_background()
+
+    return {
+        model: (cached[keys[model]], _label(model) in meta["approximate"])
+        for model in models
+    }
+
+
+def refresh_exact_counts(models):
+    """Recount every table exactly and replace the cached values."""
+    counts = {model: model.objects.count() for model in models}
+    cache.set_many(
+        {COUNT_KEY.format(_label(model)): count for model, count in counts.items()}, None
+    )
+    cache.set(META_KEY, {"refreshed_at": time.time(), "approximate": []}, None)
+    return counts
+
+
+def refresh_in_background():
+    """Start an exact refresh in a worker thread unless one is already running."""
+    if not _refresh_lock.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            refresh_exact_counts(tracked_models())
+        except Exception:
+            logger.exception("Table statistics refresh failed")
+        finally:
+            connection.close()
+            _refresh_lock.release()
+
+    threading.Thread(target=run, name="table-stats-refresh", daemon=True).start()
+
+
+def clear():
+    """Forget every cached count (e.g. after tables were dropped or recreated)."""
+    cache.delete(META_KEY)
+    cache.delete_many([COUNT_KEY.format(_label(model)) for model in tracked_models()])
+
+
+def tracked_models():
+    """Every model of the university app (all of them are counted)."""
+    return list(apps.get_app_config("university").get_models())
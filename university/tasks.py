@@ -0,0 +1,110 @@
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+from jobs.runner import task
+
+from . import dashboard_cache, principals, reports, snapshots, table_export, table_stats
+
+# -------------------------
+# Background tasks
+# -------------------------
+# Long operations run as jobs (see jobs/runner.py). The table operations of
+# the tables menu share a group, so they run one at a time and in the
+# order they were requested (e.g. drop, then create, then populate, or
+# restore a snapshot).
+
+TABLES_GROUP = 'university-tables'
+
+
+def _clear_caches():
+    table_stats.clear()
+    dashboard_cache.clear()
+    principals.clear()
+    reports.clear()
+
+
+def _migrate(progress, zero=False):
+    """Migrate the university app to its latest (or zero) state, one step per migration."""
+    executor = MigrationExecutor(connection)
+    if zero:
+        targets = [('university', None)]
+    else:
+        targets = [key for key in executor.loader.graph.leaf_nodes() if key[0] == 'university']
+    plan = executor.migration_plan(targets)
+    progress.update(done=0, total=len(plan))
+
+    def on_line(line):
+        if line.lstrip().startswith(('Applying ', 'Unapplying ')):
+            progress.step()
+
+    call_command('migrate', 'university', *(['zero'] if zero else []), stdout=progress.output(on_line))
+    return {"migrations": len(plan)}
+
+
+@task('create_tables', group=TABLES_GROUP)
+def create_tables(progress):
+    """Recreate the university tables by applying its migrations (no data)."""
+    result = _migrate(progress)
+    _clear_caches()
+    return result
+
+
+@task('populate_tables', group=TABLES_GROUP)
+def populate_tables(progress, **options):
+    """Run seed_mock_data with the given options (e.g. scale=2)."""
+    call_command('seed_mock_data', stdout=progress.output(), **options)
+    _clear_caches()
+
+
+@task('drop_tables', group=TABLES_GROUP)
+def drop_tables(progress):
+    """Drop the university tables by unapplying all its migrations."""
+    result = _migrate(progress, zero=True)
+    _clear_caches()
+    return result
+
+
+@task('reconcile_capacity')
+def reconcile_capacity(progress, fix=False):
+    """Report (and with fix=True, rewrite) drifted seat and waitlist counters."""
+    call_command('reconcile_capacity', fix=fix, stdout=progress.output())
+
+
+@task('precompute_reports')
+def precompute_reports(progress, names=None, refresh=False):
+    """Warm the report cache for the reports' common parameter sets."""
+    call_command('precompute_reports', names=names, refresh=refresh, stdout=progress.output())
+
+
+@task('export_tables')
+def export_tables(progress, output_dir, tables=(), **options):
+    """Export tables into output_dir (one file per table); returns the file paths."""
+    progress.update(total=len(tables or table_export.TABLES))
+    files = {}
+
+    def on_line(line):
+        # export_tables prints "<table>: <path>" per finished file
+        table_id, sep, path = line.partition(": ")
+        if sep and table_id in table_export.TABLES:
+            files[table_id] = path
+            progress.step()
+
+    call_command('export_tables', *tables, output_dir=output_dir, stdout=progress.output(on_line), **options)
+    return {"files": files}
+
+
+@task('save_snapshot', group=TABLES_GROUP)
+def save_snapshot(progress, name, overwrite=False):
+    """Copy the database into a snapshot file."""
+    path = snapshots.save(name, overwrite=overwrite, progress=lambda done, total: progress.update(done, total))
+    progress.update(message=f"Saved snapshot {name}.")
+    return {"path": str(path), "size": path.stat().st_size}
+
+
+@task('restore_snapshot', group=TABLES_GROUP)
+def restore_snapshot(progress, name):
+    """Replace the university tables with a snapshot's."""
+    restored = snapshots.restore(name, progress=lambda done, total: progress.update(done, total))
+    progress.update(message=f"Restored snapshot {name} ({sum(restored.values())} rows).")
+    return restored
@@ -0,0 +1,967 @@
+import gzip
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from jobs import runner
+from jobs.models import Job
+
+from . import grade_stats, grade_summary, load_test, mock_data, principals, reports, snapshots, sqlite_profile
+from . import enrollment, enrollment_queue, views
+from .enrollment import enroll_from_waitlist, enroll_student, join_waitlist, promote_waitlists, waitlist_rank
+from .grades import import_section_csv, save_section_grades
+from .reconcile import fix_drift, section_drift, waitlist_drift
+from .models import (
+    Admin, Course, Department, Enrollment, EnrollmentRequest, Grade, GradeSummary, Instructor, Section,
+    Student, Wait, Waitlist,
+)
+from .signals import delete_rows
+from .view_checks import LOCAL_CACHES, full_scans, sample_ids
+
+
+def create_section(total_capacity, current_capacity=0, course_code='TST100'):
+    """A section (with its course, instructor and admin) for the tests."""
+    admin = Admin.objects.create(username=f'admin-{course_code}', password='x', first_name='A', last_name='D')
+    department = Department.objects.create(name='Testing', email='dept@example.invalid', admin=admin)
+    instructor = Instructor.objects.create(
+        first_name='I', last_name='N', email=f'{course_code}@example.invalid', password='x',
+        department=department, admin=admin,
+    )
+    course = Course.objects.create(
+        course_code=course_code, course_name='Test course', department=department, admin=admin
+    )
+    return Section.objects.create(
+        course=course, section_number=1, term='Fall 2025', total_capacity=total_capacity,
+        current_capacity=current_capacity, instructor=instructor, admin=admin,
+    )
+
+
+def log_in(client, role, record_id):
+    """Give the test client's session a student/instructor/admin login."""
+    session = client.session
+    session[f'{role}_id'] = record_id
+    session.save()
+
+
+def create_students(section, count, prefix='student'):
+    """`count` students (belonging to the section's admin), in id order."""
+    Student.objects.bulk_create([
+        Student(email=f'{prefix}{i}@example.invalid', password='x', first_name='S', last_name=str(i),
+                admin_id=section.admin_id)
+        for i in range(count)
+    ])
+    return list(Student.objects.filter(email__startswith=prefix).order_by('id'))
+
+
+# -------------------------
+# Seat claims under concurrency
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class ConcurrentEnrollmentTests(TransactionTestCase):
+    STUDENTS = 300
+    SEATS = 50
+
+    def test_simultaneous_adds_never_over_enroll(self):
+        section = create_section(total_capacity=self.SEATS)
+        Student.objects.bulk_create([
+            Student(email=f'student{i}@example.invalid', password='x', first_name='S', last_name=str(i),
+                    admin_id=section.admin_id)
+            for i in range(self.STUDENTS)
+        ])
+        student_ids = list(Student.objects.values_list('id', flat=True))
+
+        start = threading.Barrier(len(student_ids))
+        outcomes = []
+        errors = []
+
+        def add(student_id):
+            try:
+                start.wait()
+                outcomes.append(enroll_student(student_id, section.id, section.admin_id))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=add, args=(student_id,)) for student_id in student_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(outcomes.count(True), self.SEATS)
+        section.refresh_from_db()
+        self.assertEqual(section.current_capacity, self.SEATS)
+        self.assertEqual(section.remaining_capacity, 0)
+        self.assertEqual(Enrollment.objects.filter(section=section).count(), self.SEATS)
+
+
+# -------------------------
+# Queued enrollment
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES, UNIVERSITY_QUEUED_ENROLLMENT=True)
+class EnrollmentQueueTests(TestCase):
+    def test_resubmitting_an_open_request_returns_the_same_ticket(self):
+        section = create_section(total_capacity=1)
+        student, = create_students(section, 1)
+        first = enrollment_queue.submit_enrollment_request(student.id, section.id)
+        self.assertEqual(enrollment_queue.submit_enrollment_request(student.id, section.id), first)
+
+    def test_a_batch_fills_the_seats_then_the_waitlist(self):
+        section = create_section(total_capacity=2)
+        students = create_students(section, 3)
+        tickets = [enrollment_queue.submit_enrollment_request(student.id, section.id) for student in students]
+
+        self.assertEqual(enrollment_queue.process_batch(), 3)
+        self.assertEqual(enrollment_queue.process_batch(), 0)
+
+        statuses = [EnrollmentRequest.objects.get(id=ticket.id).status for ticket in tickets]
+        self.assertEqual(statuses, [
+            EnrollmentRequest.STATUS_ENROLLED, EnrollmentRequest.STATUS_ENROLLED,
+            EnrollmentRequest.STATUS_WAITLISTED,
+        ])
+        self.assertEqual(Section.objects.get(id=section.id).current_capacity, 2)
+
+    def test_adding_a_course_returns_a_ticket_to_poll(self):
+        section = create_section(total_capacity=5)
+        student, = create_students(section, 1)
+        log_in(self.client, 'student', student.id)
+
+        response = self.client.post(reverse('student_add_course', args=[section.id]))
+        ticket = EnrollmentRequest.objects.get(student=student)
+        self.assertRedirects(
+            response, reverse('student_enrollment_ticket', args=[ticket.ticket]), fetch_redirect_response=False
+        )
+        self.assertFalse(Enrollment.objects.exists())
+
+        url = reverse('student_enrollment_ticket', args=[ticket.ticket]) + '?format=json'
+        self.assertEqual(self.client.get(url).json()['status'], EnrollmentRequest.STATUS_PENDING)
+        enrollment_queue.process_batch()
+        polled = self.client.get(url).json()
+        self.assertEqual((polled['status'], polled['done']), (EnrollmentRequest.STATUS_ENROLLED, True))
+
+
+# -------------------------
+# Bulk enrollment
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class EnrollBatchTests(TestCase):
+    @mock.patch.object(enrollment, 'QUERY_CHUNK_SIZE', 2)
+    def test_outcomes_across_chunks(self):
+        small = create_section(total_capacity=2, course_code='TST201')
+        large = create_section(total_capacity=10, course_code='TST202')
+        students = create_students(small, 5)
+        Enrollment.objects.create(student=students[0], section=large, admin_id=large.admin_id)
+        join_waitlist(students[1].id, large)
+        pairs = [(student.id, small.id) for student in students]
+        pairs += [(students[0].id, large.id), (students[1].id, large.id), (students[2].id, large.id)]
+        pairs += [(students[0].id, 999999)]
+
+        with transaction.atomic():
+            results = enrollment.enroll_batch(pairs)
+
+        self.assertEqual([result.outcome for result in results], [
+            enrollment.ENROLLED, enrollment.ENROLLED,
+            enrollment.WAITLISTED, enrollment.WAITLISTED, enrollment.WAITLISTED,
+            enrollment.REJECTED, enrollment.REJECTED, enrollment.ENROLLED,
+            enrollment.REJECTED,
+        ])
+        self.assertEqual(results[5].message, "Already enrolled in this section.")
+        self.assertEqual(results[6].message, "Already on the waitlist for this section.")
+        self.assertEqual(Section.objects.get(id=small.id).current_capacity, 2)
+        self.assertEqual(Section.objects.get(id=large.id).current_capacity, 1)
+        self.assertEqual(
+            list(Wait.objects.filter(waitlist__section=small).order_by('position').values_list('student_id', flat=True)),
+            [student.id for student in students[2:]],
+        )
+
+
+# -------------------------
+# Waitlist positions
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class WaitlistPositionTests(TestCase):
+    def test_positions_follow_joining_order_and_ranks_skip_gaps(self):
+        section = create_section(total_capacity=1, current_capacity=1)
+        students = create_students(section, 3)
+        for student in students:
+            join_waitlist(student.id, section)
+        entries = list(Wait.objects.order_by('id'))
+        self.assertEqual([entry.student_id for entry in entries], [student.id for student in students])
+        self.assertEqual([entry.position for entry in entries], [1, 2, 3])
+
+        entries[1].delete()
+        ranks = dict(Wait.objects.annotate(rank=waitlist_rank()).values_list('student_id', 'rank'))
+        self.assertEqual(ranks, {students[0].id: 1, students[2].id: 2})
+
+        # Positions only grow: a newcomer goes behind the removed entry's slot
+        newcomer, = create_students(section, 1, prefix='late')
+        join_waitlist(newcomer.id, section)
+        self.assertEqual(Wait.objects.get(student=newcomer).position, 4)
+        self.assertEqual(Waitlist.objects.get(section=section).next_position, 5)
+
+
+# -------------------------
+# Admin waitlist page
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class AdminWaitlistPageTests(TestCase):
+    def setUp(self):
+        self.fall = create_section(total_capacity=1, current_capacity=1, course_code='TST301')
+        self.winter = create_section(total_capacity=3, current_capacity=1, course_code='TST302')
+        Section.objects.filter(id=self.winter.id).update(term='Winter 2026')
+        for section, count in ((self.fall, 3), (self.winter, 1)):
+            for student in create_students(section, count, prefix=f'{section.id}-waiting'):
+                join_waitlist(student.id, section)
+        log_in(self.client, 'admin', self.fall.admin_id)
+
+    def test_summary_filtered_by_term(self):
+        response = self.client.get(reverse('admin_waitlist'), {'term': 'Winter 2026'})
+        rows = list(response.context['summary_rows'])
+        self.assertEqual([row['id'] for row in rows], [self.winter.id])
+        self.assertEqual((rows[0]['waitlist_length'], rows[0]['promotable']), (1, 1))
+
+    @mock.patch.object(views, 'ADMIN_WAITLIST_PAGE_SIZE', 2)
+    def test_section_entries_are_paged_in_waitlist_order(self):
+        expected = list(
+            Wait.objects.filter(waitlist__section=self.fall).order_by('position').values_list('id', flat=True)
+        )
+        response = self.client.get(reverse('admin_waitlist'), {'section': self.fall.id})
+        first_page = [entry.id for entry in response.context['wait_entries']]
+        next_query = response.context['next_page_query']
+        self.assertEqual(first_page, expected[:2])
+
+        response = self.client.get(f"{reverse('admin_waitlist')}?{next_query}")
+        self.assertEqual([entry.id for entry in response.context['wait_entries']], expected[2:])
+        self.assertIsNone(response.context['next_page_query'])
+
+
+# -------------------------
+# Waitlist promotion
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class WaitlistPromotionTests(TestCase):
+    def test_promoting_an_entry_twice_enrolls_once(self):
+        section = create_section(total_capacity=3, current_capacity=1)
+        student, = create_students(section, 1)
+        join_waitlist(student.id, section)
+        waitlist = Waitlist.objects.get(section=section)
+        spaces = waitlist.spaces_left
+        entry = Wait.objects.select_related('waitlist').get(student=student)
+
+        self.assertTrue(enroll_from_waitlist(entry, section.admin_id))
+        self.assertFalse(enroll_from_waitlist(entry, section.admin_id))
+
+        self.assertEqual(Enrollment.objects.filter(student=student).count(), 1)
+        self.assertEqual(Section.objects.get(id=section.id).current_capacity, 2)
+        waitlist.refresh_from_db()
+        self.assertEqual(waitlist.spaces_left, spaces + 1)
+
+    def test_enrolled_heads_do_not_hold_up_the_queue(self):
+        section = create_section(total_capacity=4, current_capacity=2)
+        first, second, third, fourth = create_students(section, 4)
+        for student in (first, second, third, fourth):
+            join_waitlist(student.id, section)
+        waitlist = Waitlist.objects.get(section=section)
+        spaces = waitlist.spaces_left
+        # The first two got in some other way while waiting
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, section=section, admin_id=section.admin_id)
+            for student in (first, second)
+        ])
+
+        promoted = promote_waitlists()
+
+        self.assertEqual(promoted, [(third.id, section.id), (fourth.id, section.id)])
+        self.assertFalse(Wait.objects.exists())
+        self.assertEqual(Section.objects.get(id=section.id).current_capacity, 4)
+        waitlist.refresh_from_db()
+        self.assertEqual(waitlist.spaces_left, spaces + 4)
+
+    def test_full_section_keeps_the_entry(self):
+        section = create_section(total_capacity=1, current_capacity=1)
+        student, = create_students(section, 1)
+        join_waitlist(student.id, section)
+        entry = Wait.objects.select_related('waitlist').get(student=student)
+
+        self.assertFalse(enroll_from_waitlist(entry, section.admin_id))
+        self.assertTrue(Wait.objects.filter(id=entry.id).exists())
+        self.assertFalse(Enrollment.objects.exists())
+
+
+# -------------------------
+# Capacity reconciliation
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class ReconcileTests(TestCase):
+    def test_drifted_counters_are_found_and_fixed(self):
+        section = create_section(total_capacity=5, current_capacity=1)
+        clean = create_section(total_capacity=5, current_capacity=0, course_code='TST401')
+        enrolled, waiting = create_students(section, 2)
+        enroll_student(enrolled.id, section.id, section.admin_id)
+        join_waitlist(waiting.id, section)
+        waitlist = Waitlist.objects.get(section=section)
+        # Counters that no longer match the rows
+        Section.objects.filter(id=section.id).update(current_capacity=4)
+        Waitlist.objects.filter(id=waitlist.id).update(spaces_left=waitlist.capacity, next_position=1)
+
+        self.assertEqual(list(section_drift().values_list('id', 'actual_current')), [(section.id, 1)])
+        self.assertEqual(list(waitlist_drift().values_list('id', flat=True)), [waitlist.id])
+        output = StringIO()
+        call_command('reconcile_capacity', stdout=output)
+        self.assertIn('current 4 -> 1', output.getvalue())
+        self.assertEqual(Section.objects.get(id=section.id).current_capacity, 4)  # report only
+
+        self.assertEqual(fix_drift(), (1, 1))
+        self.assertEqual(Section.objects.get(id=section.id).remaining_capacity, 4)
+        waitlist.refresh_from_db()
+        self.assertEqual((waitlist.spaces_left, waitlist.next_position), (waitlist.capacity - 1, 2))
+        self.assertEqual(Section.objects.get(id=clean.id).current_capacity, 0)
+        self.assertFalse(section_drift().exists() or waitlist_drift().exists())
+
+
+# -------------------------
+# Generated remaining_capacity
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class RemainingCapacityTests(TestCase):
+    def test_follows_queryset_update(self):
+        section = create_section(total_capacity=30, current_capacity=10)
+        Section.objects.filter(id=section.id).update(current_capacity=F('current_capacity') + 5)
+        section.refresh_from_db()
+        self.assertEqual(section.remaining_capacity, 15)
+
+        Section.objects.filter(id=section.id).update(total_capacity=40)
+        section.refresh_from_db()
+        self.assertEqual(section.remaining_capacity, 25)
+
+    def test_follows_bulk_update(self):
+        first = create_section(total_capacity=30, course_code='TST101')
+        second = create_section(total_capacity=20, current_capacity=5, course_code='TST102')
+        first.current_capacity = 12
+        second.current_capacity = 20
+        Section.objects.bulk_update([first, second], ['current_capacity'])
+        self.assertEqual(
+            dict(Section.objects.values_list('id', 'remaining_capacity')),
+            {first.id: 18, second.id: 0},
+        )
+
+
+# -------------------------
+# Deletes
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class DeleteAccountingTests(TestCase):
+    def test_cascaded_models_keep_fast_deletes(self):
+        for model in (Enrollment, Wait, Grade, GradeSummary, Section):
+            self.assertFalse(post_delete.has_listeners(model), model.__name__)
+
+    def test_deleting_students_recounts_grade_summaries(self):
+        section = create_section(total_capacity=10)
+        students = Student.objects.bulk_create([
+            Student(email=f'graded{i}@example.invalid', password='x', first_name='S', last_name=str(i),
+                    admin_id=section.admin_id)
+            for i in range(3)
+        ])
+        for student, final in zip(students, (60, 70, 80)):
+            Grade.objects.create(student=student, section=section, course_id=section.course_id,
+                                 admin_id=section.admin_id, final_grade=final)
+
+        delete_rows(Student.objects.filter(id=students[0].id))
+
+        summary = GradeSummary.objects.get(section=section)
+        self.assertEqual(summary.final_grade_count, 2)
+        self.assertEqual(summary.final_grade_sum, 150)
+        self.assertEqual(
+            grade_summary.section_stats([section.id])[section.id]['final_grade']['mean'], 75
+        )
+
+
+# -------------------------
+# Instructor dashboard
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class InstructorDashboardTests(TestCase):
+    def setUp(self):
+        self.section = create_section(total_capacity=10)
+        self.students = create_students(self.section, 3)
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, section=self.section, admin_id=self.section.admin_id)
+            for student in self.students
+        ])
+        for student, final in zip(self.students, (60, 90)):
+            Grade.objects.create(student=student, section=self.section, course_id=self.section.course_id,
+                                 admin_id=self.section.admin_id, final_grade=final)
+        log_in(self.client, 'instructor', self.section.instructor_id)
+
+    def test_summary_rows_without_rosters(self):
+        response = self.client.get(reverse('instructor_dashboard'), {'term': 'Fall 2025'})
+        row, = response.context['section_rows']
+        self.assertEqual((row['enrolled_count'], row['graded_count'], row['avg_final']), (3, 2, 75.0))
+        self.assertNotContains(response, 'student0@example.invalid')
+
+        response = self.client.get(reverse('instructor_dashboard'), {'term': 'Spring 2026'})
+        self.assertEqual(list(response.context['section_rows']), [])
+
+    def test_roster_is_paged_by_enrollment_id(self):
+        url = reverse('instructor_section_roster', args=[self.section.id])
+        with mock.patch.object(views, 'ROSTER_PAGE_SIZE', 2):
+            first = self.client.get(url, {'format': 'json'}).json()
+            self.assertEqual([row['final_grade'] for row in first['students']], ['60.00', '90.00'])
+            rest = self.client.get(url, {'format': 'json', 'after': first['next_after']}).json()
+        self.assertEqual([row['student_email'] for row in rest['students']], ['student2@example.invalid'])
+        self.assertIsNone(rest['next_after'])
+
+    def test_roster_of_another_instructors_section_is_not_found(self):
+        other = create_section(total_capacity=10, course_code='TST201')
+        response = self.client.get(reverse('instructor_section_roster', args=[other.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+# -------------------------
+# Grade entry
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class EditGradesTests(TestCase):
+    def setUp(self):
+        self.section = create_section(total_capacity=10)
+        self.students = create_students(self.section, 3)
+        self.enrollments = Enrollment.objects.bulk_create([
+            Enrollment(student=student, section=self.section, admin_id=self.section.admin_id)
+            for student in self.students
+        ])
+        Grade.objects.create(student=self.students[0], section=self.section, course_id=self.section.course_id,
+                             admin_id=self.section.admin_id, lab_grade=50, final_grade=60)
+        Grade.objects.create(student=self.students[1], section=self.section, course_id=self.section.course_id,
+                             admin_id=self.section.admin_id, lab_grade=70, final_grade=80)
+        log_in(self.client, 'instructor', self.section.instructor_id)
+        self.url = reverse('instructor_edit_grades', args=[self.section.id])
+
+    def form(self, *rows):
+        data = {}
+        for enrollment, values in zip(self.enrollments, rows):
+            for field in Grade.GRADE_FIELDS:
+                data[f'{field}_{enrollment.id}'] = values.get(field, '')
+        return data
+
+    def test_only_new_and_changed_rows_are_written(self):
+        data = self.form({'lab_grade': '50', 'final_grade': '60.00'}, {'lab_grade': '70', 'final_grade': '85'},
+                         {'final_grade': '90'})
+        response = self.client.post(self.url, data, follow=True)
+        self.assertContains(response, '(1 added, 1 changed)')
+        self.assertEqual(
+            dict(Grade.objects.values_list('student_id', 'final_grade')),
+            {self.students[0].id: 60, self.students[1].id: 85, self.students[2].id: 90},
+        )
+        summary = GradeSummary.objects.get(section=self.section)
+        self.assertEqual((summary.final_grade_count, summary.final_grade_sum), (3, 235))
+
+    def test_one_invalid_value_saves_nothing(self):
+        data = self.form({'final_grade': '65'}, {'final_grade': 'abc'}, {'final_grade': '90'})
+        response = self.client.post(self.url, data)
+        self.assertContains(response, 'nothing was saved')
+        self.assertEqual(Grade.objects.count(), 2)
+        self.assertEqual(Grade.objects.get(student=self.students[0]).final_grade, 60)
+
+
+# -------------------------
+# Grade sheet import
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class GradeImportTests(TestCase):
+    def setUp(self):
+        self.section = create_section(total_capacity=10)
+        self.students = Student.objects.bulk_create([
+            Student(email=f'sheet{i}@example.invalid', password='x', first_name='S', last_name=str(i),
+                    admin_id=self.section.admin_id)
+            for i in range(2)
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, section=self.section, admin_id=self.section.admin_id)
+            for student in self.students
+        ])
+
+    def test_duplicates_after_an_error_are_reported(self):
+        first, second = (student.id for student in self.students)
+        lines = ['student_id,final_grade', f'{first},abc', f'{second},70', f'{second},75']
+        created, updated, errors = import_section_csv(self.section, lines)
+        self.assertEqual((created, updated), (0, 0))
+        self.assertEqual(len(errors), 2)
+        self.assertIn('Row 4: student appears more than once.', errors)
+
+    def test_blank_rows_create_no_grade(self):
+        first, second = (student.id for student in self.students)
+        lines = ['student_id,lab_grade,final_grade', f'{first},,', f'{second},,80']
+        created, updated, errors = import_section_csv(self.section, lines)
+        self.assertEqual((created, updated, errors), (1, 0, []))
+        self.assertEqual(list(Grade.objects.values_list('student_id', flat=True)), [second])
+
+    def test_unchanged_rows_are_not_counted(self):
+        first, second = (student.id for student in self.students)
+        import_section_csv(self.section, ['student_id,lab_grade,final_grade', f'{first},50,60', f'{second},70,80'])
+        lines = ['student_id,lab_grade,final_grade', f'{first},50.00,60', f'{second},70,85']
+        self.assertEqual(import_section_csv(self.section, lines), (0, 1, []))
+        self.assertEqual(Grade.objects.get(student_id=second).final_grade, 85)
+
+
+# -------------------------
+# Grade statistics
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class GradeStatsTests(TestCase):
+    def setUp(self):
+        section = create_section(total_capacity=10)
+        second = Section.objects.create(
+            course_id=section.course_id, section_number=2, term=section.term, total_capacity=10,
+            instructor_id=section.instructor_id, admin_id=section.admin_id,
+        )
+        students = create_students(section, 4)
+        for student, target, final in zip(students, (section, section, second, second), (60, 70, 80, None)):
+            Grade.objects.create(student=student, section=target, course_id=section.course_id,
+                                 admin_id=section.admin_id, final_grade=final)
+        self.course = section.course
+
+    def test_moments_across_sections_ignore_null_grades(self):
+        with self.assertNumQueries(2):
+            row, = grade_stats.course_grade_stats()
+        self.assertEqual(row['course_code'], self.course.course_code)
+        self.assertEqual(
+            [row[key] for key in ('count', 'min_grade', 'max_grade', 'avg_grade', 'var_grade', 'stddev_grade')],
+            [3, Decimal('60.00'), Decimal('80.00'), Decimal('70.00'), Decimal('66.67'), Decimal('8.16')],
+        )
+
+    def test_percentiles_match_without_numpy(self):
+        expected = {self.course.course_code: [65.0, 70.0, 75.0]}
+        found = grade_stats.course_grade_percentiles(fields=('final_grade',))
+        with mock.patch.object(grade_stats, 'numpy', None):
+            fallback = grade_stats.course_grade_percentiles(fields=('final_grade',))
+        for result in (found, fallback):
+            self.assertEqual({code: stats['final_grade'] for code, stats in result.items()}, expected)
+
+
+# -------------------------
+# Grade summary table
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class GradeSummaryTests(TestCase):
+    COLUMNS = ('section_id', 'final_grade_count', 'final_grade_sum', 'final_grade_sumsq', 'lab_grade_count')
+
+    def summaries(self):
+        return list(GradeSummary.objects.order_by('section_id').values_list(*self.COLUMNS))
+
+    def test_saves_keep_the_summary_equal_to_a_rebuild(self):
+        section = create_section(total_capacity=10)
+        other = create_section(total_capacity=10, course_code='TST301')
+        first, second = create_students(section, 2)
+        grade = Grade.objects.create(student=first, section=section, course_id=section.course_id,
+                                     admin_id=section.admin_id, final_grade=60, lab_grade=40)
+        Grade.objects.create(student=second, section=section, course_id=section.course_id,
+                             admin_id=section.admin_id, final_grade=80)
+        self.assertEqual(self.summaries(), [(section.id, 2, 140, 10000, 1)])
+
+        grade.final_grade = 70
+        grade.save()
+        deferred = Grade.objects.only('id').get(id=grade.id)  # old values read back
+        deferred.lab_grade = None
+        deferred.save()
+        moved = Grade.objects.get(student=second)
+        moved.section, moved.course_id = other, other.course_id
+        moved.save()
+
+        maintained = self.summaries()
+        self.assertEqual(maintained, [(section.id, 1, 70, 4900, 0), (other.id, 1, 80, 6400, 0)])
+        self.assertEqual(grade_summary.rebuild(), 2)
+        self.assertEqual(self.summaries(), maintained)
+
+    def test_section_grade_saves_apply_deltas(self):
+        section = create_section(total_capacity=10)
+        students = create_students(section, 3)
+        save_section_grades(section, {students[0].id: {'final_grade': Decimal('50')},
+                                      students[1].id: {'final_grade': Decimal('90')}})
+        save_section_grades(section, {students[0].id: {'final_grade': None},
+                                      students[2].id: {'final_grade': Decimal('70')}})
+        self.assertEqual(self.summaries(), [(section.id, 2, 160, 13000, 0)])
+        stats = grade_summary.section_stats([section.id])[section.id]['final_grade']
+        self.assertEqual((stats['count'], stats['mean']), (2, 80))
+
+
+# -------------------------
+# Report registry
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class ReportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.section = create_section(total_capacity=10)
+        self.student, = create_students(self.section, 1)
+
+    def test_results_are_cached_until_a_dependency_changes(self):
+        title, rows = reports.run_report('empty_courses')
+        self.assertEqual([row['course_code'] for row in rows], ['TST100'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(reports.run_report('empty_courses')[1], rows)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.student, section=self.section, admin_id=self.section.admin_id)
+        self.assertEqual(reports.run_report('empty_courses')[1], [])
+
+    def test_bulk_writes_are_reported_with_mark_changed(self):
+        reports.run_report('course_student_counts', courses='TST100')
+        Enrollment.objects.bulk_create(
+            [Enrollment(student=self.student, section=self.section, admin_id=self.section.admin_id)]
+        )
+        self.assertEqual(reports.run_report('course_student_counts', courses='TST100')[1][0]['student_count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            reports.mark_changed(Enrollment)
+        title, rows = reports.run_report('course_student_counts', courses='TST100')
+        self.assertEqual(title, 'Student counts in TST100')
+        self.assertEqual(rows[0]['student_count'], 1)
+
+    def test_precompute_warms_the_default_parameters(self):
+        warmed = reports.precompute(['empty_courses', 'course_grade_stats'])
+        self.assertEqual(warmed[0], ('empty_courses', {}, 1))
+        self.assertTrue(all(name == 'course_grade_stats' for name, _, _ in warmed[1:]))
+        with self.assertNumQueries(0):
+            reports.run_report('empty_courses')
+
+    def test_bad_parameters_and_duplicate_names_are_rejected(self):
+        with self.assertRaises(reports.ReportParameterError):
+            reports.run_report('instructor_averages', min_average='high')
+        with self.assertRaises(ValueError):
+            reports.register(type('Duplicate', (reports.Report,), {'name': 'empty_courses'}))
+
+
+# -------------------------
+# Table export
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class TableExportTests(TestCase):
+    def setUp(self):
+        self.section = create_section(total_capacity=10)
+        self.students = create_students(self.section, 2)
+        Enrollment.objects.create(student=self.students[0], section=self.section, admin_id=self.section.admin_id)
+        log_in(self.client, 'admin', self.section.admin_id)
+        self.url = reverse('admin_export_tables')
+
+    def download(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv_leaves_out_passwords(self):
+        response = self.client.get(self.url, {'table': 'student'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="student.csv"')
+        header, *lines = self.download(response).decode().splitlines()
+        self.assertNotIn('password', header)
+        self.assertEqual(len(lines), 2)
+        self.assertIn('student0@example.invalid', lines[0])
+
+    def test_all_tables_as_filtered_gzipped_ndjson(self):
+        later = create_section(total_capacity=5, course_code='TST201')
+        Section.objects.filter(id=later.id).update(term='Spring 2026')
+        response = self.client.get(self.url, {'table': 'all', 'format': 'ndjson', 'gzip': '1',
+                                              'term': 'Fall 2025'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="all-Fall_2025.ndjson.gz"')
+        records = [json.loads(line) for line in gzip.decompress(self.download(response)).splitlines()]
+        self.assertEqual(sorted({record['table'] for record in records}), ['enrollment', 'section'])
+        self.assertEqual([record['id'] for record in records if record['table'] == 'section'], [self.section.id])
+        self.assertFalse(any('password' in record for record in records))
+
+    def test_bad_requests_fail_before_streaming(self):
+        for params in ({'table': 'student', 'term': 'Fall 2025'}, {'table': 'nope'},
+                       {'table': 'student', 'format': 'xml'}, {'table': ['student', 'course']}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+
+# -------------------------
+# Synthetic data
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class MockDataTests(TestCase):
+    def generate(self, seed):
+        """Generate a small university and return its rows, leaving the database as it was."""
+        params = mock_data.params_for(
+            departments=2, instructors=4, courses=8, students=80,
+            sections_per_course=2, enrollments_per_student=3, seed=seed,
+        )
+        with transaction.atomic():
+            created = mock_data.generate(params)
+            self.assertConsistent(created)
+            rows = (
+                list(Section.objects.order_by('id').values_list('course__course_code', 'current_capacity')),
+                list(Enrollment.objects.order_by('id').values_list('student__email', 'section_id')),
+                list(Grade.objects.order_by('id').values_list('student__email', *Grade.GRADE_FIELDS)),
+            )
+            transaction.set_rollback(True)
+        return rows
+
+    def assertConsistent(self, created):
+        for model in (Student, Section, Enrollment, Grade, Waitlist, Wait):
+            self.assertEqual(model.objects.count(), created[model.__name__], model.__name__)
+        self.assertFalse(section_drift().exists() or waitlist_drift().exists())
+        self.assertFalse(Section.objects.filter(remaining_capacity__lt=0).exists())
+        maintained = sorted(GradeSummary.objects.values_list('section_id', 'final_grade_count', 'final_grade_sum'))
+        grade_summary.rebuild()
+        self.assertEqual(
+            sorted(GradeSummary.objects.values_list('section_id', 'final_grade_count', 'final_grade_sum')),
+            maintained,
+        )
+
+    def test_same_seed_same_university(self):
+        first = self.generate(seed=7)
+        self.assertTrue(all(first))
+        self.assertEqual(self.generate(seed=7), first)
+        self.assertNotEqual(self.generate(seed=8), first)
+
+
+# -------------------------
+# Load test
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class LoadTestTests(TransactionTestCase):
+    PARAMS = load_test.LoadTestParams(
+        students=30, threads=4, sections=3, section_capacity=10, hot_capacity=5,
+        iterations=2, instructors=1, seed=0, keep=False,
+    )
+
+    def test_a_small_rush_keeps_the_invariants_and_cleans_up(self):
+        section = create_section(total_capacity=5)
+        results = load_test.run(self.PARAMS)
+
+        self.assertTrue(results['ok'], results['invariants'])
+        self.assertEqual(results['phases']['rush']['requests'], self.PARAMS.students)
+        self.assertIn('mixed', results['phases'])
+        self.assertEqual(list(Section.objects.values_list('id', flat=True)), [section.id])
+        self.assertFalse(Student.objects.exists())
+
+    def test_broken_counters_are_reported(self):
+        create_section(total_capacity=5)
+        fixture = load_test.create_fixture(self.PARAMS)
+        self.addCleanup(load_test.delete_fixture, fixture)
+        Section.objects.filter(id=fixture.hot_section).update(current_capacity=2)
+        problems = load_test.check_invariants(fixture, self.PARAMS, rush_adds=1)
+        self.assertEqual(len(problems), 2)
+        self.assertIn('current_capacity 2 but 0 enrollments', problems[0])
+        self.assertIn('0 enrolled after the rush, expected 1', problems[1])
+
+    def test_needs_an_admin_and_a_department(self):
+        with self.assertRaises(load_test.LoadTestError):
+            load_test.run(self.PARAMS)
+
+
+# -------------------------
+# Query plans
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class QueryPlanTests(TestCase):
+    def test_aliased_scans_are_mapped_to_their_tables(self):
+        sql = (
+            'SELECT "university_student"."id" FROM "university_student" WHERE "university_student"."id" IN '
+            '(SELECT U0."student_id" FROM "university_enrollment" U0 INNER JOIN "university_section" U1 '
+            'ON (U0."section_id" = U1."id"))'
+        )
+        plan = ['SEARCH university_student USING INTEGER PRIMARY KEY (rowid=?)', 'LIST SUBQUERY 1',
+                'SCAN U0', 'SEARCH U1 USING INTEGER PRIMARY KEY (rowid=?)', 'SCAN CONSTANT ROW']
+        self.assertEqual(full_scans(plan, sql=sql), ['university_enrollment'])
+        self.assertEqual(full_scans(plan, allowed=('university_enrollment',), sql=sql), [])
+
+    def test_hot_views_use_indexes(self):
+        mock_data.generate(mock_data.params_for(
+            departments=2, instructors=4, courses=10, students=60,
+            sections_per_course=2, enrollments_per_student=2, seed=1,
+        ))
+        User.objects.create_superuser('query_plans', 'query_plans@example.invalid', None)
+        ids = sample_ids()
+        EnrollmentRequest.objects.create(student_id=ids['student'], section_id=ids['open_section'])
+        output = StringIO()
+        call_command('check_query_plans', stdout=output)
+        self.assertNotIn('skipped', output.getvalue())
+
+
+# -------------------------
+# Query count budgets
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class QueryCountTests(TestCase):
+    def test_views_stay_within_budget_at_every_size(self):
+        output = StringIO()
+        call_command('check_query_counts', current_database=True, stdout=output)
+        self.assertNotIn('no sample data', output.getvalue())
+
+
+# -------------------------
+# Background jobs
+# -------------------------
+@runner.task('tests_failing_task')
+def failing_task(progress):
+    progress.log("starting")
+    raise RuntimeError("broken on purpose")
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class JobTests(TestCase):
+    def test_a_failing_task_fails_its_job(self):
+        job = runner.create_job('tests_failing_task', {})
+        with self.assertLogs('jobs.runner', 'ERROR'):
+            runner.run_job(runner.claim('tests'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.error, 'RuntimeError: broken on purpose')
+        self.assertIn('starting', job.log)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_a_locked_database_at_the_end_leaves_the_worker_running(self):
+        job = runner.create_job('tests_failing_task', {})
+        claimed = runner.claim(runner.worker_name())
+        locked = OperationalError('database is locked')
+        with mock.patch.object(runner, '_record_outcome', side_effect=locked), self.assertLogs('jobs.runner'):
+            runner.run_job(claimed)  # logs instead of raising
+        Job.objects.filter(id=job.id).update(heartbeat_at=F('heartbeat_at') - timedelta(hours=1))
+        self.assertEqual(runner.fail_stale(), 1)
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.STATUS_FAILED)
+
+    def test_status_needs_an_admin_login(self):
+        job = runner.create_job('reconcile_capacity', {})
+        url = reverse('job_status', args=[job.id])
+        self.assertRedirects(self.client.get(url), reverse('admin_login'), fetch_redirect_response=False)
+
+        admin = Admin.objects.create(username='jobs-admin', password='x', first_name='A', last_name='D')
+        log_in(self.client, 'admin', admin.id)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], Job.STATUS_QUEUED)
+
+
+# -------------------------
+# Snapshots
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class SnapshotTests(TransactionTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(UNIVERSITY_SNAPSHOT_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_restore_brings_back_the_saved_rows(self):
+        section = create_section(total_capacity=5, current_capacity=1)
+        student = Student.objects.create(email='kept@example.invalid', password='x', first_name='S',
+                                         last_name='K', admin_id=section.admin_id)
+        Enrollment.objects.create(student=student, section=section, admin_id=section.admin_id)
+        snapshots.save('round-trip')
+        self.assertEqual([snapshot['name'] for snapshot in snapshots.list_snapshots()], ['round-trip'])
+
+        Enrollment.objects.all().delete()
+        Section.objects.filter(id=section.id).update(current_capacity=0)
+        Student.objects.create(email='added@example.invalid', password='x', first_name='S',
+                               last_name='A', admin_id=section.admin_id)
+
+        restored = snapshots.restore('round-trip')
+        self.assertEqual(restored[Enrollment._meta.db_table], 1)
+        self.assertEqual(list(Student.objects.values_list('email', flat=True)), ['kept@example.invalid'])
+        self.assertEqual(Section.objects.get(id=section.id).remaining_capacity, 4)
+
+    def test_unknown_snapshot_is_an_error(self):
+        with self.assertRaises(snapshots.SnapshotError):
+            snapshots.restore('missing')
+
+
+# -------------------------
+# Logged-in principals
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class PrincipalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.section = create_section(total_capacity=5)
+        self.student, = create_students(self.section, 1)
+
+    def test_records_are_cached_until_saved(self):
+        with self.assertNumQueries(1):
+            principals.get('student', self.student.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(principals.get('student', self.student.id).first_name, 'S')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            student = Student.objects.get(id=self.student.id)
+            student.first_name = 'Renamed'
+            student.save()
+        self.assertEqual(principals.get('student', self.student.id).first_name, 'Renamed')
+
+    def test_clear_drops_every_record(self):
+        principals.get('student', self.student.id)
+        principals.clear()
+        with self.assertNumQueries(1):
+            principals.get('student', self.student.id)
+
+    def test_login_of_a_deleted_record_is_sent_to_the_login_page(self):
+        log_in(self.client, 'student', self.student.id)
+        self.assertEqual(self.client.get(reverse('student_dashboard')).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_rows(Student.objects.filter(id=self.student.id))
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertRedirects(response, reverse('student_login'), fetch_redirect_response=False)
+        self.assertNotIn('student_id', self.client.session)
+
+
+# -------------------------
+# SQLite profile
+# -------------------------
+@override_settings(CACHES=LOCAL_CACHES)
+class SqliteProfileTests(TransactionTestCase):
+    def test_connections_get_the_configured_pragmas(self):
+        values = sqlite_profile.pragma_values()
+        self.assertEqual(values['journal_mode'], 'wal')
+        self.assertEqual((values['busy_timeout'], values['synchronous'], values['temp_store']), (5000, 1, 2))
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+        with override_settings(UNIVERSITY_SQLITE_PRAGMAS={'cache_size': -1000, 'mmap_size': None}):
+            profile = sqlite_profile.configured()
+            self.assertNotIn('mmap_size', profile.pragmas)
+            with sqlite_profile.use_profile(profile):
+                self.assertEqual(sqlite_profile.pragma_values(['cache_size'])['cache_size'], -1000)
+        self.assertEqual(sqlite_profile.pragma_values(['cache_size'])['cache_size'], -64 * 1024)
+
+    def flaky(self, *errors):
+        """A function failing with each of `errors` in turn, then returning 'done'."""
+        calls = mock.Mock(side_effect=[*errors, 'done'])
+        return calls, sqlite_profile.retry_on_busy(lambda: calls())
+
+    def test_busy_transactions_are_retried(self):
+        locked = OperationalError('database is locked')
+        with mock.patch.object(sqlite_profile, 'RETRY_BACKOFF', 0), self.assertLogs(sqlite_profile.logger, 'INFO'):
+            calls, func = self.flaky(locked, locked)
+            self.assertEqual(func(), 'done')
+            self.assertEqual(calls.call_count, 3)
+
+            calls, func = self.flaky(*[locked] * (sqlite_profile.DEFAULT_BUSY_RETRIES + 1))
+            with self.assertRaises(OperationalError):
+                func()
+
+    def test_other_errors_and_inner_transactions_are_not_retried(self):
+        calls, func = self.flaky(OperationalError('no such table: university_student'))
+        with self.assertRaises(OperationalError):
+            func()
+        calls, func = self.flaky(OperationalError('database is locked'))
+        with transaction.atomic(), self.assertRaises(OperationalError):
+            func()
+        self.assertEqual(calls.call_count, 1)
@@ -23,6 +23,11 @@ urlpatterns = [
         views.student_add_course,
         name='student_add_course'
     ),
+    path(
+        'student/courses/requests/<uuid:ticket>/',
+        views.student_enrollment_ticket,
+        name='student_enrollment_ticket'
+    ),
     path(
         'student/courses/drop/<int:section_id>/',
         views.student_drop_course,
@@ -34,12 +39,28 @@ urlpatterns = [
     path('instructor/dashboard/', views.instructor_dashboard, name='instructor_dashboard'),
     path('instructor/logout/', views.logout_view, name='instructor_logout'),
 
+    path(
+        'instructor/sections/<int:section_id>/roster/',
+        views.instructor_section_roster,
+        name='instructor_section_roster'
+    ),
+
     # Instructor grade editing
     path(
         'instructor/sections/<int:section_id>/grades/',
         views.instructor_edit_grades,
         name='instructor_edit_grades'
     ),
+    path(
+        'instructor/sections/<int:section_id>/grades/export/',
+        views.instructor_export_grades,
+        name='instructor_export_grades'
+    ),
+    path(
+        'instructor/sections/<int:section_id>/grades/import/',
+        views.instructor_import_grades,
+        name='instructor_import_grades'
+    ),
 
     # Admin authentication + dashboard
     path('administration/login/', views.admin_login, name='admin_login'),
@@ -49,6 +70,8 @@ urlpatterns = [
     # Admin functionalities
     path('administration/create_course/', views.admin_create_course, name='admin_create_course'),
     path('administration/waitlist/', views.admin_waitlist, name='admin_waitlist'),
+    path('administration/bulk_enroll/', views.admin_bulk_enroll, name='admin_bulk_enroll'),
+    path('administration/export/', views.admin_export_tables, name='admin_export_tables'),
 
     # Tables Menu
     path('tables_menu/', views.tables_menu, name='tables_menu'),
@@ -56,4 +79,5 @@ urlpatterns = [
     path('tables_menu/create_tables/', views.create_tables_page, name='create_tables_page'),
     path('tables_menu/populate_tables/', views.populate_tables_page, name='populate_tables_page'),
     path('tables_menu/query_tables/', views.query_tables_page, name='query_tables_page'),
+    path('tables_menu/snapshots/', views.snapshots_page, name='snapshots_page'),
 ]
\ No newline at end of file
@@ -0,0 +1,368 @@
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from . import dashboard_cache, principals, reports
+from .models import (
+    Admin,
+    Enrollment,
+    EnrollmentRequest,
+    Instructor,
+    Section,
+    Student,
+    Wait,
+    Waitlist,
+)
+
+# -------------------------
+# View scenarios
+# -------------------------
+# Requests replayed against the current database by the query checks
+# (check_query_plans, check_query_counts). Every request runs inside a
+# transaction that is rolled back, so POST scenarios leave no trace.
+#
+# role: the session login (student/instructor/admin), 'staff' for a Django
+#      admin superuser, or None.
+# hot: a per-user page on the request path during registration / grading;
+#      its queries must be served from indexes.
+# allow_scan: tables the view is expected to read in full (e.g. the course
+#      catalogue on the "available courses" page).
+# budget: the most queries the request may run, whatever the data size.
+# data: POST data, or a function of the sample ids returning it.
+
+Scenario = namedtuple('Scenario', 'name role method url data hot allow_scan budget')
+
+
+def scenario(name, role, url, method='get', data=None, hot=True, allow_scan=(), budget=None):
+    return Scenario(name, role, method, url, data or {}, hot, frozenset(allow_scan), budget)
+
+
+def _login_data(role, model, field):
+    """Login form data with the stored credentials of the sample user."""
+    def data(ids):
+        row = model.objects.values(field, 'password').get(id=ids[role])
+        return {field: row[field], 'password': row['password']}
+    return data
+
+
+def _grade_sheet(ids):
+    """A grade import upload giving every student of the section a final grade."""
+    student_ids = (
+        Enrollment.objects
+        .filter(section_id=ids['instructor_section'])
+        .order_by('student_id')
+        .values_list('student_id', flat=True)
+    )
+    lines = ['student_id,final_grade'] + [f'{student_id},80' for student_id in student_ids]
+    return {'file': SimpleUploadedFile('grades.csv', '\n'.join(lines).encode(), 'text/csv')}
+
+
+# Changelists with list filters (the default budget is 5)
+DJANGO_ADMIN_BUDGETS = {'section': 7, 'grade': 6, 'enrollment': 7}
+
+SCENARIOS = [
+    scenario('home', None, lambda ids: reverse('home'), budget=0),
+    scenario('logout', 'student', lambda ids: reverse('logout'), budget=4),
+    scenario('student_logout', 'student', lambda ids: reverse('student_logout'), budget=4),
+    scenario('instructor_logout', 'instructor', lambda ids: reverse('instructor_logout'),
+             budget=4),
+    scenario('admin_logout', 'admin', lambda ids: reverse('admin_logout'), budget=4),
+    scenario('student_login', None, lambda ids: reverse('student_login'), budget=0),
+    scenario('student_login_post', None, lambda ids: reverse('student_login'),
+             method='post', data=_login_data('student', Student, 'email'), budget=5),
+    scenario('student_dashboard', 'student',
+             lambda ids: reverse('student_dashboard'), budget=3),
+    scenario('student_available_courses', 'student',
+             lambda ids: reverse('student_available_courses'),
+             allow_scan={'university_section'}, budget=2),
+    scenario('student_add_course', 'student',
+             lambda ids: reverse('student_add_course', args=[ids['open_section']]),
+             method='post', budget=7),
+    scenario('student_enrollment_ticket', 'student',
+             lambda ids: reverse('student_enrollment_ticket', args=[ids['ticket']]),
+             budget=2),
+    scenario('student_drop_course', 'student',
+             lambda ids: reverse('student_drop_course', args=[ids['student_section']]),
+             method='post', budget=18),
+    scenario('instructor_login', None, lambda ids: reverse('instructor_login'), budget=0),
+    scenario('instructor_login_post', None, lambda ids: reverse('instructor_login'),
+             method='post', data=_login_data('instructor', Instructor, 'email'), budget=5),
+    scenario('instructor_dashboard', 'instructor',
+             lambda ids: reverse('instructor_dashboard'), budget=3),
+    scenario('instructor_section_roster', 'instructor',
+             lambda ids: reverse('instructor_section_roster', args=[ids['instructor_section']]),
+             budget=3),
+    scenario('instructor_edit_grades', 'instructor',
+             lambda ids: reverse('instructor_edit_grades', args=[ids['instructor_section']]),
+             budget=3),
+    scenario('instructor_export_grades', 'instructor',
+             lambda ids: reverse('instructor_export_grades', args=[ids['instructor_section']]),
+             budget=3),
+    scenario('instructor_import_grades', 'instructor',
+             lambda ids: reverse('instructor_import_grades', args=[ids['instructor_section']]),
+             method='post', data=_grade_sheet, budget=11),
+    scenario('admin_login', None, lambda ids: reverse('admin_login'), budget=0),
+    scenario('admin_login_post', None, lambda ids: reverse('admin_login'),
+             method='post', data=_login_data('admin', Admin, 'username'), budget=5),
+    # (the term filter lists every term: a covering-index scan of section)
+    scenario('admin_waitlist_section', 'admin',
+             lambda ids: f"{reverse('admin_waitlist')}?section={ids['waitlisted_section']}",
+             allow_scan={'university_section'}, budget=5),
+    # Whole-table reports: plans are shown, full scans are expected
+    scenario('admin_dashboard', 'admin',
+             lambda ids: reverse('admin_dashboard'), hot=False, budget=2),
+    scenario('admin_create_course', 'admin',
+             lambda ids: reverse('admin_create_course'), hot=False, budget=4),
+    scenario('admin_bulk_enroll', 'admin',
+             lambda ids: reverse('admin_bulk_enroll'), hot=False, budget=1),
+    scenario('admin_waitlist', 'admin',
+             lambda ids: reverse('admin_waitlist'), hot=False, budget=4),
+    scenario('admin_export_tables', 'admin',
+             lambda ids: f"{reverse('admin_export_tables')}?table=enrollment", hot=False,
+             budget=2),
+    scenario('tables_menu', None, lambda ids: reverse('tables_menu'), hot=False, budget=0),
+    scenario('create_tables_page', None, lambda ids: reverse('create_tables_page'), hot=False,
+             budget=1),
+    scenario('populate_tables_page', None, lambda ids: reverse('populate_tables_page'), hot=False,
+             budget=1),
+    scenario('drop_tables_page', None, lambda ids: reverse('drop_tables_page'), hot=False,
+             budget=1),
+    scenario('snapshots_page', 'admin', lambda ids: reverse('snapshots_page'), hot=False, budget=2),
+    scenario('query_tables_page', None,
+             lambda ids: reverse('query_tables_page'), hot=False, budget=6),
+] + [
+    # Django admin changelists (one page of rows each): session, user, two
+    # counts, the page; list filters add one query each
+    scenario(f'django_admin_{model._meta.model_name}', 'staff',
+             lambda ids, name=model._meta.model_name: reverse(f'admin:university_{name}_changelist'),
+             hot=False, budget=DJANGO_ADMIN_BUDGETS.get(model._meta.model_name, 5))
+    for model in site._registry
+    if model._meta.app_label == 'university'
+]
+
+# Tables small enough (or read in full by design) that scanning them is fine
+LOOKUP_TABLES = {
+    'university_admin',
+    'university_department',
+    'university_course',
+    'university_instructor',
+    'django_session',
+}
+
+
+def sample_ids(busiest=False):
+    """
+    Pick representative rows for the scenarios: a student with enrollments,
+    an instructor with an enrolled section, a section with a waitlist.
+    With busiest=True, pick the rows with the most related rows instead
+    (the student with the most enrollments, the largest section, the
+    longest waitlist), so per-row queries show up in the counts.
+    Returns None for anything the database doesn't have.
+    """
+    if busiest:
+        student_id = (
+            Student.objects.annotate(n=Count('enrollments'))
+            .order_by('-n', 'id').values_list('id', flat=True).first()
+        )
+        student_section = (
+            Enrollment.objects.filter(student_id=student_id)
+            .order_by('id').values_list('section_id', flat=True).first()
+        )
+        instructor_section = (
+            Section.objects.annotate(n=Count('enrollments'))
+            .order_by('-n', 'id').values_list('id', flat=True).first()
+        )
+        waitlisted_section = (
+            Waitlist.objects.annotate(n=Count('entries'))
+            .filter(n__gt=0).order_by('-n', 'id').values_list('section_id', flat=True).first()
+        )
+    else:
+        enrollment = Enrollment.objects.order_by('id').first()
+        wait = Wait.objects.select_related('waitlist').order_by('id').first()
+        student_section = enrollment.section_id if enrollment else None
+        student_id = enrollment.student_id if enrollment else Student.objects.values_list('id', flat=True).first()
+        instructor_section = (
+            Section.objects.filter(enrollments__isnull=False).order_by('id').values_list('id', flat=True).first()
+        )
+        waitlisted_section = wait.waitlist.section_id if wait else None
+    open_section = (
+        Section.objects
+        .exclude(enrollments__student_id=student_id)
+        .order_by('id')
+        .values_list('id', flat=True)
+        .first()
+    )
+    instructor_id = (
+        Section.objects.filter(id=instructor_section).values_list('instructor_id', flat=True).first()
+        if instructor_section else Instructor.objects.values_list('id', flat=True).first()
+    )
+    return {
+        'student': student_id,
+        'student_section': student_section,
+        'open_section': open_section,
+        'ticket': (
+            EnrollmentRequest.objects.filter(student_id=student_id)
+            .order_by('id').values_list('ticket', flat=True).first()
+        ),
+        'instructor': instructor_id,
+        'instructor_section': instructor_section,
+        'waitlisted_section': waitlisted_section,
+        'admin': Admin.objects.values_list('id', flat=True).first(),
+        'staff': (
+            User.objects.filter(is_superuser=True, is_active=True)
+            .order_by('id').values_list('id', flat=True).first()
+        ),
+    }
+
+
+@contextmanager
+def capture_queries():
+    """Collect (sql, params) of every query run inside the block."""
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        yield queries
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run_scenario(scenario, ids):
+    """
+    Replay one scenario with a logged-in test client and return the list
+    of (sql, params) it ran (session handling included). The request runs in
+    a transaction that is rolled back. Returns None if the database has no
+    suitable sample rows.
+    """
+    if scenario.role and not ids.get(scenario.role):
+        return None
+    try:
+        url = scenario.url(ids)
+        data = scenario.data(ids) if callable(scenario.data) else scenario.data
+    except Exception:
+        return None
+
+    client = Client()
+    if scenario.role == 'staff':
+        client.force_login(User.objects.get(id=ids['staff']))
+    elif scenario.role:
+        session = client.session
+        session[f'{scenario.role}_id'] = ids[scenario.role]
+        session.save()
+
+    # Cold caches, so the queries behind cached pages are seen too. The
+    # login's record is cached, as for every request after a session's first.
+    dashboard_cache.clear()
+    reports.clear()
+    principals.clear()
+    if scenario.role in principals.ROLES:
+        principals.get(scenario.role, ids[scenario.role])
+
+    queries = []
+    try:
+        with transaction.atomic():
+            with capture_queries() as queries:
+                response = getattr(client, scenario.method)(url, data)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+            raise _Rollback
+    except _Rollback:
+        pass
+    return queries
+
+
+# A per-process cache for runs on a throwaway test database, so that its
+# records (principals, counts) never reach the site's shared cache
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@contextmanager
+def test_environment():
+    """
+    Test client setup (allowed hosts, template instrumentation), unless the
+    test runner already did it (checks called from the test suite).
+    """
+    try:
+        setup_test_environment()
+    except RuntimeError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        teardown_test_environment()
+
+
+# -------------------------
+# Query plans (SQLite)
+# -------------------------
+_SCAN = re.compile(r'^SCAN (\w+)')
+
+# `FROM "table" U0` / `JOIN "table" T3`: the plan names aliased tables by alias
+_TABLE_ALIAS = re.compile(r'\b(?:FROM|JOIN) "(\w+)" (?:AS )?"?(\w+)"?')
+
+# Words that can follow a table name in Django's SQL (not an alias)
+_SQL_WORDS = {
+    'WHERE', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'CROSS', 'NATURAL', 'OUTER', 'JOIN', 'ON',
+    'USING', 'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'WINDOW', 'UNION', 'EXCEPT', 'INTERSECT',
+    'SET', 'RETURNING',
+}
+
+
+def explain(sql, params):
+    """EXPLAIN QUERY PLAN detail lines of one query."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def table_aliases(sql):
+    """{alias: {tables}} of a query (an alias such as U0 can recur per subquery)."""
+    aliases = {}
+    for table, alias in _TABLE_ALIAS.findall(sql):
+        if alias.upper() not in _SQL_WORDS:
+            aliases.setdefault(alias, set()).add(table)
+    return aliases
+
+
+def full_scans(plan, allowed=(), sql=''):
+    """
+    Tables read in full by a plan (lookup tables and `allowed` excepted).
+    Pass the query's SQL so that scans of aliased tables (subqueries, repeated
+    joins) are mapped back to their tables; an ambiguous alias counts as a
+    scan of each table it may stand for. Scans of subquery results and
+    constant rows are not table reads and are left out.
+    """
+    tables = {model._meta.db_table for model in apps.get_models()}
+    aliases = table_aliases(sql)
+    scans = []
+    for detail in plan:
+        match = _SCAN.match(detail)
+        if not match:
+            continue
+        name = match.group(1)
+        for table in sorted(aliases.get(name, {name})):
+            if table in tables and table not in LOOKUP_TABLES and table not in allowed:
+                if table not in scans:
+                    scans.append(table)
+    return scans
+
+
+def is_explainable(sql):
+    """Reads and row-changing statements (INSERTs and savepoints have no plan worth checking)."""
+    return sql.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE'))
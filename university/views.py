@@ -1,55 +1,75 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
 from django.contrib import messages
-from django.core.management import call_command
+from django.http import JsonResponse, StreamingHttpResponse
 from django.db import transaction, IntegrityError
-from django.db.models import Avg, Count
+from django.db.models import (
+    Count, F, FilteredRelation, FloatField, OuterRef, Q, Subquery, Value
+)
+from django.db.models.functions import Cast, Coalesce, Least, NullIf
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from decimal import Decimal, InvalidOperation
-import statistics
+from urllib.parse import urlencode
+import csv
+import io
 from .models import (
     Admin,
     Course,
     Department,
-    GraduateStudent, 
-    Section, 
-    Instructor, 
-    Student, 
-    Enrollment, 
-    Grade,
-    UndergraduateStudent,
-    Wait,
-    Waitlist
+    Section,
+    Instructor,
+    Student,
+    Enrollment,
+    EnrollmentRequest,
+    Wait
 )
 from .forms import (
     InstructorLoginForm, 
     StudentLoginForm, 
     AdminLoginForm,
-    AdminCreateCourseForm
+    AdminCreateCourseForm,
+    AdminBulkEnrollForm,
+    InstructorGradeImportForm,
+    PopulateTablesForm,
+    SaveSnapshotForm
 )
-from .decorators import student_required, instructor_required
-
-TABLES_CONFIG = [
-    {"id": "admin", "label": "Admin", "model": Admin},
-    {"id": "department", "label": "Department", "model": Department},
-    {"id": "student", "label": "Student", "model": Student},
-    {"id": "undergraduate", "label": "UndergraduateStudent", "model": UndergraduateStudent},
-    {"id": "graduate", "label": "GraduateStudent", "model": GraduateStudent},
-    {"id": "instructor", "label": "Instructor", "model": Instructor},
-    {"id": "course", "label": "Course", "model": Course},
-    {"id": "section", "label": "Section", "model": Section},
-    {"id": "enrollment", "label": "Enrollment", "model": Enrollment},
-    {"id": "grade", "label": "Grade", "model": Grade},
-    {"id": "waitlist", "label": "Waitlist", "model": Waitlist},
-    {"id": "wait", "label": "Wait", "model": Wait},
-]
+from .bulk_enroll import (
+    BulkEnrollError,
+    bulk_enroll,
+    guess_format,
+    parse_rows,
+    summarize,
+)
+from .decorators import admin_required, student_required, instructor_required
+from .enrollment import (
+    drop_student,
+    enroll_from_waitlist,
+    enroll_student,
+    join_waitlist,
+    promote_waitlists,
+    waitlist_rank,
+)
+from .enrollment_queue import submit_enrollment_request
+from .grades import (
+    GRADE_FIELDS,
+    GradeImportError,
+    export_section_csv,
+    import_section_csv,
+    parse_grade,
+    save_section_grades,
+)
+from .reports import ReportParameterError, run_report
+from .table_export import TABLES_CONFIG
+from . import dashboard_cache, snapshots, table_export, table_stats
+from jobs import runner as jobs
+from jobs.models import Job
 
 
 def home(request):
     # If already logged in as student/instructor/admin, go to appropriate dashboard
-    if request.session.get('student_id'):
+    if request.principal.student:
         return redirect('student_dashboard')
-    if request.session.get('instructor_id'):
+    if request.principal.instructor:
         return redirect('instructor_dashboard')
     
     return render(request, 'university/home.html')
@@ -81,23 +101,27 @@ def admin_login(request):
     # User made a GET Request to just retrieve the login page
     else:
         # If student is already logged in, return to dashboard
-        if request.session.get('admin_id'):
+        if request.principal.admin:
             return redirect('admin_dashboard')
         form = AdminLoginForm()
 
     return render(request, 'university/admin_login.html', {'form': form})
 
+@admin_required
 def admin_dashboard(request):
-    admin_id = request.session.get('admin_id')
-    admin = Admin.objects.get(id=admin_id)
-    
-    # Calculate row counts for each table
+    admin = request.principal.admin
+
+    # Row counts come from the cached table statistics (no COUNT(*) here)
+    counts = table_stats.get_table_counts([table['model'] for table in TABLES_CONFIG])
     tables_with_counts = []
     for table in TABLES_CONFIG:
+        count, approximate = counts[table['model']]
         tables_with_counts.append({
             'id': table['id'],
             'label': table['label'],
-            'count': table['model'].objects.count()
+            'count': count,
+            'approximate': approximate,
+            'filters': ', '.join(table['filters']),
         })
 
     return render(
@@ -109,10 +133,45 @@ def admin_dashboard(request):
         }
     )
 
+@admin_required
+def admin_export_tables(request):
+    """
+    Stream one table (CSV or NDJSON) or all of them (NDJSON, one object per
+    row tagged with its table) as a download.
+    Query string: table (repeatable, or "all"), format, gzip=1, term, department.
+    """
+    table_ids = request.GET.getlist('table') or ['all']
+    fmt = request.GET.get('format', 'csv')
+    compress = request.GET.get('gzip') == '1'
+    try:
+        if 'all' in table_ids:
+            tables = TABLES_CONFIG
+            table_ids = ['all']
+        else:
+            tables = [table_export.get_table(table_id) for table_id in table_ids]
+        filters = table_export.resolve_filters(
+            term=request.GET.get('term'), department=request.GET.get('department')
+        )
+        if 'all' in table_ids:
+            # Every table that the filters apply to
+            tables = [table for table in tables if table_export.supports(table, filters)]
+        lines = table_export.lines(tables, fmt, filters)
+    except table_export.ExportError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    response = StreamingHttpResponse(
+        table_export.encode(lines, compress=compress),
+        content_type='application/gzip' if compress else (
+            'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        ),
+    )
+    name = table_export.filename(table_ids, fmt, compress=compress, filters=filters)
+    response['Content-Disposition'] = f'attachment; filename="{name}"'
+    return response
+
+@admin_required
 def admin_create_course(request):
-    admin_id = request.session.get('admin_id')
-    if not admin_id:
-        return redirect('admin_login')
+    admin_id = request.principal.admin.id
 
     if request.method == "POST":
         
@@ -165,54 +224,208 @@ def admin_create_course(request):
         }
     )
 
-# ------------------ VIEW & MANAGE WAITLIST ------------------
+# ------------------ BULK ENROLLMENT ------------------
 
-def admin_waitlist(request):
-    admin_id = request.session.get('admin_id')
-    if not admin_id:
-        return redirect('admin_login')
+# Report rows shown on the page (the full report is always in the JSON response)
+BULK_ENROLL_REPORT_LIMIT = 1000
+
+@admin_required
+def admin_bulk_enroll(request):
+    """
+    Enroll a cohort from an uploaded CSV/JSON file in one transaction.
+    API clients can POST the CSV/JSON body directly (Content-Type text/csv or
+    application/json) and get the per-row report back as JSON.
+    """
+    admin_id = request.principal.admin.id
 
-    wait_entries = Wait.objects.select_related(
-        'student', 'waitlist__section', 'waitlist__section__course'
-    ).all()
+    report = None
 
-    if request.method == "POST":
-        wait_id = request.POST.get("wait_id")
-        wait_entry = get_object_or_404(Wait, id=wait_id)
-        section = wait_entry.waitlist.section
+    if request.method == "POST" and request.content_type in ('application/json', 'text/csv'):
+        fmt = 'json' if request.content_type == 'application/json' else 'csv'
+        try:
+            rows = parse_rows(request.body.decode('utf-8-sig'), fmt)
+        except (UnicodeDecodeError, BulkEnrollError) as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+
+        report = bulk_enroll(
+            rows,
+            admin_id=admin_id,
+            use_waitlist=request.GET.get('waitlist', '1') != '0',
+            dry_run=request.GET.get('dry_run') == '1',
+        )
+        return JsonResponse({"summary": summarize(report), "results": report})
 
-        if section.current_capacity < section.total_capacity:
+    if request.method == "POST":
+        form = AdminBulkEnrollForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
             try:
-                with transaction.atomic():
-                    # Enroll student
-                    Enrollment.objects.create(
-                        student=wait_entry.student,
-                        section=section,
-                        admin_id=admin_id
-                    )
-                    section.current_capacity += 1
-                    section.save()
-                    # Remove from waitlist
-                    wait_entry.delete()
+                rows = parse_rows(
+                    upload.read().decode('utf-8-sig'),
+                    guess_format(upload.name),
+                )
+            except (UnicodeDecodeError, BulkEnrollError) as exc:
+                messages.error(request, f"Could not read the file: {exc}")
+            else:
+                report = bulk_enroll(
+                    rows,
+                    admin_id=admin_id,
+                    use_waitlist=not form.cleaned_data['no_waitlist'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+                counts = summarize(report)
                 messages.success(
                     request,
-                    f"{wait_entry.student.first_name} {wait_entry.student.last_name} enrolled in {section.course.course_code}."
+                    f"{'[Dry run] ' if form.cleaned_data['dry_run'] else ''}"
+                    f"Processed {len(report)} row(s): "
+                    f"{counts.get('enrolled', 0)} enrolled, "
+                    f"{counts.get('waitlisted', 0)} waitlisted, "
+                    f"{counts.get('rejected', 0)} rejected."
                 )
-            except IntegrityError:
-                messages.error(request, "Failed to enroll student. Try again.")
-        else:
-            messages.error(request, "Section is full. Cannot enroll student yet.")
-
-        return redirect('admin_waitlist')
+    else:
+        form = AdminBulkEnrollForm()
 
     return render(
         request,
-        'university/admin_waitlist.html',
+        'university/admin_bulk_enroll.html',
         {
-            "wait_entries": wait_entries
+            "form": form,
+            "report": report[:BULK_ENROLL_REPORT_LIMIT] if report else report,
+            "report_truncated": bool(report) and len(report) > BULK_ENROLL_REPORT_LIMIT,
+            "report_limit": BULK_ENROLL_REPORT_LIMIT,
         }
     )
 
+# ------------------ VIEW & MANAGE WAITLIST ------------------
+
+# Rows per page on the waitlist admin page (keyset pagination)
+ADMIN_WAITLIST_PAGE_SIZE = 50
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+@admin_required
+def admin_waitlist(request):
+    """
+    Summary of waitlisted sections (one row per section, from one grouped
+    query), filterable by course and term. Individual entries are loaded
+    only when a section is opened (?section=<id>). Both lists use keyset
+    pagination (?after=...), so page cost doesn't grow with the waitlist size.
+    """
+    admin_id = request.principal.admin.id
+
+    if request.method == "POST":
+        if request.POST.get("promote_section"):
+            # Fill every free seat in the section from its waitlist
+            promoted = promote_waitlists(
+                section_ids=[_parse_int(request.POST.get("promote_section"))]
+            )
+            if promoted:
+                messages.success(request, f"Enrolled {len(promoted)} student(s) from the waitlist.")
+            else:
+                messages.error(request, "Section is full. Cannot enroll students yet.")
+            return redirect(request.get_full_path())
+
+        wait_id = request.POST.get("wait_id")
+        wait_entry = get_object_or_404(
+            Wait.objects.select_related('student', 'waitlist__section__course'),
+            id=wait_id
+        )
+        section = wait_entry.waitlist.section
+
+        try:
+            enrolled = enroll_from_waitlist(wait_entry, admin_id)
+            if enrolled:
+                messages.success(
+                    request,
+                    f"{wait_entry.student.first_name} {wait_entry.student.last_name} enrolled in {section.course.course_code}."
+                )
+            else:
+                messages.error(request, "Section is full or the student is no longer waiting.")
+        except IntegrityError:
+            messages.error(request, "Failed to enroll student. Try again.")
+
+        return redirect(request.get_full_path())
+
+    course_id = _parse_int(request.GET.get('course'))
+    term = request.GET.get('term', '').strip()
+    section_id = _parse_int(request.GET.get('section'))
+    filters = {'course': course_id or '', 'term': term}
+
+    context = {
+        "courses": Course.objects.order_by('course_code').only('id', 'course_code'),
+        "terms": Section.objects.order_by('term').values_list('term', flat=True).distinct(),
+        "filters": filters,
+        "filter_query": urlencode(filters),
+        "section": None,
+        "summary_rows": [],
+        "wait_entries": [],
+        "next_page_query": None,
+    }
+
+    if section_id:
+        # ---- Drill-down: the entries of one section, in waitlist order ----
+        section = get_object_or_404(Section.objects.select_related('course'), id=section_id)
+        entries = (
+            Wait.objects
+            .filter(waitlist__section_id=section.id)
+            .select_related('student')
+            .order_by('position', 'id')
+        )
+        after_position = _parse_int(request.GET.get('after_position'))
+        after_id = _parse_int(request.GET.get('after_id'))
+        if after_position is not None and after_id is not None:
+            entries = entries.filter(
+                Q(position__gt=after_position) | Q(position=after_position, id__gt=after_id)
+            )
+        page = list(entries[:ADMIN_WAITLIST_PAGE_SIZE + 1])
+        if len(page) > ADMIN_WAITLIST_PAGE_SIZE:
+            page = page[:ADMIN_WAITLIST_PAGE_SIZE]
+            context["next_page_query"] = urlencode({
+                **filters,
+                'section': section.id,
+                'after_position': page[-1].position,
+                'after_id': page[-1].id,
+            })
+        context.update({"section": section, "wait_entries": page})
+    else:
+        # ---- Summary: one row per section with a non-empty waitlist ----
+        sections = Section.objects.all()
+        if course_id:
+            sections = sections.filter(course_id=course_id)
+        if term:
+            sections = sections.filter(term=term)
+        after = _parse_int(request.GET.get('after'))
+        if after is not None:
+            sections = sections.filter(id__gt=after)
+
+        summary = (
+            sections
+            .values(
+                'id', 'section_number', 'term', 'total_capacity', 'current_capacity',
+                'course__course_code', 'course__course_name',
+            )
+            .annotate(waitlist_length=Count('waitlists__entries'))
+            .filter(waitlist_length__gt=0)
+            .annotate(
+                free_seats=F('total_capacity') - F('current_capacity'),
+                promotable=Least(
+                    F('waitlist_length'), F('total_capacity') - F('current_capacity')
+                ),
+            )
+            .order_by('id')
+        )
+        page = list(summary[:ADMIN_WAITLIST_PAGE_SIZE + 1])
+        if len(page) > ADMIN_WAITLIST_PAGE_SIZE:
+            page = page[:ADMIN_WAITLIST_PAGE_SIZE]
+            context["next_page_query"] = urlencode({**filters, 'after': page[-1]['id']})
+        context["summary_rows"] = page
+
+    return render(request, 'university/admin_waitlist.html', context)
+
 def student_login(request):
     if request.method == "POST":
         form = StudentLoginForm(request.POST)
@@ -237,70 +450,109 @@ def student_login(request):
     # User made a GET Request to just retrieve the login page
     else:
         # If student is already logged in, return to dashboard
-        if request.session.get('student_id'):
+        if request.principal.student:
             return redirect('student_dashboard')
         form = StudentLoginForm()
 
     return render(request, 'university/student_login.html', {'form': form})
 
-@student_required
-def student_dashboard(request):
-    student_id = request.session.get('student_id')
-    if not student_id:
-        return redirect('student_login')
-
-    student = Student.objects.get(id=student_id)
-
-    # Get all enrollments for this student, along with related course & instructor
+def _student_dashboard_rows(student_id):
+    """
+    Enrollment rows (with this section's grade, one LEFT JOIN) and waitlist
+    entries of a student, as cached by dashboard_cache.
+    """
     enrollments = (
         Enrollment.objects
-        .filter(student=student)
-        .select_related('section__course', 'section__instructor')
+        .filter(student_id=student_id)
+        .annotate(
+            section_grade=FilteredRelation(
+                'student__grades',
+                condition=Q(student__grades__section_id=F('section_id')),
+            )
+        )
+        .values(
+            'section_id', 'section__term',
+            'section__course__course_code', 'section__course__course_name',
+            'section__instructor__first_name', 'section__instructor__last_name',
+            'section_grade__lab_grade', 'section_grade__assignment_grade',
+            'section_grade__midterm_grade', 'section_grade__final_grade',
+        )
+        .order_by('id')
     )
+    waits = (
+        Wait.objects
+        .filter(student_id=student_id)
+        .values(
+            'id', 'waitlist__section__section_number', 'waitlist__section__term',
+            'waitlist__section__course__course_code', 'waitlist__section__course__course_name',
+        )
+        .order_by('waitlist__section__course__course_code')
+    )
+    return {
+        "enrollments": [
+            {
+                "course_code": row['section__course__course_code'],
+                "course_name": row['section__course__course_name'],
+                "section_id": row['section_id'],
+                "term": row['section__term'],
+                "instructor_name": (
+                    f"{row['section__instructor__first_name']} {row['section__instructor__last_name']}"
+                ),
+                "lab_grade": row['section_grade__lab_grade'],
+                "assignment_grade": row['section_grade__assignment_grade'],
+                "midterm_grade": row['section_grade__midterm_grade'],
+                "final_grade": row['section_grade__final_grade'],
+            }
+            for row in enrollments
+        ],
+        "waits": [
+            {
+                "wait_id": row['id'],
+                "course_code": row['waitlist__section__course__course_code'],
+                "course_name": row['waitlist__section__course__course_name'],
+                "section_number": row['waitlist__section__section_number'],
+                "term": row['waitlist__section__term'],
+            }
+            for row in waits
+        ],
+    }
 
-    # Get grades for this student in these sections
-    section_ids = enrollments.values_list('section_id', flat=True)
-    grades = Grade.objects.filter(student=student, section_id__in=section_ids)
-
-    # Map section_id -> grade object
-    grade_by_section = {g.section_id: g for g in grades}
-
-    # Build rows for the template
-    enrollment_rows = []
-    for enrollment in enrollments:
-        section = enrollment.section
-        course = section.course
-        instructor = section.instructor
-        grade = grade_by_section.get(section.id)  # might be None
 
-        enrollment_rows.append({
-            "course_code": course.course_code,
-            "course_name": course.course_name,
-            "section_id": section.id,
-            "term": section.term,
-            "instructor_name": f"{instructor.first_name} {instructor.last_name}",
-            "lab_grade": getattr(grade, 'lab_grade', None),
-            "assignment_grade": getattr(grade, 'assignment_grade', None),
-            "midterm_grade": getattr(grade, 'midterm_grade', None),
-            "final_grade": getattr(grade, 'final_grade', None),
-        })
+@student_required
+def student_dashboard(request):
+    student = request.principal.student
+
+    rows = dashboard_cache.get_rows(student.id, _student_dashboard_rows)
+
+    # Places in line change whenever anyone ahead leaves the waitlist, so they
+    # are looked up live (Wait table only, and only for waitlisted students)
+    waitlist_rows = rows['waits']
+    if waitlist_rows:
+        positions = dict(
+            Wait.objects
+            .filter(id__in=[row['wait_id'] for row in waitlist_rows])
+            .annotate(queue_position=waitlist_rank())
+            .values_list('id', 'queue_position')
+        )
+        waitlist_rows = [
+            dict(row, position=positions[row['wait_id']])
+            for row in waitlist_rows
+            if row['wait_id'] in positions
+        ]
 
     return render(
         request,
         'university/student_dashboard.html',
         {
             'student': student,
-            'enrollment_rows': enrollment_rows,
+            'enrollment_rows': rows['enrollments'],
+            'waitlist_rows': waitlist_rows,
         }
     )
 
 @student_required
 def student_available_courses(request):
-    student_id = request.session.get('student_id')
-    if not student_id:
-        return redirect('student_login')
-
-    student = Student.objects.get(id=student_id)
+    student = request.principal.student
 
     # Sections the student is already enrolled in
     enrolled_section_ids = Enrollment.objects.filter(student=student).values_list(
@@ -326,12 +578,8 @@ def student_available_courses(request):
 
 @student_required
 def student_add_course(request, section_id):
-    student_id = request.session.get('student_id')
-    if not student_id:
-        return redirect('student_login')
-
-    student = Student.objects.get(id=student_id)
-    section = get_object_or_404(Section, id=section_id)
+    student = request.principal.student
+    section = get_object_or_404(Section.objects.select_related('course'), id=section_id)
 
     if request.method != "POST":
         messages.error(request, "Invalid request method.")
@@ -342,24 +590,32 @@ def student_add_course(request, section_id):
         messages.info(request, "You are already enrolled in this section.")
         return redirect('student_dashboard')
 
-    # If section has space: enroll normally
-    if section.current_capacity < section.total_capacity:
-        try:
-            with transaction.atomic():
-                Enrollment.objects.create(
-                    student=student,
-                    section=section,
-                    admin=section.admin,  # or student.admin if you prefer
-                )
-                section.current_capacity += 1
-                section.save()  # recalculates remaining_capacity
-            messages.success(
-                request,
-                f"You have been enrolled in {section.course.course_code} "
-                f"Section {section.section_number} ({section.term})."
-            )
-        except IntegrityError:
-            messages.error(request, "An error occurred while enrolling. Please try again.")
+    # Queued enrollment mode: record the request and let the queue workers
+    # apply it in a batch (see enrollment_queue.py)
+    if getattr(settings, 'UNIVERSITY_QUEUED_ENROLLMENT', False):
+        enrollment_request = submit_enrollment_request(student.id, section.id)
+        messages.info(
+            request,
+            f"Your request for {section.course.course_code} "
+            f"Section {section.section_number} ({section.term}) has been queued."
+        )
+        return redirect('student_enrollment_ticket', ticket=enrollment_request.ticket)
+
+    # Try to claim a seat: the capacity check and both counter updates happen
+    # in one conditional UPDATE, so concurrent adds can't over-enroll.
+    try:
+        enrolled = enroll_student(student.id, section.id, section.admin_id)
+    except IntegrityError:
+        # Seat claim is rolled back together with the failed insert
+        messages.error(request, "An error occurred while enrolling. Please try again.")
+        return redirect('student_dashboard')
+
+    if enrolled:
+        messages.success(
+            request,
+            f"You have been enrolled in {section.course.course_code} "
+            f"Section {section.section_number} ({section.term})."
+        )
         return redirect('student_dashboard')
 
     # ---- Section is full → WAITLIST LOGIC ----
@@ -378,36 +634,13 @@ def student_add_course(request, section_id):
         return redirect('student_dashboard')
 
     try:
-        with transaction.atomic():
-            # Get or create a waitlist for this section (single waitlist per section)
-            waitlist, created = Waitlist.objects.get_or_create(
-                section=section,
-                waitlist_id=1,  # assuming one waitlist per section
-                defaults={
-                    "spaces_left": 10,  # default capacity; adjust if you like
-                    "admin": section.admin,
-                },
-            )
-
-            # If you want to enforce max waitlist size:
-            if waitlist.spaces_left <= 0:
-                messages.error(
-                    request,
-                    "Course and its waitlist are currently full. Please try another section."
-                )
-                return redirect('student_dashboard')
-
-            # Create wait entry
-            Wait.objects.create(
-                student=student,
-                waitlist=waitlist,
-                admin=section.admin,
+        # Enforce max waitlist size (decrements spaces_left when there is room)
+        if not join_waitlist(student.id, section):
+            messages.error(
+                request,
+                "Course and its waitlist are currently full. Please try another section."
             )
-
-            # Decrement waitlist spaces_left
-            if waitlist.spaces_left > 0:
-                waitlist.spaces_left -= 1
-                waitlist.save()
+            return redirect('student_dashboard')
 
         messages.success(
             request,
@@ -421,39 +654,72 @@ def student_add_course(request, section_id):
     return redirect('student_dashboard')
 
 @student_required
-def student_drop_course(request, section_id):
-    student_id = request.session.get('student_id')
-    if not student_id:
-        return redirect('student_login')
+def student_enrollment_ticket(request, ticket):
+    """
+    Status of a queued enrollment request. Returns JSON when called with
+    ?format=json so clients can poll it; otherwise renders a page that
+    refreshes itself until the request has been processed.
+    """
+    student_id = request.principal.student.id
+
+    enrollment_request = get_object_or_404(
+        EnrollmentRequest.objects.select_related('section__course'),
+        ticket=ticket,
+        student_id=student_id,
+    )
+    section = enrollment_request.section
+    done = enrollment_request.status not in (
+        EnrollmentRequest.STATUS_PENDING,
+        EnrollmentRequest.STATUS_PROCESSING,
+    )
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            "ticket": str(enrollment_request.ticket),
+            "status": enrollment_request.status,
+            "message": enrollment_request.message,
+            "done": done,
+            "section_id": section.id,
+            "course_code": section.course.course_code,
+            "created_at": enrollment_request.created_at.isoformat(),
+            "processed_at": (
+                enrollment_request.processed_at.isoformat()
+                if enrollment_request.processed_at else None
+            ),
+        })
+
+    return render(
+        request,
+        'university/student_enrollment_ticket.html',
+        {
+            'enrollment_request': enrollment_request,
+            'section': section,
+            'done': done,
+        }
+    )
 
-    student = Student.objects.get(id=student_id)
-    section = get_object_or_404(Section, id=section_id)
+@student_required
+def student_drop_course(request, section_id):
+    student = request.principal.student
+    section = get_object_or_404(Section.objects.select_related('course'), id=section_id)
 
     if request.method != "POST":
         messages.error(request, "Invalid request method.")
         return redirect('student_dashboard')
 
     try:
-        with transaction.atomic():
-            # Find the enrollment for this student + section
-            enrollment = Enrollment.objects.select_for_update().get(
-                student=student,
-                section=section,
-            )
-
-            # Delete the enrollment
-            enrollment.delete()
-
-            # Decrease section capacity (no auto-promotion from waitlist)
-            if section.current_capacity > 0:
-                section.current_capacity -= 1
-                section.save()  # will recalc remaining_capacity in save()
+        # Delete the enrollment and decrease section capacity
+        drop_student(student.id, section.id)
 
         messages.success(
             request,
             f"You have dropped {section.course.course_code} "
             f"Section {section.section_number} ({section.term})."
         )
+
+        # Hand the freed seat to the head of the section's waitlist
+        if getattr(settings, 'UNIVERSITY_AUTO_PROMOTE_WAITLIST', True):
+            promote_waitlists(section_ids=[section.id])
     except Enrollment.DoesNotExist:
         messages.error(request, "You are not enrolled in this section.")
 
@@ -483,7 +749,7 @@ def instructor_login(request):
                     messages.error(request, "Invalid email or password.")
     # User made a GET Request to just retrieve the login page
     else:
-        if request.session.get('instructor_id'):
+        if request.principal.instructor:
             return redirect('instructor_dashboard')
         form = InstructorLoginForm()
 
@@ -491,148 +757,195 @@ def instructor_login(request):
 
 @instructor_required
 def instructor_dashboard(request):
-    instructor_id = request.session.get('instructor_id')
-    if not instructor_id:
-        return redirect('instructor_login')
+    """
+    One summary row per section (enrollment count, graded count, average
+    final) from a single query, optionally filtered by term. Grade figures
+    come from the maintained GradeSummary row of each section.
+    Rosters are loaded on demand from instructor_section_roster.
+    """
+    instructor = request.principal.instructor
+    term = request.GET.get('term', '').strip()
 
-    instructor = Instructor.objects.get(id=instructor_id)
+    sections = Section.objects.filter(instructor=instructor)
+    terms = sections.order_by('term').values_list('term', flat=True).distinct()
+    if term:
+        sections = sections.filter(term=term)
 
-    # All sections taught by this instructor
-    sections = (
-        Section.objects
-        .filter(instructor=instructor)
-        .select_related('course')
-        .prefetch_related('enrollments__student', 'grades__student')
+    enrolled_count = (
+        Enrollment.objects
+        .filter(section_id=OuterRef('pk'))
+        .order_by()
+        .values('section_id')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    section_rows = (
+        sections
+        .values(
+            'id', 'section_number', 'term',
+            'course__course_code', 'course__course_name',
+        )
+        .annotate(
+            enrolled_count=Coalesce(Subquery(enrolled_count), Value(0)),
+            graded_count=Coalesce(F('grade_summary__final_grade_count'), Value(0)),
+            # (cast: SQLite stores whole-number sums as integers)
+            avg_final=(
+                Cast('grade_summary__final_grade_sum', FloatField())
+                / NullIf(F('grade_summary__final_grade_count'), 0)
+            ),
+        )
+        .order_by('term', 'course__course_code', 'section_number')
     )
 
-    section_rows = []
+    return render(
+        request,
+        'university/instructor_dashboard.html',
+        {
+            'instructor': instructor,
+            'section_rows': section_rows,
+            'terms': terms,
+            'term': term,
+        }
+    )
 
-    for section in sections:
-        # Map student_id -> Grade object for this section
-        grades_by_student = {g.student_id: g for g in section.grades.all()}
+# Students per roster page (keyset pagination on enrollment id)
+ROSTER_PAGE_SIZE = 50
 
-        students_data = []
-        for enrollment in section.enrollments.all():
-            student = enrollment.student
-            grade = grades_by_student.get(student.id)
+@instructor_required
+def instructor_section_roster(request, section_id):
+    """
+    One page of a section's roster with grades, as an HTML fragment for the
+    dashboard or as JSON (?format=json). Page through with ?after=<id>.
+    """
+    instructor_id = request.principal.instructor.id
 
-            students_data.append({
-                "student_name": f"{student.first_name} {student.last_name}",
-                "student_email": student.email,
-                "lab_grade": getattr(grade, 'lab_grade', None),
-                "assignment_grade": getattr(grade, 'assignment_grade', None),
-                "midterm_grade": getattr(grade, 'midterm_grade', None),
-                "final_grade": getattr(grade, 'final_grade', None),
-            })
+    section = get_object_or_404(Section, id=section_id, instructor_id=instructor_id)
+
+    # Enrollment + student + this section's grade in one LEFT JOIN
+    roster = (
+        Enrollment.objects
+        .filter(section_id=section.id)
+        .annotate(
+            section_grade=FilteredRelation(
+                'student__grades',
+                condition=Q(student__grades__section_id=section.id),
+            )
+        )
+        .values(
+            'id',
+            'student__first_name', 'student__last_name', 'student__email',
+            'section_grade__lab_grade', 'section_grade__assignment_grade',
+            'section_grade__midterm_grade', 'section_grade__final_grade',
+        )
+        .order_by('id')
+    )
+    after = _parse_int(request.GET.get('after'))
+    if after is not None:
+        roster = roster.filter(id__gt=after)
 
-        section_rows.append({
+    page = list(roster[:ROSTER_PAGE_SIZE + 1])
+    next_after = None
+    if len(page) > ROSTER_PAGE_SIZE:
+        page = page[:ROSTER_PAGE_SIZE]
+        next_after = page[-1]['id']
+
+    students = [
+        {
+            "enrollment_id": row['id'],
+            "student_name": f"{row['student__first_name']} {row['student__last_name']}",
+            "student_email": row['student__email'],
+            "lab_grade": row['section_grade__lab_grade'],
+            "assignment_grade": row['section_grade__assignment_grade'],
+            "midterm_grade": row['section_grade__midterm_grade'],
+            "final_grade": row['section_grade__final_grade'],
+        }
+        for row in page
+    ]
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
             "section_id": section.id,
-            "course_code": section.course.course_code,
-            "course_name": section.course.course_name,
-            "section_number": section.section_number,
-            "term": section.term,
-            "students": students_data,
+            "students": students,
+            "next_after": next_after,
         })
 
     return render(
         request,
-        'university/instructor_dashboard.html',
+        'university/instructor_section_roster.html',
         {
-            'instructor': instructor,
-            'section_rows': section_rows,
+            'section': section,
+            'students': students,
+            'next_after': next_after,
+            'first_page': after is None,
         }
     )
 
 @instructor_required
 def instructor_edit_grades(request, section_id):
-    instructor_id = request.session.get('instructor_id')
-    if not instructor_id:
-        return redirect('instructor_login')
-
-    instructor = Instructor.objects.get(id=instructor_id)
-    section = get_object_or_404(Section, id=section_id)
+    instructor = request.principal.instructor
+    section = get_object_or_404(Section.objects.select_related('course'), id=section_id)
 
     # Ensure this instructor actually teaches this section
     if section.instructor_id != instructor.id:
         messages.error(request, "You are not authorized to edit grades for this section.")
         return redirect('instructor_dashboard')
 
-    enrollments = (
+    # Enrollment + student + this section's grade in one LEFT JOIN
+    enrollments = list(
         Enrollment.objects
-        .filter(section=section)
-        .select_related('student')
+        .filter(section_id=section.id)
+        .annotate(
+            section_grade=FilteredRelation(
+                'student__grades',
+                condition=Q(student__grades__section_id=section.id),
+            )
+        )
+        .values(
+            'id', 'student_id',
+            'student__first_name', 'student__last_name', 'student__email',
+            *(f'section_grade__{field}' for field in GRADE_FIELDS),
+        )
+        .order_by('id')
     )
 
-    # Map (student_id) -> Grade object
-    grades = Grade.objects.filter(section=section, student__in=[e.student for e in enrollments])
-    grades_by_student = {g.student_id: g for g in grades}
+    rows = [
+        {
+            "enrollment_id": e['id'],
+            "student_name": f"{e['student__first_name']} {e['student__last_name']}",
+            "student_email": e['student__email'],
+            **{field: e[f'section_grade__{field}'] for field in GRADE_FIELDS},
+        }
+        for e in enrollments
+    ]
 
     if request.method == "POST":
-        # Process grade updates
-        for enrollment in enrollments:
-            student = enrollment.student
-            key_prefix = f"{enrollment.id}"
-
-            lab_raw = request.POST.get(f"lab_grade_{key_prefix}", "").strip()
-            assignment_raw = request.POST.get(f"assignment_grade_{key_prefix}", "").strip()
-            midterm_raw = request.POST.get(f"midterm_grade_{key_prefix}", "").strip()
-            final_raw = request.POST.get(f"final_grade_{key_prefix}", "").strip()
-
-            def parse_decimal(value):
-                if value == "":
-                    return None
-                try:
-                    return Decimal(value)
-                except InvalidOperation:
-                    return None  # you could also collect errors if you want
-
-            lab = parse_decimal(lab_raw)
-            assignment = parse_decimal(assignment_raw)
-            midterm = parse_decimal(midterm_raw)
-            final = parse_decimal(final_raw)
-
-            grade = grades_by_student.get(student.id)
-
-            if grade is None:
-                # Create new grade row if any field has a value
-                if any(v is not None for v in (lab, assignment, midterm, final)):
-                    grade = Grade.objects.create(
-                        student=student,
-                        section=section,
-                        course=section.course,
-                        admin=section.admin,
-                        lab_grade=lab,
-                        assignment_grade=assignment,
-                        midterm_grade=midterm,
-                        final_grade=final,
-                    )
-                    grades_by_student[student.id] = grade
-            else:
-                # Update existing grade
-                grade.lab_grade = lab
-                grade.assignment_grade = assignment
-                grade.midterm_grade = midterm
-                grade.final_grade = final
-                grade.save()
-
-        messages.success(request, "Grades updated successfully.")
-        return redirect('instructor_dashboard')
-
-    # GET: build rows for display in form
-    rows = []
-    for enrollment in enrollments:
-        student = enrollment.student
-        g = grades_by_student.get(student.id)
-
-        rows.append({
-            "enrollment_id": enrollment.id,
-            "student_name": f"{student.first_name} {student.last_name}",
-            "student_email": student.email,
-            "lab_grade": getattr(g, 'lab_grade', None),
-            "assignment_grade": getattr(g, 'assignment_grade', None),
-            "midterm_grade": getattr(g, 'midterm_grade', None),
-            "final_grade": getattr(g, 'final_grade', None),
-        })
+        # Validate every row first; nothing is written if any value is bad
+        submitted = {}
+        has_errors = False
+        for row, e in zip(rows, enrollments):
+            values = {}
+            errors = []
+            for field in GRADE_FIELDS:
+                raw = request.POST.get(f"{field}_{e['id']}", "")
+                value, error = parse_grade(raw)
+                if error:
+                    label = field.replace('_', ' ').capitalize()
+                    errors.append(f"{label}: {error}")
+                values[field] = value
+                row[field] = raw.strip()  # redisplay what was typed
+            row["errors"] = errors
+            has_errors = has_errors or bool(errors)
+            submitted[e['student_id']] = values
+
+        if has_errors:
+            messages.error(request, "Some grades are invalid; nothing was saved. Fix the marked rows.")
+        else:
+            created, updated = save_section_grades(section, submitted)
+            messages.success(
+                request,
+                f"Grades updated successfully ({created} added, {updated} changed)."
+            )
+            return redirect('instructor_dashboard')
 
     return render(
         request,
@@ -641,172 +954,180 @@ def instructor_edit_grades(request, section_id):
             'instructor': instructor,
             'section': section,
             'rows': rows,
+            'import_form': InstructorGradeImportForm(),
         }
     )
 
+@instructor_required
+def instructor_export_grades(request, section_id):
+    """Download the section's grade sheet as CSV (streamed)."""
+    instructor_id = request.principal.instructor.id
+
+    section = get_object_or_404(
+        Section.objects.select_related('course'), id=section_id, instructor_id=instructor_id
+    )
+    response = StreamingHttpResponse(export_section_csv(section), content_type='text/csv')
+    filename = f"{section.course.course_code}-{section.section_number}-{section.term}-grades.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename.replace(" ", "_")}"'
+    return response
+
+@instructor_required
+def instructor_import_grades(request, section_id):
+    """
+    Apply an uploaded CSV grade sheet (same columns as the export) to the
+    section in one transaction. Any invalid row rejects the whole file.
+    """
+    instructor_id = request.principal.instructor.id
+
+    section = get_object_or_404(Section, id=section_id, instructor_id=instructor_id)
+
+    if request.method == "POST":
+        form = InstructorGradeImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            # Decode the upload line by line instead of reading it into memory
+            lines = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                created, updated, errors = import_section_csv(section, lines)
+            except (UnicodeDecodeError, GradeImportError, csv.Error) as exc:
+                messages.error(request, f"Could not read the file: {exc}")
+            else:
+                if errors:
+                    messages.error(request, "The grade sheet was not imported; fix these rows and upload it again.")
+                    for error in errors:
+                        messages.error(request, error)
+                else:
+                    messages.success(
+                        request,
+                        f"Grade sheet imported ({created} added, {updated} updated)."
+                    )
+        else:
+            messages.error(request, "Choose a CSV file to import.")
+
+    return redirect('instructor_edit_grades', section_id=section.id)
+
 def tables_menu(request):
     return render(request, 'university/tables_menu.html')
 
 def create_tables_page(request):
     """
-    Recreates tables for the 'university' app by re-applying migrations.
-    Does NOT populate data.
+    Recreates tables for the 'university' app by re-applying migrations, in
+    a background job (the page shows its progress). Does NOT populate data.
     """
     if request.method == "POST":
-        # Re-apply all migrations for the app (recreate tables)
-        call_command('migrate', 'university')
-
-        messages.success(
-            request,
-            "Tables have been created (migrations applied) for the 'university' app."
-        )
+        job = jobs.enqueue('create_tables')
+        messages.success(request, f"Create tables job #{job.id} queued.")
         return redirect('create_tables_page')
 
-    return render(request, 'university/tables_create.html')
+    return render(request, 'university/tables_create.html', {"job": jobs.latest('create_tables')})
 
 def populate_tables_page(request):
     """
-    Populates tables with mock data by running the seed_mock_data command.
-    Assumes tables already exist.
+    Populates tables with mock data by running the seed_mock_data command
+    (optionally with --scale) in a background job. Assumes tables already exist.
     """
     if request.method == "POST":
-        call_command('seed_mock_data')
-
-        messages.success(
-            request,
-            "Tables have been populated with mock data (seed_mock_data)."
-        )
-        return redirect('populate_tables_page')
+        form = PopulateTablesForm(request.POST)
+        if form.is_valid():
+            scale = form.cleaned_data['scale']
+            job = jobs.enqueue('populate_tables', **({'scale': scale} if scale else {}))
+            messages.success(request, f"Populate tables job #{job.id} queued.")
+            return redirect('populate_tables_page')
+    else:
+        form = PopulateTablesForm()
 
-    return render(request, 'university/tables_populate.html')
+    return render(
+        request,
+        'university/tables_populate.html',
+        {"form": form, "job": jobs.latest('populate_tables')}
+    )
 
 def drop_tables_page(request):
     """
     Drops (unapplies migrations for) the 'university' app, which effectively
-    drops all its tables. This uses Django's migration system so migration state stays in sync.
+    drops all its tables, in a background job. This uses Django's migration
+    system so migration state stays in sync.
     """
     if request.method == "POST":
-        # This will:
-        # - Unapply all migrations for the 'university' app
-        # - Drop its tables
-        call_command('migrate', 'university', 'zero')
-        messages.success(
-            request,
-            "All tables for the 'university' app have been dropped (migrated to zero)."
-        )
+        job = jobs.enqueue('drop_tables')
+        messages.success(request, f"Drop tables job #{job.id} queued.")
         return redirect('drop_tables_page')
 
-    return render(request, 'university/tables_drop.html')
-
-def query_tables_page(request):
-    # ----- Query 1: Instructor average final grade per course (> 80) -----
-    q1_queryset = (
-        Grade.objects
-        .select_related('section__course', 'section__instructor')
-        .values(
-            'section__instructor__first_name',
-            'section__instructor__last_name',
-            'section__course__course_code',
-        )
-        .annotate(avg_final=Avg('final_grade'))
-        .filter(avg_final__gt=80)
-        .order_by(
-            'section__instructor__last_name',
-            'section__instructor__first_name',
-            'section__course__course_code',
-        )
-    )
-    query1_rows = list(q1_queryset)
-
-    # ----- Query 2: Instructors & courses with students also in Abhari's CPS109 -----
-    abhari_students = Student.objects.filter(
-        enrollments__section__instructor__last_name='Abhari',
-        enrollments__section__course__course_code='CPS109',
-    ).distinct()
+    return render(request, 'university/tables_drop.html', {"job": jobs.latest('drop_tables')})
 
-    q2_queryset = (
-        Enrollment.objects
-        .filter(student__in=abhari_students)
-        .select_related('section__course', 'section__instructor')
-        .values(
-            'section__instructor__first_name',
-            'section__instructor__last_name',
-            'section__course__course_code',
-        )
-        .distinct()
-        .order_by(
-            'section__instructor__last_name',
-            'section__instructor__first_name',
-            'section__course__course_code',
-        )
-    )
-    query2_rows = list(q2_queryset)
-
-    # ----- Query 3: Min/Max/Avg/Var/StdDev of final grades per course -----
-    query3_rows = []
-    for course in Course.objects.all().order_by('course_code'):
-        finals = list(
-            Grade.objects
-            .filter(course=course)
-            .values_list('final_grade', flat=True)
-        )
-        if not finals:
-            continue
-
-        min_g = min(finals)
-        max_g = max(finals)
-        avg_g = round(statistics.mean(finals), 2)
-
-        if len(finals) > 1:
-            var_g = round(statistics.pvariance(finals), 2)
-            std_g = round(statistics.pstdev(finals), 2)
-        else:
-            var_g = 0
-            std_g = 0
-
-        query3_rows.append({
-            "course_code": course.course_code,
-            "min_grade": min_g,
-            "max_grade": max_g,
-            "avg_grade": avg_g,
-            "var_grade": var_g,
-            "stddev_grade": std_g,
-        })
-
-    # ----- Query 4: Courses with no students enrolled -----
-    q4_queryset = (
-        Course.objects
-        .annotate(total_enrollments=Count('sections__enrollments', distinct=True))
-        .filter(total_enrollments=0)
-        .values('course_code', 'course_name')
-        .order_by('course_code')
-    )
-    query4_rows = list(q4_queryset)
+@admin_required
+def snapshots_page(request):
+    """
+    Save the database as a snapshot or restore the university tables from
+    one, both as background jobs (the page shows their progress), or delete
+    a snapshot.
+    """
+    form = SaveSnapshotForm()
+    if request.method == "POST":
+        action = request.POST.get('action')
+        name = request.POST.get('name', '')
+        if action == 'save':
+            form = SaveSnapshotForm(request.POST)
+            if form.is_valid():
+                job = jobs.enqueue(
+                    'save_snapshot',
+                    name=form.cleaned_data['name'],
+                    overwrite=form.cleaned_data['overwrite'],
+                )
+                messages.success(request, f"Save snapshot job #{job.id} queued.")
+                return redirect('snapshots_page')
+        elif action == 'restore':
+            job = jobs.enqueue('restore_snapshot', name=name)
+            messages.success(request, f"Restore snapshot job #{job.id} queued.")
+            return redirect('snapshots_page')
+        elif action == 'delete':
+            try:
+                snapshots.delete(name)
+            except snapshots.SnapshotError as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(request, f"Snapshot {name} deleted.")
+            return redirect('snapshots_page')
 
-    # ----- Query 5: Student counts in CPS109 and CPS205 -----
-    q5_queryset = (
-        Course.objects
-        .filter(course_code__in=['CPS109', 'CPS205'])
-        .annotate(
-            student_count=Count('sections__enrollments__student', distinct=True)
-        )
-        .values('course_code', 'student_count')
-        .order_by('course_code')
+    job = jobs.live(
+        Job.objects.filter(name__in=['save_snapshot', 'restore_snapshot']).order_by('-id').first()
     )
-    query5_rows = list(q5_queryset)
-
     return render(
         request,
-        'university/tables_query.html',
-        {
-            "query1_rows": query1_rows,
-            "query2_rows": query2_rows,
-            "query3_rows": query3_rows,
-            "query4_rows": query4_rows,
-            "query5_rows": query5_rows,
-        }
+        'university/tables_snapshots.html',
+        {"form": form, "snapshots": snapshots.list_snapshots(), "job": job}
     )
 
+# Reports shown on the query page, in order (see reports.py)
+QUERY_PAGE_REPORTS = [
+    'instructor_averages',
+    'shared_students',
+    'course_grade_stats',
+    'empty_courses',
+    'course_student_counts',
+]
+
+def query_tables_page(request):
+    """
+    Predefined reports from the report registry. Parameters come from the
+    query string (?min_average=, ?instructor=, ?course=, ?field=, ?courses=);
+    results are served from the report cache until their tables change.
+    """
+    context = {
+        "errors": [],
+        "params": request.GET.dict(),
+        "grade_fields": [(field, field.replace('_', ' ').title()) for field in GRADE_FIELDS],
+    }
+    for number, name in enumerate(QUERY_PAGE_REPORTS, start=1):
+        try:
+            title, rows = run_report(name, **request.GET.dict())
+        except ReportParameterError as exc:
+            context["errors"].append(str(exc))
+            title, rows = run_report(name)
+        context[f"query{number}_title"] = title
+        context[f"query{number}_rows"] = rows
+
+    return render(request, 'university/tables_query.html', context)
+
 def logout_view(request):
     # Remove all possible session IDs safely
     request.session.pop('instructor_id', None)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'jobs',
     'university'
 ]
 
@@ -46,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'university.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -77,9 +80,113 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep each thread's connection (and its pragmas) between requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Writers queue for the lock at BEGIN (see UNIVERSITY_SQLITE_PRAGMAS)
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # A file rather than SQLite's in-memory default: the concurrency tests
+        # open one connection per thread, which need real (WAL) locking
+        'TEST': {
+            'NAME': Path(tempfile.gettempdir()) / 'university_enrollment_test.sqlite3',
+        },
+    }
+}
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared by every process on the machine (runserver, run_jobs,
+# process_enrollment_queue, precompute_reports): the table counts, report
+# and dashboard versions, cached principals and job progress must be the
+# same for all of them. The default LocMemCache is per process, so writes
+# made by a command would never reach the server's copy. With several
+# machines, use a network backend (Memcached, Redis) instead.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(tempfile.gettempdir()) / 'university_enrollment_cache',
+        'OPTIONS': {
+            # One entry per cached student dashboard/principal/report
+            'MAX_ENTRIES': 50000,
+        },
     }
 }
 
+# SQLite profile (university/sqlite_profile.py)
+# Pragmas applied to every new connection, on top of the defaults there
+# (WAL journal, busy_timeout 5000 ms, synchronous NORMAL, 64 MB page cache,
+# 256 MB mmap, in-memory temp store); None keeps SQLite's own default.
+# Enrollment transactions that still get SQLITE_BUSY are retried this many
+# times. `python manage.py benchmark_sqlite` compares the profile with
+# SQLite's defaults under concurrent load.
+
+UNIVERSITY_SQLITE_PRAGMAS = {}
+UNIVERSITY_SQLITE_BUSY_RETRIES = 3
+
+
+# Queued enrollment mode
+# When enabled, student_add_course only records an enrollment request and
+# returns a ticket; `python manage.py process_enrollment_queue` applies the
+# queued requests in batches.
+
+UNIVERSITY_QUEUED_ENROLLMENT = False
+
+# Waitlist promotion
+# When a student drops a course, immediately enroll the next student(s) on
+# that section's waitlist. `python manage.py promote_waitlists` runs the same
+# promotion as a sweep over every section (e.g. from cron).
+
+UNIVERSITY_AUTO_PROMOTE_WAITLIST = True
+
+# Table statistics (admin dashboard row counts)
+# Counts are cached and kept current incrementally; an exact recount runs in
+# the background at most this often.
+
+UNIVERSITY_TABLE_STATS_REFRESH_SECONDS = 15 * 60
+
+# Student dashboard cache
+# Each student's enrollment/grade rows are cached under a versioned key that
+# is bumped whenever that student's enrollments, waitlist entries or grades
+# change. Entries expire after this many seconds regardless.
+
+UNIVERSITY_STUDENT_DASHBOARD_CACHE_SECONDS = 10 * 60
+
+# Report cache (query page)
+# Report results are cached per parameter set and dropped as soon as one of
+# their tables changes; entries expire after this many seconds regardless.
+# `python manage.py precompute_reports` warms the (shared) cache.
+
+UNIVERSITY_REPORT_CACHE_SECONDS = 5 * 60
+
+# Logged-in principals (request.principal, see university/principals.py)
+# The student/instructor/admin record behind a session is cached across
+# requests and dropped whenever that record is saved or deleted; entries
+# expire after this many seconds regardless.
+
+UNIVERSITY_PRINCIPAL_CACHE_SECONDS = 60
+
+# Background jobs (tables menu operations, see jobs/runner.py)
+# Worker threads started inside the web server process on the first queued
+# job. Set to 0 to leave jobs to `python manage.py run_jobs` instead. Live
+# progress is kept in the (shared) cache.
+
+UNIVERSITY_JOB_WORKERS = 2
+
+# Database snapshots (tables menu > Snapshots, `python manage.py snapshot`)
+# Directory for the snapshot files (SQLite copies of the whole database,
+# student records included). Kept outside the project tree so that they
+# can't be committed by accident.
+
+UNIVERSITY_SNAPSHOT_DIR = Path.home() / '.university_enrollment' / 'snapshots'
+
+# The grade form posts four fields per student; Django's default limit of
+# 1000 fields would reject sections larger than ~250 students.
+
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators